@@ -7,6 +7,7 @@ import signal
 import pathlib
 import json
 import socket
+import threading
 from datetime import datetime, timezone
 from PyQt5.QtCore import Qt, QThread, pyqtSignal, QSettings
 from PyQt5.QtWidgets import (
@@ -20,6 +21,9 @@ from modeling import EarthSatelliteView
 from satellite_setting import SatelliteSettingsDialog
 from base_station_setting import BaseStationSettingsDialog
 from comm_setting import CommSettingsDialog
+import TlmTopic
+import TlmEventStore
+import TlmDefCache
 
 
 # ──────────────────────────────────────────────────────────────────────────────
@@ -127,6 +131,8 @@ class GroundSystemLogic:
         self.display_error_callback = display_error_callback
         self.ip_addresses_list = ['All']; self.spacecraft_names = ['All']
         self.routing_service = None; self.cmd_process = None; self.cmd_process_reader = None
+        # 프로세스 안에서 연 TelemetrySystem 창 (GS_TLM_PAGES=process 이면 기존처럼 서브프로세스)
+        self.tlm_windows = []
 
     def display_error_message(self, message: str):
         print(f"[GS_LOGIC_ERROR] {message}")
@@ -148,10 +154,35 @@ class GroundSystemLogic:
         if not tlm_system_path.is_file():
             self.display_error_message(f"File Not Found: {tlm_system_path}")
             return
+        if os.getenv("GS_TLM_PAGES", "inprocess").strip().lower() != "process":
+            try:
+                self._open_tlm_system_inprocess(tlm_system_path, subscription.split("=", 1)[1])
+                return
+            except Exception as e:
+                print(f"[GS_LOGIC] in-process TelemetrySystem unavailable ({e}), starting subprocess")
         args = shlex.split(f'python3 {str(tlm_system_path)} {subscription}')
         try: subprocess.Popen(args)
         except Exception as e: self.display_error_message(f"TLM Start Fail: {e}")
 
+    def _open_tlm_system_inprocess(self, tlm_system_path, subscr):
+        # 인터프리터/PyQt/zmq 기동 없이 같은 프로세스에 페이지 관리자 창을 연다.
+        # 하위 페이지도 이 창의 수신 스레드 하나로 stream id 별로 전달받는다.
+        tlm_dir = str(tlm_system_path.parent)
+        if tlm_dir not in sys.path: sys.path.append(tlm_dir)
+        import TelemetrySystem
+        win = TelemetrySystem.open_telemetry_system(subscr)
+        self.tlm_windows.append(win)
+        # 창이 닫혀도 수신 스레드가 끝날 때까지 참조 유지 (실행 중 QThread 가 GC 되면 프로세스 종료)
+        win.finished.connect(lambda _, w=win: self._release_tlm_window(w))
+
+    def _release_tlm_window(self, win):
+        try: running = win.thread is not None and win.thread.isRunning()
+        except RuntimeError: running = False  # 스레드 객체가 이미 삭제됨 (deleteLater)
+        if running:
+            win.thread.finished.connect(lambda w=win: self._release_tlm_window(w))
+            return
+        if win in self.tlm_windows: self.tlm_windows.remove(win)
+
     def start_cmd_system(self, on_stdout_callback=None):
         if self.cmd_process and self.cmd_process.poll() is None: return
         cmd_system_path = self.ROOTDIR / "Subsystems" / "cmdGui" / "CommandSystem.py"
@@ -172,7 +203,15 @@ class GroundSystemLogic:
             try: self.cmd_process_reader.stop(); self.cmd_process_reader.quit(); self.cmd_process_reader.wait(1000)
             except: pass
 
+    def stop_routing_service(self):
+        # 아카이브 세그먼트 봉인, 이벤트 저장소의 남은 행 기록까지 마치고 종료
+        if self.routing_service:
+            try: self.routing_service.stop()
+            except Exception as e: print(f"[SYSTEM] RoutingService stop failed: {e}")
+            self.routing_service = None
+
     def update_ip_list(self, ip, name):
+        if isinstance(name, bytes): name = name.decode()
         is_new_ip = True
         for i, existing_ip in enumerate(self.ip_addresses_list):
             if existing_ip == ip:
@@ -184,6 +223,10 @@ class GroundSystemLogic:
             self.ip_addresses_list.append(ip); self.spacecraft_names.append(name)
 
     def init_routing_service(self, routing_service=None):
+        # downlink_hub 또는 TlmBroker --route 가 버스에 퍼블리시하는 경우 (run_com.py --hub / --broker)
+        if routing_service is None and os.getenv("GS_EXTERNAL_HUB", "0") == "1":
+            print("[SYSTEM] External downlink hub in use. RoutingService not started.")
+            return
         try:
             from RoutingService import RoutingService
             self.routing_service = routing_service or RoutingService()
@@ -217,7 +260,15 @@ class NextGenGroundSystem(QMainWindow):
 
         self._init_ui()
         self._load_settings()
+        # GS_SPACECRAFT_MAP 에 정의된 우주선은 패킷 도착 전에도 선택 가능
+        for ip, number in TlmTopic.SpacecraftMap().configured():
+            self.gs_logic.update_ip_list(ip, f"Spacecraft{number}")
+            self.on_ip_list_updated(ip, f"Spacecraft{number}")
         self.gs_logic.init_routing_service()
+        if self.gs_logic.routing_service:
+            self.gs_logic.routing_service.signal_update_ip_list.connect(self.on_ip_list_updated)
+        # 텔레메트리/명령 정의 파일을 미리 컴파일해 두어 페이지 창이 파싱 없이 열리도록
+        threading.Thread(target=TlmDefCache.compile_all, name="def-cache", daemon=True).start()
 
     def _init_ui(self):
         main_widget = QWidget(); self.setCentralWidget(main_widget)
@@ -365,6 +416,12 @@ class NextGenGroundSystem(QMainWindow):
             sock.close()
         except Exception as e:
             self.append_terminal_output(f"[오류] 공격 명령 전송 실패: {e}")
+            return
+        # 이벤트 검색에서 공격 구간(--run MODE)으로 쓰도록 모드 변경 시각 기록
+        try:
+            TlmEventStore.record_run(mode)
+        except OSError as e:
+            self.append_terminal_output(f"[오류] 공격 구간 기록 실패: {e}")
 
     # (이하 설정 로드/저장/다이얼로그 메서드는 기존과 동일)
     def _load_settings(self):
@@ -487,17 +544,24 @@ class NextGenGroundSystem(QMainWindow):
     def append_terminal_output(self, msg):
         self.log_output.append(f"[{datetime.now().strftime('%H:%M:%S')}] {msg}")
     
-    def on_start_tlm(self): self.gs_logic.start_tlm_system("All")
+    def on_start_tlm(self):
+        # 콤보 항목 "SpacecraftN (ip)" → 해당 우주선만 구독
+        text = self.cb_ips.currentText()
+        self.gs_logic.start_tlm_system("All" if text == "All" else text.split(" ", 1)[0])
     def on_start_cmd(self): self.gs_logic.start_cmd_system(lambda l: self.append_terminal_output(f"[CMD] {l}"))
     def on_tlm_header_changed(self, t): self.sb_tlm_offset.setEnabled(t=="Custom"); self._save_settings()
     def on_tlm_offset_changed(self, v): self._save_settings()
     def on_cmd_header_changed(self, t): self.sb_cmd_pri.setEnabled(t=="Custom"); self.sb_cmd_sec.setEnabled(t=="Custom"); self._save_settings()
     def on_cmd_offset_pri_changed(self, v): self._save_settings()
     def on_cmd_offset_sec_changed(self, v): self._save_settings()
-    def on_ip_list_updated(self, ip, name): self.cb_ips.addItem(f"{name} ({ip})")
+    def on_ip_list_updated(self, ip, name):
+        if isinstance(name, bytes): name = name.decode()
+        item = f"{name} ({ip})"
+        if self.cb_ips.findText(item) < 0: self.cb_ips.addItem(item)
     def closeEvent(self, e):
         if self.test2_process: self.test2_process.terminate()
         self.gs_logic.stop_cmd_system()
+        self.gs_logic.stop_routing_service()
         super().closeEvent(e)
 
 def main():
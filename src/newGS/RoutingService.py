@@ -18,16 +18,36 @@
 #  limitations under the License.
 #
 
+import os
+import select
 import socket
-from struct import unpack
-from time import sleep
+from struct import Struct, unpack
+from time import sleep, time_ns
 
 import zmq
 from PyQt5.QtCore import QThread, pyqtSignal
 
+import TlmArchive
+import TlmDelivery
+import TlmEventStore
+import TlmSeqTrack
+import TlmShmRing
+import TlmTopic
+
 # Receive port where the CFS TO_Lab app sends the telemetry packets
 udp_recv_port = 50001
 
+# CCSDS primary header stream id (big endian)
+STREAM_ID = Struct(">H")
+
+# Max datagrams drained per wakeup (1 = one datagram per loop)
+routing_batch_size = int(os.getenv("GS_ROUTING_BATCH", "64"))
+# Size of each pre-allocated receive buffer (max UDP payload)
+recv_buf_size = 65536
+
+# If set, connect to a TlmBroker.py XSUB endpoint instead of binding the bus
+bus_pub_endpoint = os.getenv("GS_BUS_PUB_ENDPOINT", "")
+
 
 #
 # Receive telemetry packets, apply the appropriate header
@@ -46,71 +66,175 @@ class RoutingService(QThread):
         self.special_pkt_id = []
         self.special_pkt_name = []
 
+        # Hot path lookups: host ip -> spacecraft name (bytes) and
+        # (spacecraft name, stream id) -> pre-encoded topic
+        self.host_to_spacecraft = {}
+        self.host_to_index = {}
+        self.topic_cache = {}
+
+        # Host ip -> spacecraft number (GS_SPACECRAFT_MAP, else arrival order)
+        self.spacecraft_map = TlmTopic.SpacecraftMap()
+
+        self.runs = True
+        self.batch_size = max(1, routing_batch_size)
+
+        # Background archive of every routed datagram (GS_ARCHIVE=0 to disable)
+        self.archive = TlmArchive.TlmArchiveWriter() if TlmArchive.GS_ARCHIVE else None
+
+        # Searchable store of decoded event messages (GS_EVENT_STORE=0 to disable)
+        self.events = TlmEventStore.EventStoreWriter() if TlmEventStore.GS_EVENT_STORE else None
+
+        # Decimated delivery classes for GUI subscribers (GS_DELIVERY)
+        self.delivery = TlmDelivery.DeliveryFanout()
+        self.select_timeout = min(0.2, self.delivery.tick or 0.2)
+
+        # Per-APID sequence gap / duplicate tracking, published as a status
+        # stream (GS_SEQ_TRACK=0 to disable)
+        self.seq = TlmSeqTrack.SeqTracker() if TlmSeqTrack.GS_SEQ_TRACK else None
+        self.seq_topic = TlmSeqTrack.status_topic()
+
+        # Shared-memory ring for same-host consumers (GS_SHM_RING=0 to disable)
+        self.ring = None
+        if TlmShmRing.GS_SHM_RING:
+            try:
+                self.ring = TlmShmRing.ShmRingWriter()
+            except OSError as e:
+                print('Shared-memory ring disabled:', e)
+
         self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4 * 1024 * 1024)
 
         # Init zeroMQ
         self.context = zmq.Context()
         self.publisher = self.context.socket(zmq.PUB)
-        self.publisher.bind("ipc:///tmp/GroundSystem")
+        if bus_pub_endpoint:
+            self.publisher.connect(bus_pub_endpoint)
+        else:
+            self.publisher.bind("ipc:///tmp/GroundSystem")
 
     # Run thread
     def run(self):
         # Init udp socket
         self.sock.bind(('', udp_recv_port))
+        self.sock.setblocking(False)
 
         print('Attempting to wait for UDP messages')
 
-        socket_error_count = 0
-        while socket_error_count < 5:
+        # Receive buffer pool. Datagrams (< 64 KiB) are below pyzmq's
+        # copy threshold, so send_multipart copies them synchronously even
+        # with copy=False and the buffers can be reused on the next wakeup.
+        views = [memoryview(bytearray(recv_buf_size)) for _ in range(self.batch_size)]
+        burst = [None] * self.batch_size
 
-            # Wait for UDP messages
-            while True:
-                try:
-                    # Receive message
-                    datagram, host = self.sock.recvfrom(
-                        4096)  # buffer size is 1024 bytes
+        socket_error_count = 0
+        while self.runs:
+            try:
+                # Wait for UDP messages (timeout so stop() is observed and
+                # held "latest" values are flushed when their window ends)
+                readable, _, _ = select.select([self.sock], [], [], self.select_timeout)
+                now = time_ns()
+                for topic, data in self.delivery.due(now):
+                    self.publisher.send_multipart([topic, data])
+                if self.seq is not None:
+                    stats = self.seq.due(now)
+                    if stats is not None:
+                        self.publisher.send_multipart([self.seq_topic, stats])
+                if not readable:
+                    continue
 
+                # Drain everything that is queued, up to one batch
+                n = 0
+                while n < self.batch_size:
+                    try:
+                        nbytes, host = self.sock.recvfrom_into(views[n])
+                    except BlockingIOError:
+                        break
                     # Ignore datagram if it is not long enough (doesn't contain tlm header?)
-                    if len(datagram) < 6:
+                    if nbytes < 6:
                         continue
+                    burst[n] = (nbytes, host[0], time_ns())
+                    n += 1
 
-                    # Read host address
-                    host_ip_address = host[0]
-
+                # Publish the burst
+                archive = self.archive
+                events = self.events
+                ring = self.ring
+                seq = self.seq
+                for i in range(n):
+                    nbytes, host_ip_address, t_ns = burst[i]
                     #
                     # Add Host to the list if not already in list
                     #
-                    if host_ip_address not in self.ip_addresses_list:
-                        ## MAKE SURE THERE'S NO SPACE BETWEEN "Spacecraft"
-                        ## AND THE FIRST CURLY BRACE!!!
-                        hostname = f'Spacecraft{len(self.spacecraft_names)}'
-                        my_hostname_as_bytes = hostname.encode()
-                        print("Detected", hostname, "at", host_ip_address)
-                        self.ip_addresses_list.append(host_ip_address)
-                        self.spacecraft_names.append(my_hostname_as_bytes)
-                        self.signal_update_ip_list.emit(host_ip_address,
-                                                        my_hostname_as_bytes)
+                    name = self.host_to_spacecraft.get(host_ip_address)
+                    if name is None:
+                        name = self.add_host(host_ip_address)
 
                     # Forward the message using zeroMQ
-                    name = self.spacecraft_names[self.ip_addresses_list.index(
-                        host_ip_address)]
-                    self.forwardMessage(datagram, name)
+                    self.forwardMessage(views[i][:nbytes], name)
+
+                    # Sequence count bookkeeping (gaps, duplicates, late arrivals)
+                    if seq is not None:
+                        seq.observe(self.host_to_index[host_ip_address], views[i])
+
+                    # Per-class delivery policies (full / every N / latest per X ms)
+                    for topic, data in self.delivery.offer(self.host_to_index[host_ip_address],
+                                                           views[i][:nbytes], t_ns):
+                        self.publisher.send_multipart([topic, data], copy=False)
 
-                # Handle errors
-                except socket.error:
+                    # Write once into the shared-memory ring for local readers
+                    if ring is not None:
+                        ring.write(t_ns, self.host_to_index[host_ip_address], views[i][:nbytes])
+
+                    # Queue a copy for the archive writer thread
+                    if archive is not None:
+                        archive.append(t_ns, host_ip_address, views[i][:nbytes])
+
+                    # Event stream packets go to the event store thread
+                    if events is not None:
+                        events.append(t_ns, self.host_to_index[host_ip_address], views[i][:nbytes])
+                socket_error_count = 0
+
+            # Handle errors
+            except (socket.error, ValueError):
+                if not self.runs:
+                    break
+                # Short exponential backoff (1 ms .. 100 ms) instead of a
+                # fixed 1 s sleep so a transient error doesn't stall the stream
+                socket_error_count += 1
+                if socket_error_count <= 5:
                     print('Ignored socket error for attempt', socket_error_count)
-                    socket_error_count += 1
-                    sleep(1)
+                sleep(min(0.001 * (2 ** min(socket_error_count, 7)), 0.1))
+
+    # Register a new host and return its spacecraft name (bytes)
+    def add_host(self, host_ip_address):
+        ## MAKE SURE THERE'S NO SPACE BETWEEN "Spacecraft"
+        ## AND THE FIRST CURLY BRACE!!!
+        number = self.spacecraft_map.assign(host_ip_address)
+        hostname = f'Spacecraft{number}'
+        my_hostname_as_bytes = hostname.encode()
+        print("Detected", hostname, "at", host_ip_address)
+        self.ip_addresses_list.append(host_ip_address)
+        self.spacecraft_names.append(my_hostname_as_bytes)
+        self.host_to_spacecraft[host_ip_address] = my_hostname_as_bytes
+        self.host_to_index[host_ip_address] = number
+        self.signal_update_ip_list.emit(host_ip_address, my_hostname_as_bytes)
+        return my_hostname_as_bytes
+
+    # Build (once) the topic for a spacecraft / stream id pair
+    # (binary by default, legacy string topics with GS_TOPIC_MODE=legacy)
+    def get_topic(self, hostName, stream_id):
+        topic = TlmTopic.make_topic(TlmTopic.spacecraft_index(hostName), stream_id)
+        self.topic_cache[(hostName, stream_id)] = topic
+        return topic
 
     # Apply header using hostname and packet id and send msg using zeroMQ
     def forwardMessage(self, datagram, hostName):
-        # Forward message to channel GroundSystem.<hostname>.<pkt_id>
-        pkt_id = self.get_pkt_id(datagram)
-        my_decoded_hostname = hostName.decode()
-        header = f"GroundSystem.{my_decoded_hostname}.TelemetryPackets.{pkt_id}"
-        my_header_as_bytes = header.encode()
-        self.publisher.send_multipart([my_header_as_bytes, datagram])
-        # print(header)
+        # Forward message to channel <spacecraft>.<pkt_id> (see TlmTopic.py)
+        stream_id = STREAM_ID.unpack_from(datagram)[0]
+        topic = self.topic_cache.get((hostName, stream_id))
+        if topic is None:
+            topic = self.get_topic(hostName, stream_id)
+        self.publisher.send_multipart([topic, datagram], copy=False)
 
     # Read the packet id from the telemetry packet
     @staticmethod
@@ -120,6 +244,17 @@ class RoutingService(QThread):
         return hex(stream_id[0])
 
     # Close ZMQ vars
-    def stop(self):
+    # (the loop sees runs=False within select_timeout; wait for it so the
+    # archive / event writers get the last datagrams and seal their files)
+    def stop(self, timeout_ms=2000):
+        self.runs = False
+        if self.isRunning() and QThread.currentThread() is not self:
+            self.wait(timeout_ms)
         self.sock.close()
+        if self.archive is not None:
+            self.archive.close()
+        if self.events is not None:
+            self.events.close()
+        if self.ring is not None:
+            self.ring.close()
         self.context.destroy()
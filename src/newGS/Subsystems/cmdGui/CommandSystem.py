@@ -13,8 +13,6 @@ CommandSystem.py
 - 실행 경로/분기 로그 출력 강화.
 """
 
-import csv
-import pickle
 import shlex
 import subprocess
 import sys
@@ -33,6 +31,10 @@ from UiCommandsystemdialog import UiCommandsystemdialog
 # 이 파일 위치 기준 (…/Subsystems/cmdGui)
 ROOTDIR = Path(__file__).resolve().parent  # 기존: Path(sys.argv[0]).resolve().parent
 
+# 정의 파일 컴파일 캐시 (newGS/TlmDefCache.py, 두 단계 위)
+sys.path.append(str(ROOTDIR.parents[1]))
+import TlmDefCache  # noqa: E402
+
 # --------------------------------------------------------------------------------
 # -- CommandSystem 클래스
 # --------------------------------------------------------------------------------
@@ -110,8 +112,7 @@ class CommandSystem(QDialog, UiCommandsystemdialog):
         """
         pickle_file = f'{ROOTDIR}/ParameterFiles/{quick_param[idx]}'
         try:
-            with open(pickle_file, 'rb') as pickle_obj:
-                param_names = pickle.load(pickle_obj)[1]
+            param_names = TlmDefCache.load(pickle_file, "pickle")[1]
             return len(param_names) > 0
         except IOError:
             return False
@@ -258,28 +259,25 @@ if __name__ == "__main__":
     command = CommandSystem()
     tbl = command.tbl_cmd_sys
 
-    # CSV 및 동적 테이블 로드 로직 (command-pages.txt)
+    # CSV 및 동적 테이블 로드 로직 (command-pages.txt, 주석 줄은 캐시에서 제외됨)
     cmd_page_is_valid, cmdPageDesc, cmdPageDefFile, cmdPageAppid, \
     cmdPageEndian, cmdClass, cmdPageAddress, cmdPagePort = ([] for _ in range(8))
 
     i = 0
-    with open(f"{ROOTDIR}/{cmd_def_file}") as cmdfile:
-        reader = csv.reader(cmdfile, skipinitialspace=True)
-        for cmdRow in reader:
-            try:
-                if not cmdRow[0].startswith('#'):
-                    cmd_page_is_valid.append(True)
-                    cmdPageDesc.append(cmdRow[0])
-                    cmdPageDefFile.append(cmdRow[1])
-                    cmdPageAppid.append(int(cmdRow[2], 16))
-                    cmdPageEndian.append(cmdRow[3])
-                    cmdClass.append(cmdRow[4])
-                    cmdPageAddress.append(cmdRow[5])
-                    cmdPagePort.append(int(cmdRow[6]))
-                    i += 1
-            except IndexError as e:
-                print("IndexError:", e)
-                print("This may be due to a formatting issue in command-pages.txt")
+    for cmdRow in TlmDefCache.load(f"{ROOTDIR}/{cmd_def_file}", "rows"):
+        try:
+            cmd_page_is_valid.append(True)
+            cmdPageDesc.append(cmdRow[0])
+            cmdPageDefFile.append(cmdRow[1])
+            cmdPageAppid.append(int(cmdRow[2], 16))
+            cmdPageEndian.append(cmdRow[3])
+            cmdClass.append(cmdRow[4])
+            cmdPageAddress.append(cmdRow[5])
+            cmdPagePort.append(int(cmdRow[6]))
+            i += 1
+        except IndexError as e:
+            print("IndexError:", e)
+            print("This may be due to a formatting issue in command-pages.txt")
 
     for _ in range(i, 22):
         cmdPageAppid.append(0)
@@ -290,19 +288,16 @@ if __name__ == "__main__":
     quick_endian, quick_address, quick_port, quick_param, \
     quick_indices = ([] for _ in range(10))
 
-    with open(f'{ROOTDIR}/{quick_def_file}') as subFile:
-        reader = csv.reader(subFile)
-        for fileRow in reader:
-            if not fileRow[0].startswith('#'):
-                subsys.append(fileRow[0])
-                subsys_file.append(fileRow[1])
-                quick_cmd.append(fileRow[2].strip())
-                quick_code.append(fileRow[3].strip())
-                quick_pkt_id.append(fileRow[4].strip())
-                quick_endian.append(fileRow[5].strip())
-                quick_address.append(fileRow[6].strip())
-                quick_port.append(fileRow[7].strip())
-                quick_param.append(fileRow[8].strip())
+    for fileRow in TlmDefCache.load(f'{ROOTDIR}/{quick_def_file}', "rows"):
+        subsys.append(fileRow[0])
+        subsys_file.append(fileRow[1])
+        quick_cmd.append(fileRow[2].strip())
+        quick_code.append(fileRow[3].strip())
+        quick_pkt_id.append(fileRow[4].strip())
+        quick_endian.append(fileRow[5].strip())
+        quick_address.append(fileRow[6].strip())
+        quick_port.append(fileRow[7].strip())
+        quick_param.append(fileRow[8].strip())
 
     for k, desc in enumerate(cmdPageDesc):
         if cmd_page_is_valid[k]:
@@ -17,7 +17,6 @@
 #
 
 import getopt
-import pickle
 import re
 import sys
 from pathlib import Path
@@ -32,6 +31,10 @@ from UiParameterDialog import UiDialog
 
 ROOTDIR = Path(sys.argv[0]).resolve().parent
 
+# Compiled definition cache lives in the newGS folder (two levels up)
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+import TlmDefCache  # noqa: E402
+
 
 class Parameter(QDialog, UiDialog):
     #
@@ -127,9 +130,8 @@ if __name__ == '__main__':
     # Gets parameter information from pickle files
     #
     pickle_file = f'{ROOTDIR}/ParameterFiles/' + re.split(r'\.', param_file)[0]
-    with open(pickle_file, 'rb') as pickle_obj:
-        _, paramNames, _, paramDesc, dataTypesNew, stringLen = pickle.load(
-            pickle_obj)
+    _, paramNames, _, paramDesc, dataTypesNew, stringLen = TlmDefCache.load(
+        pickle_file, "pickle")
 
     #
     # Sets text in GUI
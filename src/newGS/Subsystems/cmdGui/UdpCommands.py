@@ -33,7 +33,6 @@
 #                   wireless radio
 #
 import getopt
-import pickle
 import shlex
 import subprocess
 import sys
@@ -48,6 +47,10 @@ from UiGenericcommanddialog import UiGenericcommanddialog
 # ../cFS/tools/cFS-GroundSystem/Subsystems/cmdGui/
 ROOTDIR = Path(sys.argv[0]).resolve().parent
 
+# Compiled definition cache lives in the newGS folder (two levels up)
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+import TlmDefCache  # noqa: E402
+
 
 class SubsystemCommands(QDialog, UiGenericcommanddialog):
     #
@@ -66,8 +69,7 @@ class SubsystemCommands(QDialog, UiGenericcommanddialog):
     def check_params(idx):
         pf = f'{ROOTDIR}/ParameterFiles/{param_files[idx]}'
         try:
-            with open(pf, 'rb') as po:
-                param_names = pickle.load(po)[1]
+            param_names = TlmDefCache.load(pf, "pickle")[1]
             return len(param_names) > 0  # if has parameters
         except IOError:
             return False
@@ -175,8 +177,7 @@ if __name__ == '__main__':
     # Reads commands from command definition file
     #
     pickle_file = f'{ROOTDIR}/CommandFiles/{page_def_file}'
-    with open(pickle_file, 'rb') as pickle_obj:
-        cmd_desc, cmd_codes, param_files = pickle.load(pickle_obj)
+    cmd_desc, cmd_codes, param_files = TlmDefCache.load(pickle_file, "pickle")
 
     cmd_item_is_valid = []
     for i in range(len(cmd_desc)):
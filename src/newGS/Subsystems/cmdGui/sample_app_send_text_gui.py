@@ -26,6 +26,9 @@ from PyQt5.QtWidgets import (
 ROOTDIR_GUI = Path(__file__).resolve().parent
 PROJECT_ROOT = ROOTDIR_GUI.parent.parent     # …/newGS (test1.py, log/ 가 있는 위치)
 
+sys.path.append(str(PROJECT_ROOT))
+import log_rotation  # noqa: E402
+
 # cmdUtil 경로 (…/Subsystems/cmdUtil/cmdUtil)
 CMDUTIL_PATH = (ROOTDIR_GUI / "../cmdUtil/cmdUtil").resolve()
 
@@ -67,27 +70,35 @@ class SendTextDialog(QDialog):
         print(f"[INFO] Next sequence ID initialized to: {self.next_seq_id}")
 
     def _get_last_seq_id_from_csv(self):
-        max_id = 0
+        # 활성 파일이 회전 직후 비어 있으면 가장 최근 봉인 세그먼트에서 찾는다
         resolved_path = SENT_CSV_FILE_PATH.resolve()
         print(f"[DEBUG] _get_last_seq_id_from_csv: Checking file at {resolved_path}")
 
-        if SENT_CSV_FILE_PATH.exists() and SENT_CSV_FILE_PATH.is_file():
-            if SENT_CSV_FILE_PATH.stat().st_size > 0:
-                try:
-                    with open(SENT_CSV_FILE_PATH, "r", newline="", encoding="utf-8") as f:
-                        reader = csv.DictReader(f)
-                        if not reader.fieldnames or "id" not in reader.fieldnames:
-                            return 0
-                        for row in reader:
-                            try:
-                                cur = int(str(row.get("id", "0")).strip())
-                                if cur > max_id:
-                                    max_id = cur
-                            except Exception:
-                                continue
-                except Exception as e_file:
-                    print(f"[ERROR] Failed to read {resolved_path}: {e_file}. Start from 1.")
+        for path in reversed(log_rotation.segment_paths(SENT_CSV_FILE_PATH)):
+            max_id = self._max_id_in(path)
+            if max_id > 0:
+                return max_id
+        return 0
+
+    def _max_id_in(self, path):
+        max_id = 0
+        try:
+            if not path.is_file() or path.stat().st_size == 0:
+                return 0
+            with log_rotation.open_segment(path) as f:
+                reader = csv.DictReader(f)
+                if not reader.fieldnames or "id" not in reader.fieldnames:
                     return 0
+                for row in reader:
+                    try:
+                        cur = int(str(row.get("id", "0")).strip())
+                        if cur > max_id:
+                            max_id = cur
+                    except Exception:
+                        continue
+        except Exception as e_file:
+            print(f"[ERROR] Failed to read {path}: {e_file}. Skipping.")
+            return 0
         return max_id
 
     def send_command(self):
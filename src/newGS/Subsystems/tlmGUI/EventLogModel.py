@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+#
+# Bounded event log model for the EventMessage page
+#
+# Events are kept in a fixed-size ring buffer (oldest dropped past the
+# retention cap, GS_EVENT_RETENTION) and shown through a QListView, so only
+# the visible rows are formatted and painted. Per app name / event type / event id indexes hold the serial
+# numbers of matching events, so a filter walks the smallest matching index
+# instead of rescanning every event. Appends are queued and inserted into the
+# model on a timer, one beginInsertRows per repaint period.
+#
+
+import os
+from collections import deque
+
+from PyQt5.QtCore import QAbstractListModel, QModelIndex, Qt, QTimer, pyqtSignal
+
+# Max events kept per page (older ones are dropped)
+EVENT_RETENTION = int(os.getenv("GS_EVENT_RETENTION", "10000"))
+# Period for inserting queued events into the model (ms)
+EVENT_FLUSH_MS = 100
+
+EVENT_TYPES = {
+    1: "DEBUG",
+    2: "INFORMATION",
+    3: "ERROR",
+    4: "CRITICAL"
+}
+
+# Record fields
+APP, TYPE, EID, TEXT = range(4)
+
+
+class EventLogModel(QAbstractListModel):
+    # Emitted when an app name is seen for the first time (for filter lists)
+    app_added = pyqtSignal(str)
+
+    def __init__(self, capacity=EVENT_RETENTION, parent=None):
+        super().__init__(parent)
+        self.capacity = max(1, capacity)
+        # Ring buffer: event with serial s is in slots[s % capacity] while
+        # first_serial <= s < next_serial
+        self.slots = [None] * self.capacity
+        self.first_serial = 0
+        self.next_serial = 0
+        self.pending = []
+
+        # field -> value -> deque of serials (ascending)
+        self.index = ({}, {}, {})
+        # Active filter (app, type, event id), None = any
+        self.filter = (None, None, None)
+        # Serials shown when a filter is active (None = all events)
+        self.view = None
+
+        self.flush_timer = QTimer(self)
+        self.flush_timer.timeout.connect(self.flush)
+        self.flush_timer.start(EVENT_FLUSH_MS)
+
+    # Number of stored events
+    def stored(self):
+        return self.next_serial - self.first_serial
+
+    def record(self, serial):
+        return self.slots[serial % self.capacity]
+
+    #
+    # Model interface
+    #
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return self.stored() if self.view is None else len(self.view)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole or not index.isValid():
+            return None
+        row = index.row()
+        serial = self.first_serial + row if self.view is None else self.view[row]
+        app, event_type, event_id, text = self.record(serial)
+        type_str = EVENT_TYPES.get(event_type, "INVALID EVENT TYPE")
+        return f"EVENT --> {app}-{type_str} Event ID: {event_id} : {text}"
+
+    #
+    # Queue decoded events (app, type, event id, text); shown on the next flush
+    #
+    def append_events(self, events):
+        self.pending.extend(events)
+
+    def matches(self, event):
+        app, event_type, event_id = self.filter
+        return ((app is None or event[APP] == app) and
+                (event_type is None or event[TYPE] == event_type) and
+                (event_id is None or event[EID] == event_id))
+
+    def flush(self):
+        if not self.pending:
+            return
+        new, self.pending = self.pending, []
+        skipped = 0
+        if len(new) > self.capacity:
+            skipped = len(new) - self.capacity
+            new = new[-self.capacity:]
+
+        # Drop the oldest events that the new ones push out
+        overflow = self.stored() + len(new) - self.capacity
+        if overflow > 0:
+            self._evict(min(overflow, self.stored()))
+        if skipped:
+            # Burst larger than the retention cap: its head is never stored
+            self.next_serial += skipped
+            self.first_serial = self.next_serial
+
+        # Store and index
+        serial = self.next_serial
+        added = []
+        for event in new:
+            self.slots[serial % self.capacity] = event
+            for field, idx in enumerate(self.index):
+                bucket = idx.get(event[field])
+                if bucket is None:
+                    bucket = idx[event[field]] = deque()
+                    if field == APP:
+                        self.app_added.emit(event[APP])
+                bucket.append(serial)
+            if self.view is not None and self.matches(event):
+                added.append(serial)
+            serial += 1
+
+        if self.view is None:
+            first = self.stored()
+            self.beginInsertRows(QModelIndex(), first, first + len(new) - 1)
+            self.next_serial = serial
+            self.endInsertRows()
+        else:
+            self.next_serial = serial
+            if added:
+                first = len(self.view)
+                self.beginInsertRows(QModelIndex(), first, first + len(added) - 1)
+                self.view.extend(added)
+                self.endInsertRows()
+
+    def _evict(self, count):
+        keep = self.first_serial + count        # first serial kept
+        if self.view is None:
+            self.beginRemoveRows(QModelIndex(), 0, count - 1)
+        else:
+            gone = 0
+            while gone < len(self.view) and self.view[gone] < keep:
+                gone += 1
+            if gone:
+                self.beginRemoveRows(QModelIndex(), 0, gone - 1)
+                del self.view[:gone]
+                self.endRemoveRows()
+        for serial in range(self.first_serial, keep):
+            slot = serial % self.capacity
+            event = self.slots[slot]
+            self.slots[slot] = None
+            for field, idx in enumerate(self.index):
+                bucket = idx[event[field]]
+                bucket.popleft()
+                if not bucket:
+                    del idx[event[field]]
+        self.first_serial = keep
+        if self.view is None:
+            self.endRemoveRows()
+
+    #
+    # Show only events matching app / type / event id (None = any). Uses the
+    # smallest matching index, so the cost follows the number of matches
+    # rather than the number of stored events.
+    #
+    def set_filter(self, app=None, event_type=None, event_id=None):
+        self.flush()
+        self.beginResetModel()
+        self.filter = (app, event_type, event_id)
+        if self.filter == (None, None, None):
+            self.view = None
+        else:
+            buckets = [self.index[field].get(value, ())
+                       for field, value in enumerate(self.filter) if value is not None]
+            smallest = min(buckets, key=len)
+            self.view = [s for s in smallest if self.matches(self.record(s))]
+        self.endResetModel()
+
+    def clear(self):
+        self.beginResetModel()
+        self.slots = [None] * self.capacity
+        self.first_serial = self.next_serial
+        self.pending = []
+        for idx in self.index:
+            idx.clear()
+        if self.view is not None:
+            self.view = []
+        self.endResetModel()
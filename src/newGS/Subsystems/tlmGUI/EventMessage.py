@@ -50,108 +50,153 @@
 # uint8   Spare2;       167
 
 import getopt
-import mmap
 import sys
 from pathlib import Path
 from struct import unpack
 
-import zmq
-from PyQt5.QtCore import QThread, pyqtSignal
-from PyQt5.QtWidgets import QApplication, QDialog
+from PyQt5.QtWidgets import (QAbstractItemView, QApplication, QComboBox,
+                             QDialog, QHBoxLayout, QLineEdit, QListView)
 
+from EventLogModel import EVENT_TYPES, EventLogModel
+from TlmReceiver import TlmReceiver
 from UiEventmessagedialog import UiEventmessagedialog
 
-ROOTDIR = Path(sys.argv[0]).resolve().parent
+ROOTDIR = Path(__file__).resolve().parent
+
+# Bus topic helpers live in the newGS folder (two levels up)
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+import TlmDecoder  # noqa: E402
+import TlmDelivery  # noqa: E402
+import TlmEventStore  # noqa: E402
 
 
 class EventMessageTelemetry(QDialog, UiEventmessagedialog):
-    def __init__(self, aid):
+    # Every event is shown: when hosted by TelemetrySystem the page is
+    # handed each packet of its stream, not just the newest one
+    latest_only = False
+
+    def __init__(self, aid, title="Event Messages"):
         super().__init__()
         self.setup_ui(self)
         self.appId = aid
+        self.page_title = title
+        self.thread = None
 
-        self.eventTypes = {
-            1: "DEBUG",
-            2: "INFORMATION",
-            3: "ERROR",
-            4: "CRITICAL"
-        }
+        self.eventTypes = EVENT_TYPES
 
-        with open("/tmp/OffsetData", "r+b") as f:
-            self.mm = mmap.mmap(f.fileno(), 0, prot=mmap.PROT_READ)
+        # Header offset from /tmp/OffsetData (0 when the file does not exist)
+        self.tlm_offset = TlmDecoder.OffsetReader()
+
+        #
+        # Replace the plain text log with a bounded, virtualized list view
+        # over a ring-buffer model (see EventLogModel.py)
+        #
+        self.event_model = EventLogModel(parent=self)
+        self.event_view = QListView(self)
+        self.event_view.setModel(self.event_model)
+        self.event_view.setUniformItemSizes(True)
+        self.event_view.setSelectionMode(QAbstractItemView.ExtendedSelection)
+        self.event_view.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.vertical_layout.replaceWidget(self.event_output, self.event_view)
+        self.event_output.deleteLater()
+        self.event_output = None
+        # Keep following new events while the view is scrolled to the bottom
+        self.event_model.rowsAboutToBeInserted.connect(self.remember_scroll)
+        self.event_model.rowsInserted.connect(self.follow_scroll)
+        self.at_bottom = True
+
+        #
+        # Filter bar: app name / event type / event id
+        #
+        self.filter_app = QComboBox(self)
+        self.filter_app.addItem("All apps", None)
+        self.event_model.app_added.connect(lambda name: self.filter_app.addItem(name, name))
+        self.filter_type = QComboBox(self)
+        self.filter_type.addItem("All types", None)
+        for type_id, type_name in EVENT_TYPES.items():
+            self.filter_type.addItem(type_name, type_id)
+        self.filter_eid = QLineEdit(self)
+        self.filter_eid.setPlaceholderText("Event ID")
+        self.filter_eid.setMaximumWidth(90)
+        filter_layout = QHBoxLayout()
+        filter_layout.addWidget(self.filter_app)
+        filter_layout.addWidget(self.filter_type)
+        filter_layout.addWidget(self.filter_eid)
+        filter_layout.addStretch(1)
+        self.vertical_layout.insertLayout(1, filter_layout)
+        self.filter_app.currentIndexChanged.connect(self.apply_filter)
+        self.filter_type.currentIndexChanged.connect(self.apply_filter)
+        self.filter_eid.editingFinished.connect(self.apply_filter)
 
     def init_em_tlm_receiver(self, subscr):
-        self.setWindowTitle(f'{page_title} for: {subscr}')
+        self.setWindowTitle(f'{self.page_title} for: {subscr}')
         self.thread = EMTlmReceiver(subscr, self.appId)
-        self.thread.em_signal_tlm_datagram.connect(self.process_pending_datagrams)
+        self.thread.connect_batches(self.process_datagram_batch)
         self.thread.finished.connect(self.thread.deleteLater)
         self.thread.start()
 
-    # This method processes packets. Called when the TelemetryReceiver receives a message/packet
-    def process_pending_datagrams(self, datagram):
+    def apply_filter(self, *_):
+        event_id = self.filter_eid.text().strip()
+        try:
+            event_id = int(event_id, 0) if event_id else None
+        except ValueError:
+            event_id = None
+        self.event_model.set_filter(self.filter_app.currentData(),
+                                    self.filter_type.currentData(), event_id)
+
+    def remember_scroll(self, *_):
+        bar = self.event_view.verticalScrollBar()
+        self.at_bottom = bar.value() >= bar.maximum()
+
+    def follow_scroll(self, *_):
+        if self.at_bottom:
+            self.event_view.scrollToBottom()
+
+    # Called with every batch the receiver hands over; events are queued in
+    # the model and inserted on its next flush (one repaint per period)
+    def process_datagram_batch(self, datagrams):
+        if not datagrams:
+            return
+        tlm_offset = self.tlm_offset()
+        self.event_model.append_events(
+            [self.decode_event(datagram, tlm_offset) for datagram in datagrams])
         # Packet Header
         #   uint16  StreamId;   0
         #   uint16  Sequence;   2
         #   uint16  Length;     4
-        packet_seq = unpack(">H", datagram[2:4])
+        packet_seq = unpack(">H", datagrams[-1][2:4])
         seq_count = packet_seq[0] & 0x3FFF
         self.sequence_count.setValue(seq_count)
 
-        tlm_offset = 0
-        #
-        # Get App Name, Event ID, Type and Event Text!
-        #
-        try:
-            tlm_offset = self.mm[0]
-        except ValueError:
-            pass
-        start_byte = 12 + tlm_offset
-        app_name = datagram[start_byte:start_byte + 20].decode('utf-8', 'ignore')
-        event_id = int.from_bytes(datagram[start_byte + 20:start_byte + 22],
-                                  byteorder='little')
-        event_type = int.from_bytes(datagram[start_byte + 22:start_byte + 24],
-                                    byteorder='little')
-        event_text = datagram[start_byte + 32:].decode('utf-8', 'ignore')
-        app_name = app_name.split("\0")[0]
-        event_text = event_text.split("\0")[0]
-        event_type_str = self.eventTypes.get(event_type, "INVALID EVENT TYPE")
-
-        event_string = f"EVENT --> {app_name}-{event_type_str} Event ID: {event_id} : {event_text}"
-        self.event_output.appendPlainText(event_string)
+    # This method processes packets. Called when the TelemetryReceiver receives a message/packet
+    def process_pending_datagrams(self, datagram):
+        self.process_datagram_batch([datagram])
+
+    #
+    # Get App Name, Event ID, Type and Event Text! (same decoding as the
+    # event store, see TlmEventStore.py)
+    #
+    @staticmethod
+    def decode_event(datagram, tlm_offset):
+        return TlmEventStore.decode_event(datagram, tlm_offset)
 
     # Reimplements closeEvent
     # to properly quit the thread
     # and close the window
     def closeEvent(self, event):
-        self.thread.runs = False
-        self.thread.wait(2000)
+        if self.thread is not None:
+            self.thread.stop()
+        self.tlm_offset.close()
         super().closeEvent(event)
 
 
-# Subscribes and receives zeroMQ messages
-class EMTlmReceiver(QThread):
-    # Setup signal to communicate with front-end GUI
-    em_signal_tlm_datagram = pyqtSignal(bytes)
-
+# Subscribes and receives the event stream (exact prefix per known
+# spacecraft if the subscription names none) in the delivery class for
+# display (GS_TLM_CLASS, events are full rate by default)
+class EMTlmReceiver(TlmReceiver):
     def __init__(self, subscr, aid):
-        super().__init__()
+        super().__init__(subscr, int(str(aid), 16), TlmDelivery.subscriber_class())
         self.app_id = aid
-        self.runs = True
-
-        # Init zeroMQ
-        self.context = zmq.Context()
-        self.subscriber = self.context.socket(zmq.SUB)
-        self.subscriber.connect("ipc:///tmp/GroundSystem")
-        subscription_string = f"{subscr}.Spacecraft1.TelemetryPackets.{app_id}"
-        self.subscriber.setsockopt_string(zmq.SUBSCRIBE, subscription_string)
-
-    def run(self):
-        while self.runs:
-            # Read envelope with address
-            address, datagram = self.subscriber.recv_multipart()
-            # Ignore if not an event message
-            if self.app_id in address.decode():
-                self.em_signal_tlm_datagram.emit(datagram)
 
 
 #
@@ -210,7 +255,7 @@ if __name__ == '__main__':
     # Init the QT application and the Event Message class
     #
     app = QApplication(sys.argv)
-    telem = EventMessageTelemetry(app_id)
+    telem = EventMessageTelemetry(app_id, page_title)
 
     # Display the page
     telem.show()
@@ -17,78 +17,178 @@
 #  limitations under the License.
 #
 
-import csv
 import getopt
-import mmap
 import sys
 from pathlib import Path
 from struct import unpack
 
-import zmq
-from PyQt5.QtCore import QThread, pyqtSignal
-from PyQt5.QtWidgets import (QApplication, QDialog, QHeaderView,
+import numpy as np
+from PyQt5.QtCore import Qt
+from PyQt5.QtWidgets import (QApplication, QDialog, QHeaderView, QMenu,
                              QTableWidgetItem)
 
+import TlmPlot
+from TlmReceiver import TlmReceiver
 from UiGenerictelemetrydialog import UiGenerictelemetrydialog
 
 # ../cFS/tools/cFS-GroundSystem/Subsystems/tlmGUI
-ROOTDIR = Path(sys.argv[0]).resolve().parent
+ROOTDIR = Path(__file__).resolve().parent
+
+# Bus topic helpers live in the newGS folder (two levels up)
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+import TlmBulkDecoder  # noqa: E402
+import TlmDecoder  # noqa: E402
+import TlmDefCache  # noqa: E402
+import TlmDelivery  # noqa: E402
 
 
 class SubsystemTelemetry(QDialog, UiGenerictelemetrydialog):
+    # Shows current values: when hosted by TelemetrySystem the page is
+    # handed the packets of its stream once per refresh (the table decodes
+    # the newest one, plots take them all)
+    latest_only = True
+
     #
     # Init the class
     #
-    def __init__(self):
+    def __init__(self, title="Telemetry Page", app_id=999, endian="L"):
         super().__init__()
         self.setupUi(self)
-        with open("/tmp/OffsetData", "r+b") as f:
-            self.mm = mmap.mmap(f.fileno(), 0, prot=mmap.PROT_READ)
-
-    #
-    # This method decodes a telemetry item from the packet and displays it
-    #
-    def display_telemetry_item(self, datagram, tlm_index, label_field, value_field):
-        if tlm_item_is_valid[tlm_index]:
-            tlm_offset = 0
-            try:
-                tlm_offset = self.mm[0]
-            except ValueError:
-                pass
-
-            tlm_field1 = tlm_item_format[tlm_index]
-            if tlm_field1[0] == "<":
-                tlm_field1 = tlm_field1[1:]
-        
-            item_start = 0
-            try:
-                item_start = int(tlm_item_start[tlm_index]) + tlm_offset
-            except UnboundLocalError:
-                pass
-            tlm_field2 = datagram[item_start:item_start +
-                                 int(tlm_item_size[tlm_index])]
-            if tlm_field2:
-                tlm_field = unpack(tlm_field1, tlm_field2)
-                if tlm_item_display_type[tlm_index] == 'Dec':
-                    value_field.setText(str(tlm_field[0]))
-                elif tlm_item_display_type[tlm_index] == 'Hex':
-                    value_field.setText(hex(tlm_field[0]))
-                elif tlm_item_display_type[tlm_index] == 'Enm':
-                    value_field.setText(tlm_item_enum[tlm_index][int(tlm_field[0])])
-                elif tlm_item_display_type[tlm_index] == 'Str':
-                    value_field.setText(tlm_field[0].decode('utf-8', 'ignore'))
-                label_field.setText(tlm_item_desc[tlm_index])
-            else:
-                print("ERROR: Can't unpack buffer of length", len(tlm_field2))
+        self.page_title = title
+        self.py_endian = '<' if endian.upper() == 'L' else '>'
+        self.thread = None
+        self.sub_system_line_edit.setText(title)
+        self.packet_id.display(app_id)
+        # Header offset from /tmp/OffsetData (0 when the file does not exist)
+        self.tlm_offset = TlmDecoder.OffsetReader()
+
+        # Page definition (list of TlmDecoder.TlmField, one per row), its
+        # precompiled group layout and the decoder for the current header offset
+        self.tlm_fields = []
+        self.tlm_layout = None
+        self.decoder = None
+        # Last value shown in each row (only changed cells are repainted)
+        self.shown_values = []
+
+        # Plots of selected rows (double-click or right-click a row). Every
+        # packet of a batch is decoded for them in one np.frombuffer call
+        # with a structured dtype of the plotted fields.
+        self.plot_panel = None
+        self.plot_dtype = None
+        self.plot_dtype_key = None
+        self.tbl_telemetry.setContextMenuPolicy(Qt.CustomContextMenu)
+        self.tbl_telemetry.customContextMenuRequested.connect(self.show_row_menu)
+        self.tbl_telemetry.cellDoubleClicked.connect(lambda row, _: self.add_plot(row))
+
+    #
+    # Load the definition file through the compiled definition cache
+    # (no csv parsing or layout computation when the file is unchanged)
+    #
+    def load_definition(self, tlm_def_file):
+        fields, layout = TlmDefCache.load(tlm_def_file, "tlm")
+        self.set_definition(fields, layout)
+
+    #
+    # Fill the table from the telemetry definition (labels are static)
+    #
+    def set_definition(self, fields, layout=None):
+        self.tlm_fields = fields
+        self.tlm_layout = layout
+        self.decoder = None
+        self.shown_values = [None] * len(fields)
+        for i, field in enumerate(fields):
+            self.tbl_telemetry.insertRow(i)
+            lbl_item, val_item = QTableWidgetItem(field.desc), QTableWidgetItem()
+            self.tbl_telemetry.setItem(i, 0, lbl_item)
+            self.tbl_telemetry.setItem(i, 1, val_item)
+        self.tbl_telemetry.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.tbl_telemetry.verticalHeader().setSectionResizeMode(QHeaderView.Stretch)
+
+    #
+    # Return the compiled decoder, recompiled only when the header
+    # offset in /tmp/OffsetData changes
+    #
+    def current_decoder(self):
+        tlm_offset = self.tlm_offset()
+        if self.decoder is None or self.decoder.offset != tlm_offset:
+            self.decoder = TlmDecoder.PacketDecoder(self.tlm_fields, self.py_endian,
+                                                    tlm_offset, self.tlm_layout)
+            self.shown_values = [None] * len(self.tlm_fields)
+        return self.decoder
+
+    #
+    # Only single numeric fields can be plotted
+    #
+    def is_plottable(self, row):
+        try:
+            fmt = TlmBulkDecoder.field_format(self.tlm_fields[row], self.py_endian)
+        except (ValueError, KeyError, IndexError):
+            return False
+        return isinstance(fmt, str) and not fmt.startswith("S")
+
+    def show_row_menu(self, pos):
+        row = self.tbl_telemetry.rowAt(pos.y())
+        if row < 0 or not self.is_plottable(row):
+            return
+        menu = QMenu(self)
+        panel = self.plot_panel
+        if panel is not None and panel.has_plot(row):
+            menu.addAction("Stop plotting", lambda: panel.remove_plot(panel.plots[row]))
+        else:
+            menu.addAction("Plot", lambda: self.add_plot(row))
+        menu.exec_(self.tbl_telemetry.viewport().mapToGlobal(pos))
+
+    def add_plot(self, row):
+        if not self.is_plottable(row):
+            return
+        if self.plot_panel is None:
+            self.plot_panel = TlmPlot.TlmPlotPanel(self.page_title, self)
+        self.plot_panel.add_plot(row, self.tlm_fields[row].desc)
+        self.plot_panel.show()
+        self.plot_panel.raise_()
+
+    #
+    # Append every packet of the batch to the plotted rows, each at its
+    # receive time (stamps, ns)
+    #
+    def feed_plots(self, datagrams, stamps):
+        panel = self.plot_panel
+        if panel is None or not panel.plots:
+            return
+        rows = tuple(panel.keys())
+        key = (rows, self.current_decoder().offset)
+        if key != self.plot_dtype_key:
+            self.plot_dtype = TlmBulkDecoder.build_dtype(
+                [self.tlm_fields[r] for r in rows], self.py_endian, key[1])
+            self.plot_dtype_key = key
+        dtype = self.plot_dtype
+        size = dtype.itemsize
+        keep = [i for i, d in enumerate(datagrams) if len(d) >= size]
+        if not keep:
+            return
+        records = np.frombuffer(b"".join(datagrams[i][:size] for i in keep), dtype=dtype)
+        times = np.array([stamps[i] for i in keep], dtype=np.int64) / 1e9
+        for row, name in zip(rows, dtype.names):
+            panel.append(row, times, records[name])
 
     # Start the telemetry receiver (see GTTlmReceiver class)
     def init_gt_tlm_receiver(self, subscr):
-        self.setWindowTitle(f"{page_title} for: {subscr}")
+        self.setWindowTitle(f"{self.page_title} for: {subscr}")
         self.thread = GTTlmReceiver(subscr)
-        self.thread.gt_signal_tlm_datagram.connect(self.process_pending_datagrams)
+        self.thread.connect_batches(self.process_datagram_batch, with_times=True)
         self.thread.finished.connect(self.thread.deleteLater)
         self.thread.start()
 
+    #
+    # Called with every batch the receiver hands over (and the receive
+    # times of its packets): the table shows current values, so only the
+    # newest packet is decoded for it; plots take the whole batch
+    #
+    def process_datagram_batch(self, datagrams, stamps):
+        if datagrams:
+            self.process_pending_datagrams(datagrams[-1])
+            self.feed_plots(datagrams, stamps)
+
     #
     # This method processes packets.
     # Called when the TelemetryReceiver receives a message/packet
@@ -102,46 +202,32 @@ class SubsystemTelemetry(QDialog, UiGenerictelemetrydialog):
         self.sequence_count.setValue(seq_count)
 
         #
-        # Decode and display all packet elements
+        # Decode all packet elements at once and repaint changed cells only
         #
-        for k in range(self.tbl_telemetry.rowCount()):
-            item_label = self.tbl_telemetry.item(k, 0)
-            item_value = self.tbl_telemetry.item(k, 1)
-            self.display_telemetry_item(datagram, k, item_label, item_value)
+        decoder = self.current_decoder()
+        shown = self.shown_values
+        for k, value in enumerate(decoder.decode(datagram)):
+            if value is None:
+                continue
+            if value != shown[k]:
+                shown[k] = value
+                self.tbl_telemetry.item(k, 1).setText(decoder.format(k, value))
 
     # Reimplements closeEvent
     # to properly quit the thread
     # and close the window
     def closeEvent(self, event):
-        self.thread.runs = False
-        self.thread.wait(2000)
-        self.mm.close()
+        if self.thread is not None:
+            self.thread.stop()
+        self.tlm_offset.close()
         super().closeEvent(event)
 
 
-# Subscribes and receives zeroMQ messages
-class GTTlmReceiver(QThread):
-    # Setup signal to communicate with front-end GUI
-    gt_signal_tlm_datagram = pyqtSignal(bytes)
-
+# Subscribes and receives the page's stream in the decimated delivery
+# class for display (GS_TLM_CLASS, see TlmDelivery.py)
+class GTTlmReceiver(TlmReceiver):
     def __init__(self, subscr):
-        super().__init__()
-        self.runs = True
-
-        # Init zeroMQ
-        context = zmq.Context()
-        self.subscriber = context.socket(zmq.SUB)
-        self.subscriber.connect("ipc:///tmp/GroundSystem")
-        my_tlm_pg_apid = subscr.split(".", 1)
-        my_subscription = f"GroundSystem.Spacecraft1.TelemetryPackets.{my_tlm_pg_apid[1]}"
-        self.subscriber.setsockopt_string(zmq.SUBSCRIBE, my_subscription)
-
-    def run(self):
-        while self.runs:
-            # Read envelope with address
-            _, datagram = self.subscriber.recv_multipart()
-            # Send signal with received packet to front-end/GUI
-            self.gt_signal_tlm_datagram.emit(datagram)
+        super().__init__(subscr, klass=TlmDelivery.subscriber_class())
 
 
 #
@@ -201,49 +287,16 @@ if __name__ == '__main__':
 
     print('Generic Telemetry Page started. Subscribed to', subscription)
 
-    py_endian = '<' if endian.upper() == 'L' else '>'
-
     #
     # Init the QT application and the telemetry class
     #
     app = QApplication(sys.argv)
-    telem = SubsystemTelemetry()
-    tbl = telem.tbl_telemetry
-    telem.sub_system_line_edit.setText(page_title)
-    telem.packet_id.display(app_id)
+    telem = SubsystemTelemetry(page_title, app_id, endian)
 
     #
     # Read in the contents of the telemetry packet definition
     #
-    tlm_item_is_valid, tlm_item_desc, \
-    tlm_item_start, tlm_item_size, \
-    tlm_item_display_type, tlm_item_format = ([] for _ in range(6))
-
-    tlm_item_enum = [None] * 40
-
-    i = 0
-    with open(f"{ROOTDIR}/{tlm_def_file}") as tlmfile:
-        reader = csv.reader(tlmfile, skipinitialspace=True)
-        for row in reader:
-            if not row[0].startswith("#"):
-                tlm_item_is_valid.append(True)
-                tlm_item_desc.append(row[0])
-                tlm_item_start.append(row[1])
-                tlm_item_size.append(row[2])
-                if row[3].lower() == 's':
-                    tlm_item_format.append(f'{row[2]}{row[3]}')
-                else:
-                    tlm_item_format.append(f'{py_endian}{row[3]}')
-                tlm_item_display_type.append(row[4])
-                if row[4] == 'Enm':
-                    tlm_item_enum[i] = row[5:9]
-                telem.tbl_telemetry.insertRow(i)
-                lbl_item, val_item = QTableWidgetItem(), QTableWidgetItem()
-                telem.tbl_telemetry.setItem(i, 0, lbl_item)
-                telem.tbl_telemetry.setItem(i, 1, val_item)
-                i += 1
-    tbl.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
-    tbl.verticalHeader().setSectionResizeMode(QHeaderView.Stretch)
+    telem.load_definition(f"{ROOTDIR}/{tlm_def_file}")
 
     #
     # Display the page
@@ -18,22 +18,33 @@
 #  limitations under the License.
 #
 
-import csv
 import getopt
+import os
 import shlex
 import subprocess
 import sys
 from pathlib import Path
-from struct import unpack
 
-import zmq
-from PyQt5.QtCore import QThread, pyqtSignal
+from PyQt5.QtCore import QTimer
 from PyQt5.QtWidgets import (QApplication, QDialog, QHeaderView, QPushButton,
                              QTableWidgetItem)
 
+from TlmReceiver import TlmReceiver
 from UiTelemetrysystemdialog import UiTelemetrysystemdialog
 
-ROOTDIR = Path(sys.argv[0]).resolve().parent
+ROOTDIR = Path(__file__).resolve().parent
+
+# Definition cache lives in the newGS folder (two levels up)
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+import TlmDefCache  # noqa: E402
+
+# Refresh period of the visible counters (ms), ~10 Hz
+GUI_REFRESH_MS = 100
+
+# Telemetry pages are hosted in this process and fed from the receiver
+# below ("inprocess", default) or launched as one process per page
+# with their own subscriber ("process", previous behaviour)
+tlm_pages_mode = os.getenv("GS_TLM_PAGES", "inprocess").strip().lower()
 
 
 class TelemetrySystem(QDialog, UiTelemetrysystemdialog):
@@ -48,6 +59,32 @@ class TelemetrySystem(QDialog, UiTelemetrysystemdialog):
 
         self.pkt_count = 0
         self.subscription = None
+        self.thread = None
+        self.endian = "L"
+
+        # Page table (see load_pages)
+        self.tlm_page_is_valid, self.tlm_page_desc, self.tlm_class, \
+        self.tlm_page_port, self.tlm_page_appid, self.tlm_page_count, \
+        self.tlm_page_def_file = ([] for _ in range(7))
+
+        # In-process pages: table row -> page widget, and
+        # stream id -> open pages fed with that stream
+        self.pages = {}
+        self.page_streams = {}
+        # Datagrams per stream since the last refresh, handed to pages that
+        # show current values as one batch on the refresh timer
+        self.stream_batches = {}
+
+        # stream id -> table rows, built once the page table is filled
+        self.appid_rows = {}
+        # Rows whose count changed since the last refresh
+        self.dirty_rows = set()
+        self.shown_pkt_count = 0
+
+        # Counters are updated in plain Python per batch; the widgets
+        # are refreshed from this timer instead of per packet
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.timeout.connect(self.refresh_counts)
 
     #
     # convert a string of binary bytes to ascii hex
@@ -68,98 +105,216 @@ class TelemetrySystem(QDialog, UiTelemetrysystemdialog):
         print("\nPacket: App ID =", hex(app_id))
         print("\nPacket Data:", self.str_to_hex(packet_data))
 
+    #
+    # Read the page list (telemetry-pages.txt) and fill the table
+    #
+    def load_pages(self, tlm_def_file, endian="L"):
+        self.endian = endian
+        # Page table rows (comments removed) from the compiled definition cache
+        for row in TlmDefCache.load(tlm_def_file, "rows"):
+            self.tlm_page_is_valid.append(True)
+            self.tlm_page_desc.append(row[0])
+            self.tlm_class.append(row[1])
+            self.tlm_page_port.append(int(row[2], 16) + 10000)
+            self.tlm_page_appid.append(int(row[2], 16))
+            self.tlm_page_def_file.append(row[3])
+            self.tlm_page_count.append(0)
+
+        #
+        # fill the data fields on the page
+        #
+        tbl = self.tbl_tlm_sys
+        for i, desc in enumerate(self.tlm_page_desc):
+            if self.tlm_page_is_valid[i]:
+                tbl.insertRow(i)
+                for col, text in enumerate(
+                    (desc, hex(self.tlm_page_appid[i]), self.tlm_page_count[i])):
+                    tblItem = QTableWidgetItem(str(text))
+                    tbl.setItem(i, col, tblItem)
+                btn = QPushButton("Display Page")
+                btn.clicked.connect(lambda _, x=i: self.process_button_generic(x))
+                tbl.setCellWidget(i, tbl.columnCount() - 1, btn)
+        tbl.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+        tbl.horizontalHeader().setStretchLastSection(True)
+
     def process_button_generic(self, idx):
-        temp_sub = f"{self.subscription}.{hex(tlm_page_appid[idx])}"
-        if tlm_page_is_valid[idx]:
-            # need to extract data from fields, then start page with right params
-            launch_string = (f'python3 {ROOTDIR}/{tlm_class[idx]} '
-                             f'--title=\"{tlm_page_desc[idx]}\" '
-                             f'--appid={hex(tlm_page_appid[idx])} '
-                             f'--port={tlm_page_port[idx]} '
-                             f'--file={tlm_page_def_file[idx]} '
-                             f'--endian={endian} --sub={temp_sub}')
-            # print(launch_string)
-            cmd_args = shlex.split(launch_string)
-            subprocess.Popen(cmd_args)
+        if not self.tlm_page_is_valid[idx]:
+            return
+        if tlm_pages_mode == "process" or not self.open_page(idx):
+            self.launch_page_process(idx)
+
+    #
+    # Show the page for table row idx inside this process. Pages are
+    # created on first use and fed by this page's receiver, so opening
+    # one costs no interpreter start-up and no extra subscriber.
+    # Returns False for page types that can only run as a process, and
+    # for pages that fail to build (bad definition file, ...): an exception
+    # here would take down this process (and GroundSystem hosting it),
+    # while a page process only fails on its own.
+    #
+    def open_page(self, idx):
+        page = self.pages.get(idx)
+        if page is None:
+            appid = self.tlm_page_appid[idx]
+            desc = self.tlm_page_desc[idx]
+            try:
+                if self.tlm_class[idx] == "GenericTelemetry.py":
+                    import GenericTelemetry
+                    page = GenericTelemetry.SubsystemTelemetry(desc, hex(appid), self.endian)
+                    page.load_definition(f"{ROOTDIR}/{self.tlm_page_def_file[idx]}")
+                elif self.tlm_class[idx] == "EventMessage.py":
+                    import EventMessage
+                    page = EventMessage.EventMessageTelemetry(hex(appid), desc)
+                else:
+                    return False
+            except Exception as e:
+                print(f"[TLM] page '{desc}' could not be opened in-process ({e}), starting a process")
+                if page is not None:
+                    page.deleteLater()
+                return False
+            page.setWindowTitle(f"{desc} for: {self.subscription}.{hex(appid)}")
+            page.finished.connect(lambda _, x=idx: self.close_page(x))
+            self.pages[idx] = page
+            self.page_streams.setdefault(appid, []).append(page)
+        page.show()
+        page.raise_()
+        page.activateWindow()
+        return True
+
+    def close_page(self, idx):
+        page = self.pages.pop(idx, None)
+        if page is None:
+            return
+        appid = self.tlm_page_appid[idx]
+        streams = self.page_streams.get(appid, [])
+        if page in streams:
+            streams.remove(page)
+        if not streams:
+            self.page_streams.pop(appid, None)
+            self.stream_batches.pop(appid, None)
+        page.deleteLater()
+
+    # Start the page as its own process (subscribes on its own)
+    def launch_page_process(self, idx):
+        temp_sub = f"{self.subscription}.{hex(self.tlm_page_appid[idx])}"
+        # need to extract data from fields, then start page with right params
+        launch_string = (f'python3 {ROOTDIR}/{self.tlm_class[idx]} '
+                         f'--title=\"{self.tlm_page_desc[idx]}\" '
+                         f'--appid={hex(self.tlm_page_appid[idx])} '
+                         f'--port={self.tlm_page_port[idx]} '
+                         f'--file={self.tlm_page_def_file[idx]} '
+                         f'--endian={self.endian} --sub={temp_sub}')
+        # print(launch_string)
+        cmd_args = shlex.split(launch_string)
+        subprocess.Popen(cmd_args)
 
     # Start the telemetry receiver (see TSTlmReceiver class)
     def init_ts_tlm_receiver(self, subscr):
         self.setWindowTitle(f'Telemetry System page for: {subscr}')
         self.subscription = subscr
+        self.appid_rows = {}
+        for row, appid in enumerate(self.tlm_page_appid):
+            self.appid_rows.setdefault(appid, []).append(row)
+        self.refresh_timer.start(GUI_REFRESH_MS)
         self.thread = TSTlmReceiver(subscr)
-        self.thread.ts_signal_tlm_datagram.connect(self.process_pending_datagrams)
+        self.thread.connect_batches(self.process_pending_datagrams, with_times=True)
         self.thread.finished.connect(self.thread.deleteLater)
         self.thread.start()
 
     #
     # This method processes packets.
-    # Called when the TelemetryReceiver receives a message/packet
+    # Called with a batch of packets (and their receive times) when the
+    # TelemetryReceiver hands them over; only the counters are updated
+    # here (see refresh_counts)
     #
-    def process_pending_datagrams(self, datagram):
-        #
-        # Show number of packets received
-        #
-        self.pkt_count += 1
-        self.packet_count.setValue(self.pkt_count)
-        # sendSocket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-
-        #
-        # Decode the packet and forward it to the
-        # correct port (if there is one)
-        #
-        stream_id = unpack(">H", datagram[:2])
-
-        # Uncomment the next two lines to debug
-        # print("Packet ID =", hex(stream_id[0]))
-        # self.dumpPacket(datagram)
-        for l in range(self.tbl_tlm_sys.rowCount()):
-            if stream_id[0] == tlm_page_appid[l]:
-                # send_host = "127.0.0.1"
-                # send_port = tlmPagePort[l]
-                # sendSocket.sendto(datagram, (send_host, send_port))
-
-                tlm_page_count[l] += 1
-                # I wish I knew a better way to update the count field
-                # in the GUI. Maybe store a pointer to the field in the gui
-                self.tbl_tlm_sys.item(l, 2).setText(str(tlm_page_count[l]))
-
-                # Unclear why line 15 is skipped. Removing for now, need
-                # to evaluate long term (lbleier 06/01/2020)
-                # if l < 15:
-                #     self.tblTlmSys.item(l, 2).setText(str(tlmPageCount[l]))
-                # else:
-                #     self.tblTlmSys.item(l + 1, 2).setText(str(tlmPageCount[l]))
-
-    # Reimplements closeEvent
-    # to properly quit the thread
-    # and close the window
-    def closeEvent(self, event):
-        self.thread.runs = False
-        self.thread.wait(2000)
-        super().closeEvent(event)
-
-
-# Subscribes and receives zeroMQ messages
-class TSTlmReceiver(QThread):
-    # Setup signal to communicate with front-end GUI
-    ts_signal_tlm_datagram = pyqtSignal(bytes)
+    def process_pending_datagrams(self, datagrams, stamps):
+        self.pkt_count += len(datagrams)
+        appid_rows = self.appid_rows
+        page_streams = self.page_streams
+        tlm_page_count = self.tlm_page_count
+        for datagram, t_ns in zip(datagrams, stamps):
+            #
+            # Decode the packet and count it on the matching page rows
+            #
+            stream_id = (datagram[0] << 8) | datagram[1]
+
+            # Uncomment the next two lines to debug
+            # print("Packet ID =", hex(stream_id))
+            # self.dumpPacket(datagram)
+            rows = appid_rows.get(stream_id)
+            if rows is not None:
+                for l in rows:
+                    tlm_page_count[l] += 1
+                self.dirty_rows.update(rows)
+
+            #
+            # Dispatch to the open in-process pages of this stream
+            #
+            pages = page_streams.get(stream_id)
+            if pages is not None:
+                batch = self.stream_batches.get(stream_id)
+                if batch is None:
+                    batch = self.stream_batches[stream_id] = ([], [])
+                batch[0].append(datagram)
+                batch[1].append(t_ns)
+                for page in pages:
+                    if not page.latest_only:
+                        page.process_pending_datagrams(datagram)
 
+    #
+    # Push the counters to the widgets (QTimer, ~10 Hz)
+    #
+    def refresh_counts(self):
+        if self.pkt_count != self.shown_pkt_count:
+            self.shown_pkt_count = self.pkt_count
+            self.packet_count.setValue(self.pkt_count)
+            # Receiver backlog (handed over, not yet processed)
+            self.packet_count.setToolTip(
+                f"queued: {self.thread.queue_depth()}  "
+                f"largest burst: {self.thread.max_batch}")
+        for l in self.dirty_rows:
+            self.tbl_tlm_sys.item(l, 2).setText(str(self.tlm_page_count[l]))
+        self.dirty_rows.clear()
+
+        # Pages showing current values get the packets of the last period
+        # as one batch with their receive times (they decode the newest one
+        # for display and plot them all)
+        for stream_id, (batch, stamps) in self.stream_batches.items():
+            for page in self.page_streams.get(stream_id, ()):
+                if page.latest_only:
+                    page.process_datagram_batch(batch, stamps)
+        self.stream_batches.clear()
+
+    # Reimplements done (reached from close, Esc/reject and accept;
+    # Esc does not go through closeEvent) to stop the refresh timer,
+    # close the hosted pages and quit the thread
+    def done(self, result):
+        self.refresh_timer.stop()
+        for page in list(self.pages.values()):
+            page.close()
+        if self.thread is not None:
+            self.thread.stop()
+        super().done(result)
+
+
+# Subscribes and receives all packets of the subscription (full rate,
+# the page counts every packet)
+class TSTlmReceiver(TlmReceiver):
     def __init__(self, subscr):
-        super().__init__()
-        self.runs = True
+        super().__init__(subscr)
 
-        # Init zeroMQ
-        context = zmq.Context()
-        self.subscriber = context.socket(zmq.SUB)
-        self.subscriber.connect("ipc:///tmp/GroundSystem")
-        self.subscriber.setsockopt_string(zmq.SUBSCRIBE, subscr)
 
-    def run(self):
-        while self.runs:
-            # Receive and read envelope with address
-            _, datagram = self.subscriber.recv_multipart()
-            # Send signal with received packet to front-end/GUI
-            self.ts_signal_tlm_datagram.emit(datagram)
+#
+# Create, fill and show the main page subscribed to subscr
+# (also used by GroundSystem to open it inside its own process)
+#
+def open_telemetry_system(subscr="GroundSystem", tlm_def_file=None, endian="L"):
+    telem = TelemetrySystem()
+    telem.load_pages(tlm_def_file or f"{ROOTDIR}/telemetry-pages.txt", endian)
+    telem.show()
+    telem.raise_()
+    telem.init_ts_tlm_receiver(subscr)
+    return telem
 
 
 #
@@ -167,11 +322,9 @@ class TSTlmReceiver(QThread):
 #
 if __name__ == '__main__':
     #
-    # Init the QT application and the telemetry dialog class
+    # Init the QT application
     #
     app = QApplication(sys.argv)
-    telem = TelemetrySystem()
-    tbl = telem.tbl_tlm_sys
 
     #
     # Set defaults for the arguments
@@ -196,52 +349,9 @@ if __name__ == '__main__':
         subscription = "GroundSystem"
 
     print('Telemetry System started. Subscribed to', subscription)
-    #
-    # Read in the contents of the telemetry packet definition
-    #
-    tlm_page_is_valid, tlm_page_desc, tlm_class, tlm_page_port, \
-    tlm_page_appid, tlm_page_count, tlm_page_def_file = ([] for _ in range(7))
-    i = 0
 
-    with open(tlm_def_file) as tlmfile:
-        reader = csv.reader(tlmfile, skipinitialspace=True)
-        for row in reader:
-            if not row[0].startswith('#'):
-                tlm_page_is_valid.append(True)
-                tlm_page_desc.append(row[0])
-                tlm_class.append(row[1])
-                tlm_page_port.append(int(row[2], 16) + 10000)
-                tlm_page_appid.append(int(row[2], 16))
-                tlm_page_def_file.append(row[3])
-                tlm_page_count.append(0)
-                i += 1
-    #
-    # Mark the remaining values as invalid
     #
-    # for _ in range(i, 21):
-    #     tlmPageAppid.append(0)
-    #     tlmPageIsValid.append(False)
-
+    # Read in the page list and display the page
     #
-    # fill the data fields on the page
-    #
-    for i, desc in enumerate(tlm_page_desc):
-        if tlm_page_is_valid[i]:
-            tbl.insertRow(i)
-            for col, text in enumerate(
-                (desc, hex(tlm_page_appid[i]), tlm_page_count[0])):
-                tblItem = QTableWidgetItem(str(text))
-                tbl.setItem(i, col, tblItem)
-            btn = QPushButton("Display Page")
-            btn.clicked.connect(lambda _, x=i: telem.process_button_generic(x))
-            tbl.setCellWidget(i, tbl.columnCount() - 1, btn)
-    tbl.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
-    tbl.horizontalHeader().setStretchLastSection(True)
-
-    #
-    # Display the page
-    #
-    telem.show()
-    telem.raise_()
-    telem.init_ts_tlm_receiver(subscription)
+    telem = open_telemetry_system(subscription, tlm_def_file, endian)
     sys.exit(app.exec_())
@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+#
+# Live time-series plots for telemetry pages
+#
+# Each plotted field keeps its history in a fixed-size NumPy ring buffer
+# (GS_PLOT_POINTS samples, oldest dropped). The ring is written twice
+# (at i and i + capacity) so the history is always one contiguous slice and
+# never has to be copied to be drawn. A plot draws at most a few points per
+# pixel column: the visible samples are reduced to per-pixel min/max pairs
+# (default) or to one point per pixel with LTTB (GS_PLOT_DOWNSAMPLE=lttb),
+# so a 1M-point history costs a couple of vectorized passes per redraw.
+# New samples only mark a plot dirty; the panel repaints dirty plots on a
+# ~30 fps timer.
+#
+
+import os
+import time
+
+import numpy as np
+from PyQt5.QtCore import QPointF, QRectF, Qt, QTimer
+from PyQt5.QtGui import QColor, QPainter, QPen, QPolygonF
+from PyQt5.QtWidgets import (QComboBox, QHBoxLayout, QLabel, QMenu,
+                             QScrollArea, QVBoxLayout, QWidget)
+
+# Samples kept per plotted field (memory is only touched as it fills)
+PLOT_POINTS = int(os.getenv("GS_PLOT_POINTS", str(1 << 20)))
+# "minmax" (per pixel column envelope) or "lttb"
+PLOT_DOWNSAMPLE = os.getenv("GS_PLOT_DOWNSAMPLE", "minmax").strip().lower()
+# Repaint period of dirty plots (ms), ~30 fps
+PLOT_FRAME_MS = 33
+PLOT_HEIGHT = 140
+
+# Visible time span choices (seconds, None = whole history)
+PLOT_SPANS = (("10 s", 10.0), ("1 min", 60.0), ("10 min", 600.0),
+              ("1 h", 3600.0), ("All", None))
+
+PLOT_COLORS = ("#1f77b4", "#d62728", "#2ca02c", "#ff7f0e", "#9467bd",
+               "#8c564b", "#e377c2", "#17becf")
+
+
+class SeriesRing:
+    def __init__(self, capacity=PLOT_POINTS):
+        self.capacity = max(2, capacity)
+        # Sample p lives at p % capacity and p % capacity + capacity
+        self.t = np.empty(2 * self.capacity)
+        self.v = np.empty(2 * self.capacity)
+        self.count = 0      # samples ever written
+
+    def __len__(self):
+        return min(self.count, self.capacity)
+
+    def extend(self, t, v):
+        cap = self.capacity
+        t = np.asarray(t, dtype=np.float64)
+        v = np.asarray(v, dtype=np.float64)
+        n = len(v)
+        if n > cap:
+            self.count += n - cap
+            t, v, n = t[-cap:], v[-cap:], cap
+        start = self.count % cap
+        first = min(n, cap - start)
+        for buf, src in ((self.t, t), (self.v, v)):
+            buf[start:start + first] = src[:first]
+            buf[start + cap:start + cap + first] = src[:first]
+            rest = n - first
+            if rest:
+                buf[:rest] = src[first:]
+                buf[cap:cap + rest] = src[first:]
+        self.count += n
+
+    #
+    # Chronological (t, v) views of the stored samples (no copy)
+    #
+    def history(self):
+        n = len(self)
+        s = (self.count - n) % self.capacity
+        return self.t[s:s + n], self.v[s:s + n]
+
+
+#
+# Reduce samples in [t0, t1] to a min and a max per pixel column
+#
+def downsample_minmax(t, v, t0, t1, width):
+    lo = np.searchsorted(t, t0, side="left")
+    hi = np.searchsorted(t, t1, side="right")
+    t, v = t[lo:hi], v[lo:hi]
+    if len(t) <= 2 * width:
+        return t, v
+    edges = np.linspace(t0, t1, width + 1)[:-1]
+    starts = np.unique(np.searchsorted(t, edges))
+    starts = starts[starts < len(t)]
+    lows = np.minimum.reduceat(v, starts)
+    highs = np.maximum.reduceat(v, starts)
+    xs = np.repeat(t[starts], 2)
+    ys = np.empty(2 * len(starts))
+    ys[0::2] = lows
+    ys[1::2] = highs
+    return xs, ys
+
+
+#
+# Largest-Triangle-Three-Buckets: keep one representative sample per
+# bucket, n_out samples in total. Long inputs are first cut down to the
+# min and max of 2 * n_out equal chunks (MinMaxLTTB), so the sequential
+# LTTB pass only looks at a few candidates per bucket.
+#
+def downsample_lttb(t, v, t0, t1, n_out):
+    lo = np.searchsorted(t, t0, side="left")
+    hi = np.searchsorted(t, t1, side="right")
+    t, v = t[lo:hi], v[lo:hi]
+    n = len(t)
+    if n <= n_out or n_out < 3:
+        return t, v
+    if n > 4 * n_out:
+        chunks = 2 * n_out
+        size = n // chunks
+        block = v[:size * chunks].reshape(chunks, size)
+        base = np.arange(chunks) * size
+        picked = np.unique(np.concatenate(
+            ([0, n - 1], base + block.argmin(axis=1), base + block.argmax(axis=1))))
+        t, v = t[picked], v[picked]
+        n = len(t)
+    x = (t - t[0]).tolist()
+    y = v.tolist()
+    every = (n - 2) / (n_out - 2)
+    keep = [0]
+    a = 0
+    for i in range(n_out - 2):
+        s = int(i * every) + 1
+        e = int((i + 1) * every) + 1
+        ns, ne = e, min(int((i + 2) * every) + 1, n)
+        if ne <= ns:
+            ns, ne = n - 1, n
+        avg_x = sum(x[ns:ne]) / (ne - ns)
+        avg_y = sum(y[ns:ne]) / (ne - ns)
+        ax, ay = x[a], y[a]
+        best, pick = -1.0, s
+        for j in range(s, e):
+            area = abs((ax - avg_x) * (y[j] - ay) - (ax - x[j]) * (avg_y - ay))
+            if area > best:
+                best, pick = area, j
+        keep.append(pick)
+        a = pick
+    keep.append(n - 1)
+    return t[keep], v[keep]
+
+
+#
+# Build a QPolygonF straight from coordinate arrays
+#
+def make_polyline(xs, ys):
+    n = len(xs)
+    poly = QPolygonF(n)
+    try:
+        ptr = poly.data()
+        ptr.setsize(n * 16)
+        pts = np.frombuffer(ptr, dtype=np.float64).reshape(n, 2)
+        pts[:, 0] = xs
+        pts[:, 1] = ys
+    except (TypeError, ValueError, AttributeError):
+        poly = QPolygonF([QPointF(x, y) for x, y in zip(xs.tolist(), ys.tolist())])
+    return poly
+
+
+class TlmPlot(QWidget):
+    def __init__(self, key, label, color, panel):
+        super().__init__(panel)
+        self.key = key
+        self.label = label
+        self.color = QColor(color)
+        self.panel = panel
+        self.ring = SeriesRing()
+        self.setMinimumHeight(PLOT_HEIGHT)
+        # (sample count, t0, t1, width, height) of the cached polygon
+        self.cache_key = None
+        self.cache = None
+        self.setContextMenuPolicy(Qt.CustomContextMenu)
+        self.customContextMenuRequested.connect(self.show_menu)
+
+    def show_menu(self, pos):
+        menu = QMenu(self)
+        menu.addAction("Stop plotting", lambda: self.panel.remove_plot(self))
+        menu.exec_(self.mapToGlobal(pos))
+
+    def _curve(self, plot_rect, t0, t1):
+        key = (self.ring.count, t0, t1, plot_rect.width(), plot_rect.height())
+        if key == self.cache_key:
+            return self.cache
+        t, v = self.ring.history()
+        width = max(1, int(plot_rect.width()))
+        if PLOT_DOWNSAMPLE == "lttb":
+            xs, ys = downsample_lttb(t, v, t0, t1, width)
+        else:
+            xs, ys = downsample_minmax(t, v, t0, t1, width)
+        curve = None
+        if len(xs):
+            finite = ys[np.isfinite(ys)]
+            vmin, vmax = (float(finite.min()), float(finite.max())) if len(finite) else (0.0, 0.0)
+            if vmax == vmin:
+                vmin, vmax = vmin - 1.0, vmax + 1.0
+            px = plot_rect.left() + (xs - t0) * (plot_rect.width() / max(t1 - t0, 1e-9))
+            py = plot_rect.bottom() - (ys - vmin) * (plot_rect.height() / (vmax - vmin))
+            curve = (make_polyline(px, py), vmin, vmax)
+        self.cache_key, self.cache = key, curve
+        return curve
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        rect = QRectF(self.rect()).adjusted(4, 4, -4, -4)
+        painter.fillRect(rect, QColor("white"))
+        painter.setPen(QColor("#b0b0b0"))
+        painter.drawRect(rect)
+        plot_rect = rect.adjusted(60, 18, -6, -6)
+
+        t0, t1 = self.panel.time_range()
+        curve = self._curve(plot_rect, t0, t1) if t1 > t0 else None
+        painter.setPen(QColor("black"))
+        title = self.label
+        if self.ring.count:
+            title += f"   = {self.ring.history()[1][-1]:g}"
+        painter.drawText(QRectF(rect.left() + 6, rect.top() + 2, rect.width() - 12, 16),
+                         Qt.AlignLeft | Qt.AlignVCenter, title)
+        if curve is not None:
+            poly, vmin, vmax = curve
+            painter.drawText(QRectF(rect.left() + 2, plot_rect.top() - 6, 56, 14),
+                             Qt.AlignRight | Qt.AlignVCenter, f"{vmax:.6g}")
+            painter.drawText(QRectF(rect.left() + 2, plot_rect.bottom() - 8, 56, 14),
+                             Qt.AlignRight | Qt.AlignVCenter, f"{vmin:.6g}")
+            painter.setClipRect(plot_rect.adjusted(-1, -1, 1, 1))
+            painter.setPen(QPen(self.color, 1))
+            painter.drawPolyline(poly)
+        painter.end()
+
+
+class TlmPlotPanel(QWidget):
+    def __init__(self, title, parent=None):
+        super().__init__(parent, Qt.Window)
+        self.setWindowTitle(f"Plots - {title}")
+        self.resize(700, 480)
+        self.plots = {}         # key -> TlmPlot
+        self.dirty = set()
+        self.last_time = None   # newest sample time over all plots
+
+        self.span_box = QComboBox(self)
+        for text, span in PLOT_SPANS:
+            self.span_box.addItem(text, span)
+        self.span_box.setCurrentIndex(1)
+        self.span_box.currentIndexChanged.connect(self.redraw_all)
+        bar = QHBoxLayout()
+        bar.addWidget(QLabel("Span:", self))
+        bar.addWidget(self.span_box)
+        bar.addStretch(1)
+
+        area = QScrollArea(self)
+        area.setWidgetResizable(True)
+        holder = QWidget(area)
+        self.plot_layout = QVBoxLayout(holder)
+        self.plot_layout.addStretch(1)
+        area.setWidget(holder)
+
+        layout = QVBoxLayout(self)
+        layout.addLayout(bar)
+        layout.addWidget(area)
+
+        self.frame_timer = QTimer(self)
+        self.frame_timer.timeout.connect(self.repaint_dirty)
+        self.frame_timer.start(PLOT_FRAME_MS)
+
+    def has_plot(self, key):
+        return key in self.plots
+
+    def add_plot(self, key, label):
+        if key in self.plots:
+            return
+        color = PLOT_COLORS[len(self.plots) % len(PLOT_COLORS)]
+        plot = TlmPlot(key, label, color, self)
+        self.plots[key] = plot
+        self.plot_layout.insertWidget(self.plot_layout.count() - 1, plot)
+
+    def remove_plot(self, plot):
+        self.plots.pop(plot.key, None)
+        self.dirty.discard(plot.key)
+        self.plot_layout.removeWidget(plot)
+        plot.deleteLater()
+        if not self.plots:
+            self.hide()
+
+    def keys(self):
+        return list(self.plots)
+
+    #
+    # Append samples to a plot; it is repainted on the next frame
+    #
+    def append(self, key, t, values):
+        plot = self.plots.get(key)
+        if plot is None or not len(values):
+            return
+        plot.ring.extend(t, values)
+        last = float(t[-1]) if np.ndim(t) else float(t)
+        if self.last_time is None or last > self.last_time:
+            self.last_time = last
+        self.dirty.add(key)
+
+    def time_range(self):
+        t1 = self.last_time if self.last_time is not None else time.time()
+        span = self.span_box.currentData()
+        if span is None:
+            starts = [p.ring.history()[0][0] for p in self.plots.values() if p.ring.count]
+            return (min(starts) if starts else t1 - 1.0), t1
+        return t1 - span, t1
+
+    def repaint_dirty(self):
+        if not self.dirty or not self.isVisible():
+            return
+        # All plots share the time axis, so a new sample moves every plot
+        self.dirty.clear()
+        for plot in self.plots.values():
+            plot.update()
+
+    def redraw_all(self, *_):
+        for plot in self.plots.values():
+            plot.update()
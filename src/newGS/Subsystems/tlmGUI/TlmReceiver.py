@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+#
+# Common telemetry receiver thread for the tlmGUI pages
+#
+# Subscribes to the GroundSystem bus (or reads the same-host shared-memory
+# ring when GS_TLM_TRANSPORT=shm), waits with a timeout so runs=False is
+# observed promptly, drains everything that is queued without blocking and
+# hands it to the GUI thread as one list per wakeup.
+#
+
+import sys
+import time
+from pathlib import Path
+
+import zmq
+from PyQt5.QtCore import QThread, pyqtSignal
+
+# Bus topic helpers live in the newGS folder (two levels up)
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+import TlmShmRing  # noqa: E402
+import TlmTopic  # noqa: E402
+
+BUS_ENDPOINT = "ipc:///tmp/GroundSystem"
+
+# Poll timeout (ms): upper bound on how long stop() waits for the thread
+POLL_TIMEOUT_MS = 100
+# Max datagrams handed to the GUI thread in one signal
+RECV_BATCH_MAX = 1024
+# Idle sleep between shared-memory ring polls (ms)
+RING_IDLE_MS = 2
+
+
+class TlmReceiver(QThread):
+    # Setup signal to communicate with front-end GUI (list of datagrams,
+    # list of their receive times in ns)
+    signal_tlm_datagrams = pyqtSignal(list, list)
+
+    def __init__(self, subscr, stream_id=None, klass=TlmTopic.FULL_CLASS):
+        super().__init__()
+        self.runs = True
+
+        # Counters for queue depth reporting
+        self.received = 0       # datagrams taken off the socket / ring
+        self.consumed = 0       # datagrams handled by the GUI slot
+        self.last_batch = 0     # datagrams found queued on the last wakeup
+        self.max_batch = 0
+
+        # Same-host shared-memory ring if GS_TLM_TRANSPORT=shm, else zeroMQ
+        self.subscriber = None
+        self.ring = TlmShmRing.open_reader_for(subscr, stream_id, klass)
+        if self.ring is None:
+            # One zeroMQ context per process, shared by all receivers
+            self.subscriber = zmq.Context.instance().socket(zmq.SUB)
+            self.subscriber.connect(BUS_ENDPOINT)
+            # Exact spacecraft/stream prefixes, so zeroMQ drops everything else
+            for prefix in TlmTopic.subscription_prefixes(subscr, stream_id, klass=klass):
+                self.subscriber.setsockopt(zmq.SUBSCRIBE, prefix)
+        # Stream-only subscriptions cover every spacecraft, so the stream id
+        # can't be part of the prefix; compare the topic tail here instead
+        self.topic_suffix = TlmTopic.stream_suffix(subscr, stream_id)
+
+    #
+    # Connect a GUI slot taking a list of datagrams (and, with with_times,
+    # the matching list of receive times in ns); the wrapper keeps count of
+    # what the GUI has handled for queue_depth()
+    #
+    def connect_batches(self, slot, with_times=False):
+        def handle(datagrams, stamps):
+            try:
+                if with_times:
+                    slot(datagrams, stamps)
+                else:
+                    slot(datagrams)
+            finally:
+                self.consumed += len(datagrams)
+        self.signal_tlm_datagrams.connect(handle)
+
+    #
+    # Datagrams handed over but not yet handled by the GUI thread
+    #
+    def queue_depth(self):
+        return self.received - self.consumed
+
+    def _delivered(self, batch, stamps):
+        n = len(batch)
+        self.received += n
+        self.last_batch = n
+        if n > self.max_batch:
+            self.max_batch = n
+        self.signal_tlm_datagrams.emit(batch, stamps)
+
+    def run(self):
+        try:
+            if self.ring is not None:
+                self._run_ring()
+            else:
+                self._run_zmq()
+        finally:
+            if self.ring is not None:
+                self.ring.close()
+            if self.subscriber is not None:
+                self.subscriber.close(linger=0)
+
+    def _run_ring(self):
+        while self.runs:
+            batch = self.ring.poll(RECV_BATCH_MAX)
+            if batch:
+                # The ring carries the routing receive time; packets released
+                # by the delivery policy have none and get the current time
+                now = time.time_ns()
+                self._delivered([item[3] for item in batch],
+                                [item[0] or now for item in batch])
+            else:
+                self.msleep(RING_IDLE_MS)
+
+    def _run_zmq(self):
+        poller = zmq.Poller()
+        poller.register(self.subscriber, zmq.POLLIN)
+        recv = self.subscriber.recv_multipart
+        time_ns = time.time_ns
+        suffix = self.topic_suffix
+        while self.runs:
+            # Wait with a timeout so runs=False is observed
+            if not poller.poll(POLL_TIMEOUT_MS):
+                continue
+            # Drain whatever is queued and hand it over as one batch,
+            # stamping each datagram with its own receive time
+            batch = []
+            stamps = []
+            while len(batch) < RECV_BATCH_MAX:
+                try:
+                    topic, datagram = recv(zmq.NOBLOCK)
+                except zmq.Again:
+                    break
+                if suffix is None or topic.endswith(suffix):
+                    batch.append(datagram)
+                    stamps.append(time_ns())
+            if batch:
+                self._delivered(batch, stamps)
+
+    #
+    # Ask the thread to finish and wait for it (returns within one poll timeout)
+    #
+    def stop(self, timeout_ms=2000):
+        self.runs = False
+        self.wait(timeout_ms)
@@ -6,16 +6,20 @@ sample_app_tlm_page.py (Hybrid Matching Version)
 기능:
   1. 1차 매칭: 텍스트 ID (id 컬럼) 일치 여부
   2. 2차 매칭: ID가 깨진 경우, 전송 시간(ts) 기준 2초 내 응답 패킷 매칭
+     (새로 기록된 행만 증분 매칭: id → deque 색인, 수신 시각 정렬 배열 + bisect)
   3. BER 계산: 비트 단위 비교
-  4. 상태 판정: OK / CORRUPTED / LOST
+  4. 상태 판정: OK / CORRUPTED / LOST (RTT 구간이 열려 있는 동안은 PENDING)
 """
 
+import os
 import sys
 import csv
-import io
+import time
+import bisect
 import difflib
+from collections import deque
 from pathlib import Path
-from datetime import datetime, timedelta
+from datetime import datetime
 
 from PyQt5.QtCore import Qt, QTimer
 from PyQt5.QtGui import QColor
@@ -32,6 +36,13 @@ LOG_DIR = PROJECT_ROOT / "log"
 SENT_CSV = LOG_DIR / "sample_app_sent.csv"
 RECV_CSV = LOG_DIR / "sample_app_recv.csv"
 
+# 표시 구간(초): 시작 시 이 구간과 겹치는 로그 세그먼트만 읽고, 이보다 오래된 레코드는 버린다 (0 이면 전체)
+HISTORY_WINDOW_SEC = float(os.getenv("SAMPLE_TLM_WINDOW_SEC", "1800"))
+
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+import log_rotation
+
 # 색상 정의
 COLOR_LOST = QColor(255, 80, 80)       # 빨강 (분실)
 COLOR_OK = QColor(50, 205, 50)         # 녹색 (정상)
@@ -40,6 +51,11 @@ COLOR_GRAY = Qt.darkGray
 
 DISPLAY_TS_FMT = "%H:%M:%S"
 
+# 2차(시간) 매칭 구간(초): 송신 후 이 시간 안에 도착한 수신과 매칭
+RTT_WINDOW_SEC = 2.0
+# 로그 ts 는 초 단위(버림) + 새로고침 주기 → 구간이 끝나고 이만큼 더 기다린 뒤 2차 매칭/LOST 판정
+RTT_CLOSE_GRACE_SEC = 1.0
+
 def _hex_to_bytes(hex_str: str) -> bytes:
     s = (hex_str or "").strip()
     if not s:
@@ -111,29 +127,182 @@ def _mismatch_summary(sent_bytes: bytes, recv_bytes: bytes, limit=64) -> str:
         mismatches.append(f"length mismatch: sent={len(sent_bytes)} bytes, recv={len(recv_bytes)} bytes")
     return "\n".join(mismatches) if mismatches else "No mismatches"
 
-def _read_csv_rows(csv_path: Path):
-    rows = []
-    if not csv_path.exists(): return rows
-    try:
-        with open(csv_path, "r", encoding="utf-8", newline="") as f:
-            content = f.read().replace("\x00", "")
-            sample = content[:2048]
-            try: dialect = csv.Sniffer().sniff(sample, delimiters=",\t;")
-            except: dialect = csv.excel
-            reader = csv.DictReader(io.StringIO(content), dialect=dialect)
-            for row in reader:
-                extras = row.get(None) or []
-                if extras:
-                    if not row.get("payload_hex") and len(extras) >= 1:
-                        row["payload_hex"] = extras[0]
-                    if not row.get("payload_bits") and len(extras) >= 2:
-                        row["payload_bits"] = extras[1]
-                if "text" in row and row["text"]:
-                    row["text"] = row["text"].replace("\x00", "")
-                rows.append(row)
-    except Exception as e:
-        print(f"[ERROR] CSV Read Failed {csv_path}: {e}")
-    return rows
+def _parse_ts(s: str):
+    if not s: return None
+    try: return datetime.strptime(s, "%Y-%m-%d %H:%M:%S")
+    except ValueError: return None
+
+def _fix_row(row: dict) -> dict:
+    """ 헤더보다 값이 많은 행(구버전 로그)의 payload 열 보정, 텍스트 NUL 제거 """
+    extras = row.get(None) or []
+    if extras:
+        if not row.get("payload_hex") and len(extras) >= 1:
+            row["payload_hex"] = extras[0]
+        if not row.get("payload_bits") and len(extras) >= 2:
+            row["payload_bits"] = extras[1]
+    if row.get("text"):
+        row["text"] = row["text"].replace("\x00", "")
+    return row
+
+def _sent_record(row: dict):
+    """ 송신 CSV 행 → 매칭용 레코드 (SAMPLE_APP 명령이 아니면 None) """
+    if row.get("direction") != "sent": return None
+    if "1882" not in (row.get("mid_hex") or "").lower(): return None # Command Filter
+    ts = _parse_ts(row.get("ts"))
+    if not ts: return None
+    row = _fix_row(row)
+    return {"row": row, "ts": ts, "t": ts.timestamp(), "id": row.get("id") or "",
+            "payload": _payload_bytes_from_row(row), "peer": None}
+
+def _recv_record(row: dict):
+    """ 수신 CSV 행 → 매칭용 레코드 (SAMPLE_APP 텔레메트리가 아니면 None) """
+    if row.get("direction") != "recv": return None
+    mid = (row.get("mid_hex") or row.get("sid_hex") or "").lower()
+    if "08a9" not in mid: return None # Telemetry Filter
+    ts = _parse_ts(row.get("ts"))
+    if not ts: return None
+    row = _fix_row(row)
+    return {"row": row, "ts": ts, "t": ts.timestamp(), "id": row.get("id") or "",
+            "payload": _payload_bytes_from_row(row), "peer": None}
+
+def _discard(index: dict, key, rec):
+    """ index[key] deque 에서 rec 제거 (dict 비교가 아닌 동일 객체 기준) """
+    dq = index.get(key)
+    if dq is None: return
+    for i, x in enumerate(dq):
+        if x is rec:
+            del dq[i]
+            break
+    if not dq:
+        del index[key]
+
+class PacketMatcher:
+    """
+    송신/수신 레코드 증분 매칭 (새로 붙은 레코드만 처리, 한 번 맺은 짝은 유지)
+
+    1단계(ID)  : id → 아직 짝이 없는 레코드 deque. 먼저 기록된 쪽이 기다리고,
+                 나중 쪽이 같은 id 의 가장 이른 상대(송신 ts <= 수신 ts)와 매칭
+    2단계(시간): 수신 시각 정렬 배열에서 bisect 로 [송신, 송신 + RTT_WINDOW_SEC] 구간의
+                 가장 이른 미매칭 수신. 송신의 구간이 닫힌 뒤 한 번 수행하고,
+                 이때도 짝이 없으면 LOST. 매칭된 수신은 건너뛰기 포인터로 넘긴다.
+    LOST 로 판정된 송신도 같은 id 의 수신이 늦게 오면 1단계로 매칭된다.
+
+    sent    : 송신 레코드 (표의 행 순서, n = 절대 번호, 행 = n - sent_base)
+    changed : 표시를 다시 그릴 송신 {n: 레코드}
+    """
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self.sent = deque()
+        self.sent_base = 0
+        self.sent_by_id = {}
+        self.recv_by_id = {}
+        # 수신 시각(정렬) / 레코드 / 다음 미매칭 후보의 절대 인덱스, 앞에서 버린 개수
+        self.recv_times = []
+        self.recv_recs = []
+        self.recv_skip = []
+        self.recv_base = 0
+        self.pending = deque()  # 2단계를 기다리는 송신
+        self.changed = {}
+
+    def _next_free(self, i: int) -> int:
+        """ 절대 인덱스 i 부터 첫 미매칭 수신의 절대 인덱스 (경로 압축) """
+        skip, base = self.recv_skip, self.recv_base
+        end = base + len(skip)
+        j = i
+        while j < end and skip[j - base] != j:
+            j = skip[j - base]
+        while i < end and i != j:
+            nxt = skip[i - base]
+            skip[i - base] = j
+            i = nxt
+        return j
+
+    def _pair(self, s: dict, r: dict):
+        s["peer"], r["peer"] = r, s
+        k = r["idx"] - self.recv_base
+        if k >= 0:
+            self.recv_skip[k] = r["idx"] + 1
+        self.changed[s["n"]] = s
+
+    def add_recv(self, r: dict):
+        r["peer"] = None
+        times = self.recv_times
+        r["idx"] = self.recv_base + len(times)
+        # 정렬 유지 (시계가 뒤로 간 행은 직전 시각으로 취급)
+        times.append(max(r["t"], times[-1]) if times else r["t"])
+        self.recv_recs.append(r)
+        self.recv_skip.append(r["idx"])
+        if not r["id"]: return
+        dq = self.sent_by_id.get(r["id"])
+        if dq and dq[0]["t"] <= r["t"]:
+            s = dq.popleft()
+            if not dq: del self.sent_by_id[r["id"]]
+            self._pair(s, r)
+        else:
+            self.recv_by_id.setdefault(r["id"], deque()).append(r)
+
+    def add_sent(self, s: dict):
+        s["peer"], s["final"] = None, False
+        s["n"] = self.sent_base + len(self.sent)
+        self.sent.append(s)
+        self.changed[s["n"]] = s
+        if s["id"]:
+            dq = self.recv_by_id.get(s["id"])
+            # 송신보다 먼저 찍힌 수신은 이후 송신과도 ID 매칭될 수 없음
+            while dq and dq[0]["t"] < s["t"]:
+                dq.popleft()
+            if dq:
+                r = dq.popleft()
+                if not dq: del self.recv_by_id[s["id"]]
+                self._pair(s, r)
+                return
+            if dq is not None:
+                del self.recv_by_id[s["id"]]
+            self.sent_by_id.setdefault(s["id"], deque()).append(s)
+        self.pending.append(s)
+
+    def finalize(self, now: float):
+        """ RTT 구간이 닫힌 송신: 2단계(시간) 매칭, 실패 시 LOST 확정 """
+        limit = now - RTT_WINDOW_SEC - RTT_CLOSE_GRACE_SEC
+        times, base = self.recv_times, self.recv_base
+        while self.pending and self.pending[0]["t"] <= limit:
+            s = self.pending.popleft()
+            s["final"] = True
+            if s["peer"] is not None: continue
+            i = self._next_free(base + bisect.bisect_left(times, s["t"]))
+            if i - base < len(times) and times[i - base] <= s["t"] + RTT_WINDOW_SEC:
+                r = self.recv_recs[i - base]
+                if s["id"]: _discard(self.sent_by_id, s["id"], s)
+                if r["id"]: _discard(self.recv_by_id, r["id"], r)
+                self._pair(s, r)
+            else:
+                self.changed[s["n"]] = s
+
+    def prune(self, oldest: float) -> int:
+        """ oldest 이전 레코드를 버림 → 앞에서 지운 송신(표 행) 수 """
+        n = 0
+        while self.sent and self.sent[0]["t"] < oldest:
+            s = self.sent.popleft()
+            if self.pending and self.pending[0] is s:
+                self.pending.popleft()
+            if s["peer"] is None and s["id"]:
+                _discard(self.sent_by_id, s["id"], s)
+            n += 1
+        self.sent_base += n
+        k = 0
+        recs = self.recv_recs
+        while k < len(recs) and recs[k]["t"] < oldest:
+            r = recs[k]
+            if r["peer"] is None and r["id"]:
+                _discard(self.recv_by_id, r["id"], r)
+            k += 1
+        if k:
+            del self.recv_times[:k], self.recv_recs[:k], self.recv_skip[:k]
+            self.recv_base += k
+        return n
 
 class PacketDetailDialog(QDialog):
     def __init__(self, sent_info, recv_info, parent=None):
@@ -208,7 +377,12 @@ class SampleAppTelemetryDialog(QDialog):
         self.setMinimumSize(1200, 650)
 
         layout = QVBoxLayout(self)
-        self.current_results = []
+
+        # 로그를 이어 읽는 리더 + 증분 매칭 (새로 붙은 행만 파싱/매칭, 표시 구간 밖은 버림)
+        since = (time.time() - HISTORY_WINDOW_SEC) if HISTORY_WINDOW_SEC > 0 else None
+        self.sent_tail = log_rotation.CsvTailReader(SENT_CSV, since)
+        self.recv_tail = log_rotation.CsvTailReader(RECV_CSV, since)
+        self.matcher = PacketMatcher()
 
         info_lbl = QLabel(
             "<b>[하이브리드 매칭 및 정량 평가]</b><br>"
@@ -248,161 +422,109 @@ class SampleAppTelemetryDialog(QDialog):
 
         self.refresh_data()
 
-    def _parse_ts(self, s: str):
-        if not s: return None
-        try: return datetime.strptime(s, "%Y-%m-%d %H:%M:%S")
-        except: return None
+    def _ingest(self, tail, make_record):
+        """ 새로 붙은 행만 레코드로 변환 → (레코드 리스트, 로그가 잘렸는지) """
+        rows, reset = tail.poll()
+        records = []
+        for row in rows:
+            rec = make_record(row)
+            if rec is not None:
+                records.append(rec)
+        return records, reset
 
     def refresh_data(self):
-        sent_rows = _read_csv_rows(SENT_CSV)
-        recv_rows = _read_csv_rows(RECV_CSV)
-
-        # 1. 데이터 전처리 (리스트 변환)
-        sent_list = []
-        for row in sent_rows:
-            if row.get("direction") != "sent": continue
-            if "1882" not in row.get("mid_hex", "").lower(): continue # Command Filter
-            ts = self._parse_ts(row.get("ts"))
-            if not ts: continue
-
-            sent_list.append({
-                "row": row,
-                "ts": ts,
-                "id": row.get("id", ""),
-                "payload": _payload_bytes_from_row(row),
-                "matched": False
-            })
-
-        recv_list = []
-        for row in recv_rows:
-            if row.get("direction") != "recv": continue
-            mid = (row.get("mid_hex") or row.get("sid_hex") or "").lower()
-            if "08a9" not in mid: continue # Telemetry Filter
-            ts = self._parse_ts(row.get("ts"))
-            if not ts: continue
-
-            recv_list.append({
-                "row": row,
-                "ts": ts,
-                "id": row.get("id", ""),
-                "payload": _payload_bytes_from_row(row),
-                "matched": False
-            })
-
-        # 2. 매칭 로직 (Hybrid)
-        results = [] # 최종 출력용 리스트
-
-        # Step A: ID 기반 매칭 (신뢰도 높음)
-        for s in sent_list:
-            if s["matched"]: continue
-            if not s["id"]: continue # ID가 없으면 패스
-
-            for r in recv_list:
-                if r["matched"]: continue
-                # ID가 일치하고, 시간이 같거나 늦은 경우
-                if r["id"] == s["id"] and r["ts"] >= s["ts"]:
-                    s["matched"] = True
-                    r["matched"] = True
-                    results.append((s, r))
-                    break
-        
-        # Step B: 시간 기반 매칭 (ID가 깨진 경우, RTT 윈도우 2초)
-        for s in sent_list:
-            if s["matched"]: continue
-            
-            best_r = None
-            min_diff = 999999
-            
-            for r in recv_list:
-                if r["matched"]: continue
-                
-                # 송신 시간 이후, 2초 이내 도착
-                diff = (r["ts"] - s["ts"]).total_seconds()
-                if 0 <= diff <= 2.0:
-                    if diff < min_diff:
-                        min_diff = diff
-                        best_r = r
-            
-            if best_r:
-                s["matched"] = True
-                best_r["matched"] = True
-                results.append((s, best_r))
-            else:
-                # 매칭 실패 -> Lost
-                results.append((s, None))
-
-        # (옵션) 매칭되지 않은 수신 패킷 (Recv Only) 처리
-        # for r in recv_list:
-        #     if not r["matched"]: results.append((None, r))
-
-        # 3. 정렬 (Sent Time 기준)
-        results.sort(key=lambda x: x[0]["ts"] if x[0] else x[1]["ts"])
-        self.current_results = results
-
-        # 4. 테이블 출력
-        self.table.setRowCount(len(results))
-        for idx, (s, r) in enumerate(results):
-            # Sent Info
-            if s:
-                self.table.setItem(idx, 0, QTableWidgetItem(s["id"]))
-                self.table.setItem(idx, 1, QTableWidgetItem(s["ts"].strftime(DISPLAY_TS_FMT)))
-                self.table.setItem(idx, 2, QTableWidgetItem(s["row"].get("text", "")))
+        now = time.time()
+        m = self.matcher
+
+        # 1. 새로 기록된 행만 읽어 레코드 추가
+        new_sent, sent_reset = self._ingest(self.sent_tail, _sent_record)
+        new_recv, recv_reset = self._ingest(self.recv_tail, _recv_record)
+        if sent_reset or recv_reset:
+            # 한쪽 로그가 잘림 → 남은 레코드로 매칭을 처음부터 다시
+            new_sent = ([] if sent_reset else list(m.sent)) + new_sent
+            new_recv = ([] if recv_reset else list(m.recv_recs)) + new_recv
+            m.clear()
+            self.table.setRowCount(0)
+
+        # 2. 매칭 로직 (Hybrid, 증분): 수신을 먼저 색인해 두고 송신이 ID 로 찾음
+        for r in new_recv:
+            m.add_recv(r)
+        for s in new_sent:
+            m.add_sent(s)
+        m.finalize(now)  # RTT 구간이 닫힌 송신: 시간 매칭 또는 LOST
+        removed = m.prune(now - HISTORY_WINDOW_SEC) if HISTORY_WINDOW_SEC > 0 else 0
+
+        # 3. 테이블 갱신: 표시 구간을 벗어난 앞쪽 행 삭제, 새 행 추가, 바뀐 행만 다시 그림
+        for _ in range(min(removed, self.table.rowCount())):
+            self.table.removeRow(0)
+        self.table.setRowCount(len(m.sent))
+        for n, s in m.changed.items():
+            if n >= m.sent_base:
+                self._show_row(n - m.sent_base, s)
+        m.changed.clear()
+
+    def _show_row(self, idx: int, s: dict):
+        r = s["peer"]
+        # Sent Info
+        self.table.setItem(idx, 0, QTableWidgetItem(s["id"]))
+        self.table.setItem(idx, 1, QTableWidgetItem(s["ts"].strftime(DISPLAY_TS_FMT)))
+        self.table.setItem(idx, 2, QTableWidgetItem(s["row"].get("text", "")))
+
+        # Recv Info
+        if r:
+            self.table.setItem(idx, 3, QTableWidgetItem(r["ts"].strftime(DISPLAY_TS_FMT)))
+            self.table.setItem(idx, 4, QTableWidgetItem(r["row"].get("text", "")))
+        else:
+            self.table.setItem(idx, 3, QTableWidgetItem("-"))
+            self.table.setItem(idx, 4, QTableWidgetItem("-"))
+
+        # RTT & Status
+        status, color, ber_str, sim_str, rtt_str = "-", Qt.black, "-", "-", "-"
+
+        if r:
+            rtt_str = f"{(r['ts'] - s['ts']).total_seconds()*1000:.0f}"
+
+            sent_payload = s["payload"]
+            recv_payload = r["payload"]
+            err_bits, total_bits = _bit_error_stats(sent_payload, recv_payload)
+            similarity = _text_similarity(s["row"].get("text", ""), r["row"].get("text", ""))
+            sim_str = f"{similarity:.2f} %"
+
+            if err_bits == 0:
+                status = "OK"
+                color = COLOR_OK
+                ber_str = "0.00 %"
             else:
-                self.table.setItem(idx, 0, QTableWidgetItem("-")) # Recv Only
-
-            # Recv Info
-            if r:
-                self.table.setItem(idx, 3, QTableWidgetItem(r["ts"].strftime(DISPLAY_TS_FMT)))
-                self.table.setItem(idx, 4, QTableWidgetItem(r["row"].get("text", "")))
-            else:
-                self.table.setItem(idx, 3, QTableWidgetItem("-"))
-                self.table.setItem(idx, 4, QTableWidgetItem("-"))
-
-            # RTT & Status
-            status, color, ber_str, sim_str, rtt_str = "-", Qt.black, "-", "-", "-"
-
-            if s and r:
-                rtt_str = f"{(r['ts'] - s['ts']).total_seconds()*1000:.0f}"
-                
-                sent_payload = s["payload"]
-                recv_payload = r["payload"]
-                err_bits, total_bits = _bit_error_stats(sent_payload, recv_payload)
-                similarity = _text_similarity(s["row"].get("text", ""), r["row"].get("text", ""))
-                sim_str = f"{similarity:.2f} %"
-                
-                if err_bits == 0:
-                    status = "OK"
-                    color = COLOR_OK
-                    ber_str = "0.00 %"
-                else:
-                    status = "CORRUPTED" # 매칭은 됐지만 내용 다름
-                    color = COLOR_CORRUPT
-                    ber = (err_bits / total_bits) * 100 if total_bits > 0 else 0
-                    ber_str = f"{ber:.2f} %"
-            
-            elif s and not r:
-                status = "LOST"
-                color = COLOR_LOST
-            elif not s and r:
-                status = "RECV ONLY"
-                color = COLOR_GRAY
-
-            self.table.setItem(idx, 5, QTableWidgetItem(rtt_str))
-            
-            st_item = QTableWidgetItem(status)
-            st_item.setForeground(color); st_item.setTextAlignment(Qt.AlignCenter)
-            self.table.setItem(idx, 6, st_item)
-            
-            ber_item = QTableWidgetItem(ber_str)
-            ber_item.setTextAlignment(Qt.AlignCenter)
-            self.table.setItem(idx, 7, ber_item)
-
-            sim_item = QTableWidgetItem(sim_str)
-            sim_item.setTextAlignment(Qt.AlignCenter)
-            self.table.setItem(idx, 8, sim_item)
-
+                status = "CORRUPTED" # 매칭은 됐지만 내용 다름
+                color = COLOR_CORRUPT
+                ber = (err_bits / total_bits) * 100 if total_bits > 0 else 0
+                ber_str = f"{ber:.2f} %"
+
+        elif s["final"]:
+            status = "LOST"
+            color = COLOR_LOST
+        else:
+            status = "PENDING" # RTT 구간이 아직 열려 있음
+            color = COLOR_GRAY
+
+        self.table.setItem(idx, 5, QTableWidgetItem(rtt_str))
+
+        st_item = QTableWidgetItem(status)
+        st_item.setForeground(color); st_item.setTextAlignment(Qt.AlignCenter)
+        self.table.setItem(idx, 6, st_item)
+
+        ber_item = QTableWidgetItem(ber_str)
+        ber_item.setTextAlignment(Qt.AlignCenter)
+        self.table.setItem(idx, 7, ber_item)
+
+        sim_item = QTableWidgetItem(sim_str)
+        sim_item.setTextAlignment(Qt.AlignCenter)
+        self.table.setItem(idx, 8, sim_item)
+
+        if self.table.cellWidget(idx, 9) is None:
+            # 행이 위로 밀려도 버튼은 자기 송신 레코드를 가리킴
             detail_btn = QPushButton("상세보기")
-            detail_btn.clicked.connect(lambda _, row_idx=idx: self.open_detail_dialog(row_idx))
+            detail_btn.clicked.connect(lambda _, rec=s: self.open_detail_dialog(rec))
             self.table.setCellWidget(idx, 9, detail_btn)
 
     def reset_all_data(self):
@@ -414,17 +536,19 @@ class SampleAppTelemetryDialog(QDialog):
                       "seq","len","src_ip","src_port","head_hex16","text_hex","bits",
                       "payload_hex","payload_bits"]
             for p in [SENT_CSV, RECV_CSV]:
+                log_rotation.purge(p)
                 with open(p, "w", newline="", encoding="utf-8") as f:
                     csv.writer(f).writerow(header)
+            for tail in (self.sent_tail, self.recv_tail):
+                tail.reopen()
+            self.matcher.clear()
+            self.table.setRowCount(0)
             self.refresh_data()
         except Exception as e:
             QMessageBox.critical(self, "Error", str(e))
 
-    def open_detail_dialog(self, row_idx: int):
-        if row_idx < 0 or row_idx >= len(self.current_results):
-            return
-        sent_info, recv_info = self.current_results[row_idx]
-        dlg = PacketDetailDialog(sent_info, recv_info, self)
+    def open_detail_dialog(self, sent_info: dict):
+        dlg = PacketDetailDialog(sent_info, sent_info["peer"], self)
         dlg.exec_()
 
 if __name__ == "__main__":
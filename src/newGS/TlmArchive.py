@@ -0,0 +1,409 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+TlmArchive.py — 라우팅 경로 텔레메트리 아카이브 (세그먼트 + 시간 인덱스)
+
+RoutingService / downlink_hub 가 받은 모든 데이터그램을 백그라운드 스레드에서
+고정 크기 세그먼트 파일에 append 한다. 핫패스 비용은 bytes 복사 1회 + deque append.
+
+디렉터리 구조 (기본 newGS/log/tlm_archive, 실행 위치와 무관):
+  tlm-<YYYYmmdd-HHMMSS>-<pid>-<seq>.seg   레코드 스트림
+  tlm-....seg.idx                          희소 시간 인덱스 (t_ns, offset) 쌍
+  catalog.jsonl                            봉인된 세그먼트 목록 {seg, t0, t1, records, bytes, streams}
+
+봉인되지 않은 채 남은 세그먼트(기록 프로세스가 비정상 종료)는 다음 writer 가 시작할 때
+훑어서 끝의 잘린 레코드를 잘라내고 catalog 에 올린다 (보존 개수 정리 대상이 됨).
+
+레코드 = 헤더(16B, little-endian) + 페이로드
+  t_ns u64 | host IPv4 u32 | stream id u16 | length u16
+
+조회 (T1~T2, 0x0800):
+  catalog 로 시간/스트림이 겹치는 세그먼트만 고르고 → .idx 이분 탐색으로 T1 오프셋에
+  seek → T2 를 넘을 때까지만 순차 읽기.
+
+  python3 TlmArchive.py --stream 0x0800 --from "2026-10-19 10:00:00" --to "2026-10-19 10:05:00"
+
+환경 변수:
+  GS_ARCHIVE               : 1(기본) 이면 RoutingService 가 아카이브 기록
+  GS_ARCHIVE_DIR           : 저장 위치 (기본 $LOG_DIR/tlm_archive, LOG_DIR 기본은 newGS/log)
+  GS_ARCHIVE_SEG_BYTES     : 세그먼트 크기 상한 (기본 64 MiB)
+  GS_ARCHIVE_INDEX_BYTES   : 인덱스 간격 (기본 64 KiB 마다 1 엔트리)
+  GS_ARCHIVE_MAX_SEGMENTS  : 보존 세그먼트 수 (기본 64, 0 = 무제한)
+  GS_ARCHIVE_QUEUE         : 기록 대기 최대 레코드 수 (넘치면 드랍 카운트)
+"""
+
+import os
+import json
+import time
+import socket
+import argparse
+import threading
+from bisect import bisect_right
+from collections import deque
+from datetime import datetime
+from pathlib import Path
+from struct import Struct
+
+GS_ARCHIVE = os.getenv("GS_ARCHIVE", "1") == "1"
+LOG_DIR = Path(os.getenv("LOG_DIR", str(Path(__file__).resolve().parent / "log")))
+GS_ARCHIVE_DIR = Path(os.getenv("GS_ARCHIVE_DIR", str(LOG_DIR / "tlm_archive")))
+GS_ARCHIVE_SEG_BYTES = int(os.getenv("GS_ARCHIVE_SEG_BYTES", str(64 * 1024 * 1024)))
+GS_ARCHIVE_INDEX_BYTES = int(os.getenv("GS_ARCHIVE_INDEX_BYTES", str(64 * 1024)))
+GS_ARCHIVE_MAX_SEGMENTS = int(os.getenv("GS_ARCHIVE_MAX_SEGMENTS", "64"))
+GS_ARCHIVE_QUEUE = int(os.getenv("GS_ARCHIVE_QUEUE", "200000"))
+
+RECORD = Struct("<QIHH")       # t_ns, host ipv4, stream id, length
+INDEX_ENTRY = Struct("<QQ")    # t_ns, offset
+STREAM_ID = Struct(">H")       # CCSDS primary header (big endian)
+CATALOG = "catalog.jsonl"
+
+
+def _ip_to_u32(host):
+    try:
+        return int.from_bytes(socket.inet_aton(host), "big")
+    except OSError:
+        return 0
+
+
+def _u32_to_ip(value):
+    return socket.inet_ntoa(value.to_bytes(4, "big"))
+
+
+def _read_catalog(root):
+    entries = []
+    try:
+        with open(Path(root) / CATALOG, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    entries.append(json.loads(line))
+                except ValueError:
+                    continue
+    except FileNotFoundError:
+        pass
+    return entries
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except (PermissionError, OSError):
+        return True  # 다른 사용자의 프로세스 등
+    return True
+
+
+def _segment_pid(name):
+    """tlm-<YYYYmmdd>-<HHMMSS>-<pid>-<seq>.seg → pid (형식이 다르면 None)"""
+    parts = name.split("-")
+    try:
+        return int(parts[3]) if len(parts) == 5 else None
+    except ValueError:
+        return None
+
+
+def _summarize_segment(path):
+    """봉인 안 된 세그먼트를 훑어 catalog 항목을 만든다 (끝의 잘린 레코드는 잘라냄)"""
+    buf = Path(path).read_bytes()
+    end = len(buf) - RECORD.size
+    pos = records = 0
+    t0 = t1 = None
+    streams = set()
+    while pos <= end:
+        t_ns, _, sid, length = RECORD.unpack_from(buf, pos)
+        if pos + RECORD.size + length > len(buf):
+            break
+        pos += RECORD.size + length
+        t0 = t_ns if t0 is None else t0
+        t1 = t_ns
+        records += 1
+        streams.add(sid)
+    if pos < len(buf):
+        os.truncate(path, pos)
+        times, offsets = _read_index(path)
+        keep = bisect_right(offsets, pos - 1) if pos else 0
+        if keep < len(offsets):
+            os.truncate(str(path) + ".idx", keep * INDEX_ENTRY.size)
+    if not records:
+        return None
+    return {"seg": Path(path).name, "t0": t0, "t1": t1, "records": records,
+            "bytes": pos, "streams": sorted(streams)}
+
+
+def _write_catalog(root, entries):
+    p = Path(root) / CATALOG
+    tmp = p.with_name(p.name + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        for e in entries:
+            f.write(json.dumps(e) + "\n")
+    os.replace(tmp, p)
+
+
+class TlmArchiveWriter:
+    """
+    append() 는 호출 스레드(라우팅 루프)에서 레코드를 deque 에 넣기만 하고,
+    파일 쓰기/인덱스/봉인은 전용 스레드가 flush_interval 마다 몰아서 처리한다.
+    """
+
+    def __init__(self, root=None, seg_bytes=None, index_bytes=None,
+                 max_segments=None, max_pending=None, flush_interval=0.05):
+        self.root = Path(root) if root is not None else GS_ARCHIVE_DIR
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.seg_bytes = GS_ARCHIVE_SEG_BYTES if seg_bytes is None else int(seg_bytes)
+        self.index_bytes = GS_ARCHIVE_INDEX_BYTES if index_bytes is None else int(index_bytes)
+        self.max_segments = GS_ARCHIVE_MAX_SEGMENTS if max_segments is None else int(max_segments)
+        self.max_pending = GS_ARCHIVE_QUEUE if max_pending is None else int(max_pending)
+        self.flush_interval = float(flush_interval)
+
+        self.records = 0
+        self.dropped = 0
+        self._pending = deque()
+        self._hosts = {}
+        self._seq = 0
+        self._seg = None
+        self._running = True
+        self._wake = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="tlm-archive", daemon=True)
+        self._thread.start()
+
+    # ----- 핫패스 -----
+    def append(self, t_ns, host, datagram):
+        if len(self._pending) >= self.max_pending:
+            self.dropped += 1
+            return
+        self._pending.append((t_ns, host, bytes(datagram)))
+
+    # ----- 기록 스레드 -----
+    def _open_segment(self, t_ns):
+        stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(t_ns / 1e9))
+        while True:
+            # 같은 프로세스의 이전 writer 가 같은 초에 만든 세그먼트는 덮어쓰지 않음
+            self._seq += 1
+            name = f"tlm-{stamp}-{os.getpid()}-{self._seq:04d}.seg"
+            try:
+                self._f = open(self.root / name, "xb")
+                break
+            except FileExistsError:
+                continue
+        self._seg = name
+        self._idx = open(self.root / (name + ".idx"), "wb")
+        self._offset = 0
+        self._next_index = 0
+        self._t0 = t_ns
+        self._t1 = t_ns
+        self._seg_records = 0
+        self._streams = set()
+
+    def _remove(self, seg):
+        for p in (self.root / seg, self.root / (seg + ".idx")):
+            try: p.unlink()
+            except FileNotFoundError: pass
+
+    def _store_catalog(self, entries):
+        """보존 개수를 넘는 오래된 세그먼트를 지우고 catalog 저장"""
+        if self.max_segments > 0 and len(entries) > self.max_segments:
+            for old in entries[:-self.max_segments]:
+                self._remove(old["seg"])
+            entries = entries[-self.max_segments:]
+        _write_catalog(self.root, entries)
+
+    def _seal(self):
+        if self._seg is None:
+            return
+        self._f.close()
+        self._idx.close()
+        entries = _read_catalog(self.root)
+        entries.append({"seg": self._seg, "t0": self._t0, "t1": self._t1,
+                        "records": self._seg_records, "bytes": self._offset,
+                        "streams": sorted(self._streams)})
+        self._store_catalog(entries)
+        self._seg = None
+
+    def _recover_orphans(self):
+        """종료된 프로세스가 봉인하지 못한 세그먼트를 봉인 (빈 것은 삭제)"""
+        entries = _read_catalog(self.root)
+        found = []
+        for name in _active_segments(self.root, entries):
+            pid = _segment_pid(name)
+            if pid is None or pid == os.getpid() or _pid_alive(pid):
+                continue
+            entry = _summarize_segment(self.root / name)
+            if entry is None:
+                self._remove(name)
+            else:
+                found.append(entry)
+        if found:
+            # 봉인 순서 = 시간 순 (보존 정리는 catalog 앞쪽부터)
+            entries = sorted(entries + found, key=lambda e: e["t0"])
+            self._store_catalog(entries)
+            print(f"[ARCHIVE] sealed {len(found)} orphan segment(s)")
+
+    def _write(self, t_ns, host, data):
+        if self._seg is None:
+            self._open_segment(t_ns)
+        elif self._offset >= self.seg_bytes:
+            self._seal()
+            self._open_segment(t_ns)
+        host_u32 = self._hosts.get(host)
+        if host_u32 is None:
+            host_u32 = self._hosts[host] = _ip_to_u32(host)
+        stream_id = STREAM_ID.unpack_from(data)[0] if len(data) >= 2 else 0
+        if self._offset >= self._next_index:
+            self._idx.write(INDEX_ENTRY.pack(t_ns, self._offset))
+            self._next_index = self._offset + self.index_bytes
+        length = min(len(data), 0xFFFF)
+        self._f.write(RECORD.pack(t_ns, host_u32, stream_id, length))
+        self._f.write(data[:length])
+        self._offset += RECORD.size + length
+        self._t1 = t_ns
+        self._seg_records += 1
+        self._streams.add(stream_id)
+        self.records += 1
+
+    def _drain(self):
+        pending = self._pending
+        wrote = False
+        while pending:
+            self._write(*pending.popleft())
+            wrote = True
+        if wrote:
+            self._f.flush()
+            self._idx.flush()
+
+    def _run(self):
+        try:
+            self._recover_orphans()
+        except Exception as e:
+            print(f"[ARCHIVE][ERROR] orphan recovery: {e}")
+        while self._running:
+            self._wake.wait(self.flush_interval)
+            try:
+                self._drain()
+            except Exception as e:
+                print(f"[ARCHIVE][ERROR] {e}")
+        self._drain()
+        self._seal()
+
+    def close(self, timeout=5.0):
+        self._running = False
+        self._wake.set()
+        self._thread.join(timeout)
+
+
+# ===== 조회 =====
+def _active_segments(root, catalog):
+    sealed = {e["seg"] for e in catalog}
+    return sorted(p.name for p in Path(root).glob("tlm-*.seg") if p.name not in sealed)
+
+
+def _read_index(path):
+    try:
+        raw = Path(str(path) + ".idx").read_bytes()
+    except FileNotFoundError:
+        return [], []
+    n = len(raw) // INDEX_ENTRY.size
+    times, offsets = [], []
+    for t_ns, off in INDEX_ENTRY.iter_unpack(raw[:n * INDEX_ENTRY.size]):
+        times.append(t_ns)
+        offsets.append(off)
+    return times, offsets
+
+
+def start_offset(path, t_from):
+    """세그먼트에서 t_from 이전의 마지막 인덱스 지점 (순차 읽기 시작 오프셋)"""
+    times, offsets = _read_index(path)
+    if t_from is not None and times:
+        i = bisect_right(times, t_from) - 1
+        if i > 0:
+            return offsets[i]
+    return 0
+
+
+def end_offset(path, t_to):
+    """세그먼트에서 t_to 이후 첫 인덱스 지점 (그 뒤는 읽을 필요 없음, 모르면 None)"""
+    times, offsets = _read_index(path)
+    if t_to is not None and times:
+        i = bisect_right(times, t_to)
+        if i < len(times):
+            return offsets[i]
+    return None
+
+
+def _scan_segment(path, t_from, t_to, stream_id):
+    with open(path, "rb") as f:
+        f.seek(start_offset(path, t_from))
+        while True:
+            head = f.read(RECORD.size)
+            if len(head) < RECORD.size:
+                return
+            t_ns, host, sid, length = RECORD.unpack(head)
+            data = f.read(length)
+            if len(data) < length:
+                return  # 기록 중인 세그먼트의 끝
+            if t_to is not None and t_ns > t_to:
+                return
+            if t_from is not None and t_ns < t_from:
+                continue
+            if stream_id is not None and sid != stream_id:
+                continue
+            yield t_ns, _u32_to_ip(host), sid, data
+
+
+def segments(root=None, t_from=None, t_to=None, stream_id=None):
+    """[t_from, t_to] 구간/스트림과 겹칠 수 있는 세그먼트 경로 (시간 순, 기록 중인 것 포함)"""
+    root = Path(root) if root is not None else GS_ARCHIVE_DIR
+    catalog = _read_catalog(root)
+    names = []
+    for e in catalog:
+        if t_from is not None and e["t1"] < t_from:
+            continue
+        if t_to is not None and e["t0"] > t_to:
+            continue
+        if stream_id is not None and stream_id not in e.get("streams", ()):
+            continue
+        names.append(e["seg"])
+    names += _active_segments(root, catalog)
+    return [root / name for name in names if (root / name).exists()]
+
+
+def query(root=None, t_from=None, t_to=None, stream_id=None):
+    """[t_from, t_to] (ns) 구간의 레코드를 (t_ns, host, stream_id, data) 로 순서대로 반환"""
+    for path in segments(root, t_from, t_to, stream_id):
+        yield from _scan_segment(path, t_from, t_to, stream_id)
+
+
+def parse_time(text):
+    if text is None:
+        return None
+    try:
+        return int(float(text) * 1e9)
+    except ValueError:
+        return int(datetime.strptime(text, "%Y-%m-%d %H:%M:%S").timestamp() * 1e9)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Query the routed telemetry archive")
+    ap.add_argument("--dir", default=str(GS_ARCHIVE_DIR))
+    ap.add_argument("--from", dest="t_from", help="epoch 초 또는 'YYYY-mm-dd HH:MM:SS'")
+    ap.add_argument("--to", dest="t_to")
+    ap.add_argument("--stream", help="stream id (hex, 예: 0x0800)")
+    ap.add_argument("--dump", action="store_true", help="레코드별 한 줄 출력")
+    args = ap.parse_args()
+
+    stream_id = int(args.stream, 16) if args.stream else None
+    t0 = time.perf_counter()
+    n = nbytes = 0
+    for t_ns, host, sid, data in query(args.dir, parse_time(args.t_from), parse_time(args.t_to), stream_id):
+        n += 1
+        nbytes += len(data)
+        if args.dump:
+            stamp = datetime.fromtimestamp(t_ns / 1e9).strftime("%Y-%m-%d %H:%M:%S.%f")
+            print(f"{stamp} {host} 0x{sid:04X} len={len(data)} {data[:16].hex(' ').upper()}")
+    print(f"[ARCHIVE] {n} records, {nbytes} bytes ({time.perf_counter() - t0:.3f}s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+TlmBroker.py — 독립 프로세스 텔레메트리 버스 (XSUB/XPUB 프록시)
+
+  퍼블리셔(RoutingService, downlink_hub) ──connect──▶ XSUB  ipc:///tmp/GroundSystemIn
+                                                        │  zmq.proxy (C 루프)
+  GUI/아카이브 구독자 ◀──connect── XPUB  ipc:///tmp/GroundSystem (+ 선택적 TCP)
+
+- 기존 구독자는 그대로 ipc:///tmp/GroundSystem 에 접속한다.
+- 퍼블리셔는 GS_BUS_PUB_ENDPOINT(=XSUB 주소)가 설정되면 bind 대신 connect 한다.
+- --sndhwm: 구독자별 송신 큐 상한. --policy drop(기본)이면 느린 구독자 몫만 버리고,
+  block 이면 XPUB_NODROP 으로 프록시가 대기한다(모든 구독자에 역압 — 아카이브 전용 구성에서만 사용).
+- --route: RoutingService(UDP 50001 수신)를 이 프로세스에서 실행해 GUI 프로세스의
+  GIL 경쟁에서 분리한다 (GroundSystem 은 GS_EXTERNAL_HUB=1 로 자체 라우팅을 끈다).
+- 통계: 캡처 소켓으로 구독 토픽별 구독자 수 / 전달 건수를 집계해 주기적으로 출력.
+  (zmq 는 개별 피어의 드랍 수를 노출하지 않으므로 구독 토픽 단위로 집계한다)
+  메시지마다 토픽별 dict 카운트만 올리고, 구독 접두사별 합계는 구독이 바뀔 때와
+  보고 주기에만 펼친다 (메시지당 비용이 구독자 수와 무관).
+"""
+
+import os
+import time
+import signal
+import argparse
+import threading
+from collections import defaultdict
+
+import zmq
+
+import TlmTopic
+
+DEFAULT_IN = os.getenv("GS_BUS_PUB_ENDPOINT", "ipc:///tmp/GroundSystemIn")
+DEFAULT_OUT = os.getenv("GS_BUS_SUB_ENDPOINT", "ipc:///tmp/GroundSystem")
+CAPTURE_ENDPOINT = "inproc://broker-capture"
+
+
+class BrokerStats:
+    """캡처 소켓에서 구독/데이터 메시지를 읽어 토픽 접두사별로 집계"""
+
+    def __init__(self, context):
+        self.sock = context.socket(zmq.SUB)
+        self.sock.setsockopt(zmq.RCVHWM, 100000)
+        self.sock.setsockopt(zmq.SUBSCRIBE, b"")
+        self.sock.connect(CAPTURE_ENDPOINT)
+        self.subscribers = defaultdict(int)   # prefix -> 구독 수
+        self.delivered = defaultdict(int)     # prefix -> 전달 메시지 수
+        self.pending = defaultdict(int)       # topic -> 아직 접두사별로 펼치지 않은 메시지 수
+        self.messages = 0
+        self.bytes = 0
+        self._lock = threading.Lock()
+
+    def run(self):
+        poller = zmq.Poller()
+        poller.register(self.sock, zmq.POLLIN)
+        while True:
+            try:
+                if not poller.poll(500):
+                    continue
+                frames = self.sock.recv_multipart()
+            except zmq.ContextTerminated:
+                break
+            except zmq.ZMQError:
+                break
+            with self._lock:
+                if len(frames) == 1 and frames[0][:1] in (b"\x00", b"\x01"):
+                    # XPUB → XSUB 방향 구독/해지 메시지
+                    prefix = frames[0][1:]
+                    self._expand()   # 구독 수가 바뀌기 전까지의 몫을 먼저 정산
+                    if frames[0][0] == 1:
+                        self.subscribers[prefix] += 1
+                    elif self.subscribers.get(prefix, 0) > 0:
+                        self.subscribers[prefix] -= 1
+                    continue
+                topic = frames[0]
+                self.messages += 1
+                self.bytes += sum(len(f) for f in frames[1:])
+                self.pending[topic] += 1
+
+    def _expand(self):
+        """토픽별 누적 수를 구독 접두사별 전달 수로 펼친다 (구독 변경/보고 시에만)"""
+        if not self.pending:
+            return
+        for prefix, n in self.subscribers.items():
+            if not n:
+                continue
+            total = sum(c for topic, c in self.pending.items() if topic.startswith(prefix))
+            if total:
+                self.delivered[prefix] += total * n
+        self.pending.clear()
+
+    def report(self):
+        with self._lock:
+            self._expand()
+            lines = [f"msgs={self.messages} bytes={self.bytes} topics={sum(1 for v in self.subscribers.values() if v)}"]
+            for prefix, n in sorted(self.subscribers.items()):
+                if n:
+                    name = TlmTopic.describe(prefix)
+                    lines.append(f"  sub[{name}] x{n} delivered={self.delivered.get(prefix, 0)}")
+        return "\n".join(lines)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="GroundSystem telemetry bus broker")
+    ap.add_argument("--in", dest="endpoint_in", default=DEFAULT_IN,
+                    help="XSUB bind (퍼블리셔가 connect)")
+    ap.add_argument("--out", dest="endpoint_out", default=DEFAULT_OUT,
+                    help="XPUB bind (구독자가 connect)")
+    ap.add_argument("--tcp-out", default=os.getenv("BROKER_TCP_OUT", ""),
+                    help="원격 뷰어용 추가 XPUB 주소 (예: tcp://*:5556)")
+    ap.add_argument("--tcp-in", default=os.getenv("BROKER_TCP_IN", ""),
+                    help="원격 퍼블리셔용 추가 XSUB 주소 (예: tcp://*:5555)")
+    ap.add_argument("--sndhwm", type=int, default=int(os.getenv("BROKER_SNDHWM", "10000")),
+                    help="구독자별 송신 큐 상한 (메시지 수)")
+    ap.add_argument("--rcvhwm", type=int, default=int(os.getenv("BROKER_RCVHWM", "100000")))
+    ap.add_argument("--policy", choices=("drop", "block"),
+                    default=os.getenv("BROKER_POLICY", "drop"),
+                    help="느린 구독자 정책")
+    ap.add_argument("--route", action="store_true",
+                    default=os.getenv("BROKER_ROUTE", "0") == "1",
+                    help="RoutingService(UDP→버스)를 브로커 프로세스에서 실행")
+    ap.add_argument("--stats-sec", type=float, default=float(os.getenv("BROKER_STATS_SEC", "10")))
+    args = ap.parse_args()
+
+    context = zmq.Context()
+
+    xsub = context.socket(zmq.XSUB)
+    xsub.setsockopt(zmq.RCVHWM, args.rcvhwm)
+    xsub.bind(args.endpoint_in)
+    if args.tcp_in:
+        xsub.bind(args.tcp_in)
+
+    xpub = context.socket(zmq.XPUB)
+    xpub.setsockopt(zmq.SNDHWM, args.sndhwm)
+    xpub.setsockopt(zmq.XPUB_VERBOSE, 1)
+    if hasattr(zmq, "XPUB_VERBOSER"):
+        xpub.setsockopt(zmq.XPUB_VERBOSER, 1)
+    if args.policy == "block":
+        xpub.setsockopt(zmq.XPUB_NODROP, 1)
+    xpub.bind(args.endpoint_out)
+    if args.tcp_out:
+        xpub.bind(args.tcp_out)
+
+    capture = context.socket(zmq.PUB)
+    capture.setsockopt(zmq.SNDHWM, 100000)
+    capture.bind(CAPTURE_ENDPOINT)
+
+    stats = BrokerStats(context)
+    threading.Thread(target=stats.run, name="broker-stats", daemon=True).start()
+
+    routing = None
+    if args.route:
+        os.environ["GS_BUS_PUB_ENDPOINT"] = args.endpoint_in
+        import RoutingService
+        routing = RoutingService.RoutingService()
+        routing.start()
+
+    def _report():
+        while True:
+            time.sleep(args.stats_sec)
+            print(f"[BROKER][STAT] {time.strftime('%H:%M:%S')} {stats.report()}")
+    if args.stats_sec > 0:
+        threading.Thread(target=_report, name="broker-report", daemon=True).start()
+
+    def _handle(sig, frame):
+        raise SystemExit(0)
+    signal.signal(signal.SIGINT, _handle); signal.signal(signal.SIGTERM, _handle)
+
+    outs = ", ".join(e for e in (args.endpoint_out, args.tcp_out) if e)
+    ins = ", ".join(e for e in (args.endpoint_in, args.tcp_in) if e)
+    print(f"[BROKER] XSUB {ins}  →  XPUB {outs}  (sndhwm={args.sndhwm}, policy={args.policy}, route={args.route})")
+    try:
+        zmq.proxy(xsub, xpub, capture)
+    except (KeyboardInterrupt, SystemExit):
+        pass
+    except zmq.ZMQError as e:
+        print(f"[BROKER] proxy stopped: {e}")
+    finally:
+        if routing is not None:
+            routing.stop()
+        context.destroy(linger=0)
+    print("[BROKER] stopped.")
+
+
+if __name__ == "__main__":
+    main()
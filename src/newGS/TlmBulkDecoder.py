@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+TlmBulkDecoder.py — 아카이브 텔레메트리를 NumPy 구조체 배열로 일괄 디코딩
+
+GUI 페이지(TlmDecoder.PacketDecoder)는 패킷 하나씩 struct 로 푼다. 몇 시간 분량의
+HK 를 분석할 때(예: 공격 구간 동안 SAMPLE_APP 카운터)는 같은 APID 패킷을 모아
+한 번에 푸는 편이 빠르다.
+
+  1) *-tlm.txt 정의 + /tmp/OffsetData 헤더 보정값 → numpy 구조체 dtype
+     (필드별 오프셋/엔디안 지정, itemsize = 마지막 필드 끝)
+  2) TlmArchive 세그먼트의 [T0, T1] 구간(.idx 희소 인덱스로 앞뒤를 자름)만 읽고,
+     길이 필드만 따라가 레코드 시작 오프셋 배열을 만든 뒤
+     헤더(16B)를 한 번에 모아 np 배열로 보고 stream id / 시각 / 길이를 마스크로 거름
+  3) 남은 레코드의 패킷 앞부분(itemsize 바이트)을 팬시 인덱싱 한 번으로 모아
+     구조체 dtype 으로 보기 → 필드별 열(column)
+
+정의보다 짧은 패킷은 건너뛰고 short 로 센다. 필드 이름은 정의 파일의 설명
+(중복되면 "이름 #2" ...).
+
+사용:
+  python3 TlmBulkDecoder.py --def Subsystems/tlmGUI/cfe-es-hk-tlm.txt --stream 0x0800 \\
+      --from "2026-10-19 10:00:00" --to "2026-10-19 11:00:00" --csv es_hk.csv
+  python3 TlmBulkDecoder.py --def ... --stream 0x0800 --npz es_hk.npz   # 열별 배열 저장
+      (npz 키는 필드 이름을 식별자로 바꾼 것, 예: "Command Counter" → Command_Counter)
+
+  코드에서:
+    t_ns, rec = TlmBulkDecoder.decode_archive("…-tlm.txt", 0x0800, t_from=…, t_to=…)
+    rec["Command Counter"]   # numpy 열
+"""
+
+import re
+import csv
+import time
+import argparse
+from struct import Struct
+from datetime import datetime
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+import TlmArchive
+import TlmDecoder
+
+# struct 형식 문자 → numpy 타입 (표준 크기, 정렬 없음)
+NUMPY_CODES = {
+    "b": "i1", "B": "u1", "?": "b1", "c": "S1",
+    "h": "i2", "H": "u2", "i": "i4", "I": "u4", "l": "i4", "L": "u4",
+    "q": "i8", "Q": "u8", "e": "f2", "f": "f4", "d": "f8",
+}
+FORMAT = re.compile(r"^(\d*)([a-zA-Z?])$")
+ENDIAN = {"L": "<", "B": ">", "<": "<", ">": ">"}
+# np.savez 의 인자 이름 (열 이름으로 쓰면 TypeError)
+NPZ_RESERVED = {"file", "args", "kwds", "allow_pickle"}
+
+
+def field_format(field, endian="<"):
+    """TlmField → numpy 형식 문자열 ('<u2', 'S20', ('<u4', (4,)) ...)"""
+    code = f"{field.size}s" if field.code.lower() == "s" else field.code
+    m = FORMAT.match(code)
+    if m is None:
+        raise ValueError(f"{field.desc}: unsupported type {field.code!r}")
+    count, char = int(m.group(1) or 1), m.group(2)
+    if char == "s":
+        return f"S{count}"
+    base = endian + NUMPY_CODES[char]
+    return base if count == 1 else (base, (count,))
+
+
+def build_dtype(fields, endian="<", offset=0):
+    """정의 필드 → 구조체 dtype (필드 오프셋에 헤더 보정값 offset 을 더함)"""
+    endian = ENDIAN.get(endian, endian)
+    names, formats, offsets, seen = [], [], [], {}
+    itemsize = 0
+    for f in fields:
+        fmt = np.dtype(field_format(f, endian))
+        n = seen[f.desc] = seen.get(f.desc, 0) + 1
+        names.append(f.desc if n == 1 else f"{f.desc} #{n}")
+        formats.append(fmt)
+        offsets.append(f.start + offset)
+        itemsize = max(itemsize, f.start + offset + fmt.itemsize)
+    return np.dtype({"names": names, "formats": formats, "offsets": offsets, "itemsize": itemsize})
+
+
+# TlmArchive.RECORD 와 같은 레이아웃 (t_ns, host ipv4, stream id, length)
+RECORD_DTYPE = np.dtype([("t_ns", "<u8"), ("host", "<u4"), ("sid", "<u2"), ("length", "<u2")])
+LENGTH = Struct("<H")
+LENGTH_OFF = 14
+
+
+def record_offsets(buf):
+    """
+    완결된 레코드의 시작 오프셋. 가변 길이라 다음 위치는 앞 레코드의 길이로만 알 수 있으므로
+    이 부분만 순서대로 따라가고 (레코드당 unpack 1회), 헤더 해석/필터/복사는 배열 연산으로 한다.
+    """
+    head_size = TlmArchive.RECORD.size
+    unpack_from = LENGTH.unpack_from
+    last = len(buf) - head_size
+    offs = []
+    append = offs.append
+    pos = 0
+    while pos <= last:
+        append(pos)
+        pos += head_size + unpack_from(buf, pos + LENGTH_OFF)[0]
+    if pos > len(buf):
+        offs.pop()  # 기록 중인 세그먼트의 끝 (잘린 레코드)
+    return np.array(offs, dtype=np.int64)
+
+
+def gather_segment(path, stream_id, itemsize, t_from=None, t_to=None):
+    """
+    세그먼트 한 개에서 stream_id 패킷의 앞 itemsize 바이트를 모은다.
+    → (t_ns int64 배열, (n, itemsize) uint8 배열, 짧아서 뺀 패킷 수)
+    """
+    start = TlmArchive.start_offset(path, t_from)
+    end = TlmArchive.end_offset(path, t_to)
+    with open(path, "rb") as f:
+        f.seek(start)
+        buf = f.read() if end is None else f.read(end - start)
+    empty = np.empty(0, np.int64), np.empty((0, itemsize), np.uint8), 0
+    offs = record_offsets(buf)
+    if not len(offs):
+        return empty
+    arr = np.frombuffer(buf, dtype=np.uint8)
+    head_size = TlmArchive.RECORD.size
+    heads = sliding_window_view(arr, head_size)[offs].view(RECORD_DTYPE).ravel()
+    t_ns = heads["t_ns"].astype(np.int64)
+    keep = heads["sid"] == stream_id
+    if t_from is not None:
+        keep &= t_ns >= t_from
+    if t_to is not None:
+        keep &= t_ns <= t_to
+    fits = heads["length"] >= itemsize
+    short = int(np.count_nonzero(keep & ~fits))
+    keep &= fits
+    if not keep.any():
+        return empty[0], empty[1], short
+    data = offs[keep] + head_size
+    return t_ns[keep], sliding_window_view(arr, itemsize)[data], short
+
+
+def decode_archive(def_file, stream_id, root=None, t_from=None, t_to=None, endian="<", offset=None):
+    """
+    아카이브의 [t_from, t_to] 구간 stream_id 패킷을 def_file 정의로 일괄 디코딩.
+    → (t_ns int64 배열, 구조체 배열). offset 을 주지 않으면 /tmp/OffsetData 값.
+    """
+    if offset is None:
+        offset = TlmDecoder.header_offset()
+    dtype = build_dtype(TlmDecoder.load_definition(def_file), endian, offset)
+    times, chunks = [np.empty(0, np.int64)], [np.empty((0, dtype.itemsize), np.uint8)]
+    for path in TlmArchive.segments(root, t_from, t_to, stream_id):
+        t, raw, _ = gather_segment(path, stream_id, dtype.itemsize, t_from, t_to)
+        times.append(t)
+        chunks.append(raw)
+    raw = np.ascontiguousarray(np.concatenate(chunks))
+    return np.concatenate(times), raw.view(dtype).ravel()
+
+
+def columns(records):
+    """구조체 배열 → {필드 이름: 연속 배열}"""
+    return {name: np.ascontiguousarray(records[name]) for name in records.dtype.names}
+
+
+def npz_columns(t_ns, records):
+    """np.savez 용 {키: 배열}. 필드 이름을 식별자로 바꾸고 t_ns / savez 인자 이름과 겹치지 않게"""
+    out = {"t_ns": t_ns}
+    for name in records.dtype.names:
+        key = re.sub(r"\W+", "_", name).strip("_") or "field"
+        if key in NPZ_RESERVED or key in out:
+            key = f"f_{key}"
+        base, n = key, 1
+        while key in out:
+            n += 1
+            key = f"{base}_{n}"
+        out[key] = np.ascontiguousarray(records[name])
+    return out
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Bulk-decode archived telemetry into NumPy arrays")
+    ap.add_argument("--def", dest="def_file", required=True, help="*-tlm.txt 정의 파일")
+    ap.add_argument("--stream", required=True, help="stream id (hex, 예: 0x0800)")
+    ap.add_argument("--dir", default=str(TlmArchive.GS_ARCHIVE_DIR))
+    ap.add_argument("--from", dest="t_from", help="epoch 초 또는 'YYYY-mm-dd HH:MM:SS'")
+    ap.add_argument("--to", dest="t_to")
+    ap.add_argument("--endian", default="L", help="L | B (정의 파일의 바이트 순서)")
+    ap.add_argument("--offset", type=int, help="헤더 보정값 (기본 /tmp/OffsetData)")
+    ap.add_argument("--csv", help="CSV 로 저장")
+    ap.add_argument("--npz", help="열별 배열을 .npz 로 저장")
+    args = ap.parse_args()
+
+    t0 = time.perf_counter()
+    t_ns, rec = decode_archive(args.def_file, int(args.stream, 16), args.dir,
+                               TlmArchive.parse_time(args.t_from), TlmArchive.parse_time(args.t_to),
+                               args.endian, args.offset)
+    elapsed = time.perf_counter() - t0
+    print(f"[BULK] {len(rec)} packets x {len(rec.dtype.names)} fields, "
+          f"{rec.nbytes / 1e6:.1f} MB ({elapsed:.3f}s)")
+
+    if args.npz:
+        np.savez(args.npz, **npz_columns(t_ns, rec))
+        print(f"[BULK] saved {args.npz}")
+    if args.csv:
+        with open(args.csv, "w", newline="", encoding="utf-8") as f:
+            w = csv.writer(f)
+            w.writerow(["time"] + list(rec.dtype.names))
+            for t, row in zip(t_ns, rec.tolist()):
+                stamp = datetime.fromtimestamp(t / 1e9).strftime("%Y-%m-%d %H:%M:%S.%f")
+                w.writerow([stamp] + [v.decode("utf-8", "ignore").rstrip("\0") if isinstance(v, bytes) else v
+                                      for v in row])
+        print(f"[BULK] saved {args.csv}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+TlmDecoder.py — *-tlm.txt 텔레메트리 정의를 미리 컴파일한 패킷 디코더
+
+GenericTelemetry 페이지는 패킷마다 행별로 포맷 문자열을 만들고 슬라이스 + unpack 을
+반복했다. 여기서는 정의를 한 번 읽어 오프셋 순으로 정렬한 뒤 필드 사이 빈 곳을
+패딩('x')으로 채운 struct.Struct 하나로 묶는다 (필드가 겹치는 곳에서만 Struct 를 나눔).
+패킷당 디코딩은 그룹마다 unpack_from 1회이고, 행별 표시 형식은 formatter 테이블로 둔다.
+
+정의 파일 형식 (tlmGUI/*-tlm.txt, '#' 줄은 주석):
+  설명, 오프셋, 길이, struct 타입, 표시(Dec|Hex|Str|Enm), enum0, enum1, enum2, enum3
+
+오프셋에는 /tmp/OffsetData 의 헤더 보정값을 더한다 (PacketDecoder 의 offset 인자).
+컴파일된 배치는 TlmDefCache 가 정의 파일별로 캐시한다.
+"""
+
+import csv
+import mmap
+from struct import Struct, calcsize, error as StructError
+
+DISPLAY_TYPES = ("Dec", "Hex", "Str", "Enm")
+OFFSET_FILE = "/tmp/OffsetData"
+
+
+def header_offset():
+    """GroundSystem 이 /tmp/OffsetData 에 적어 둔 텔레메트리 헤더 보정값 (없으면 0)"""
+    try:
+        with open(OFFSET_FILE, "rb") as f:
+            b = f.read(1)
+            return b[0] if b else 0
+    except OSError:
+        return 0
+
+
+class OffsetReader:
+    """
+    페이지용 헤더 보정값 읽기. /tmp/OffsetData 가 있으면 mmap 으로 매번 싸게 읽고,
+    없으면(newGS 단독 실행 등) header_offset() 으로 읽는다 (파일이 나중에 생겨도 반영)
+    """
+
+    def __init__(self):
+        self.mm = None
+        try:
+            with open(OFFSET_FILE, "rb") as f:
+                self.mm = mmap.mmap(f.fileno(), 0, prot=mmap.PROT_READ)
+        except (OSError, ValueError):
+            pass  # 없는 파일 / 빈 파일
+
+    def __call__(self):
+        if self.mm is not None:
+            try:
+                return self.mm[0]
+            except ValueError:
+                pass
+        return header_offset()
+
+    def close(self):
+        if self.mm is not None:
+            self.mm.close()
+            self.mm = None
+
+
+class TlmField:
+    __slots__ = ("desc", "start", "size", "code", "display", "enum")
+
+    def __init__(self, desc, start, size, code, display, enum=None):
+        self.desc = desc
+        self.start = start
+        self.size = size
+        self.code = code
+        self.display = display
+        self.enum = enum
+
+
+def load_definition(path):
+    """*-tlm.txt → [TlmField, ...] (파일 순서 = 페이지 행 순서)"""
+    fields = []
+    with open(path) as tlmfile:
+        reader = csv.reader(tlmfile, skipinitialspace=True)
+        for row in reader:
+            if not row or row[0].startswith("#"):
+                continue
+            row = [c.strip() for c in row]
+            enum = row[5:9] if row[4] == "Enm" else None
+            fields.append(TlmField(row[0], int(row[1]), int(row[2]), row[3], row[4], enum))
+    return fields
+
+
+def formatter(field):
+    """표시 형식별 값 → 문자열 변환 함수"""
+    if field.display == "Hex":
+        return hex
+    if field.display == "Str":
+        return lambda v: v.decode("utf-8", "ignore")
+    if field.display == "Enm":
+        enum = field.enum or []
+
+        def fmt_enum(v):
+            try:
+                return enum[int(v)]
+            except (IndexError, ValueError):
+                return str(v)
+        return fmt_enum
+    return str
+
+
+def compile_layout(fields):
+    """
+    필드 목록 → 그룹 배치 [(struct 형식(엔디안 제외), 시작 오프셋, 행 번호 튜플), ...]
+    헤더 보정값/엔디안과 무관하므로 TlmDefCache 에 그대로 저장해 둔다.
+    """
+    layout = []
+    order = sorted(range(len(fields)), key=lambda r: fields[r].start)
+    fmt, rows, base, pos = "", [], None, 0
+    for r in order:
+        f = fields[r]
+        code = f"{f.size}s" if f.code.lower() == "s" else f.code
+        if base is not None and f.start < pos:
+            # 겹치는 필드 → 새 그룹
+            layout.append((fmt, base, tuple(rows)))
+            fmt, rows, base = "", [], None
+        if base is None:
+            base = pos = f.start
+        if f.start > pos:
+            fmt += f"{f.start - pos}x"
+        fmt += code
+        pos = f.start + calcsize("<" + code)
+        rows.append(r)
+    if base is not None:
+        layout.append((fmt, base, tuple(rows)))
+    return layout
+
+
+class PacketDecoder:
+    """
+    정의 한 개를 디코딩하는 객체. groups = [(Struct, 시작 오프셋, 끝 오프셋, 행 번호 튜플), ...]
+    decode() 는 행 순서의 값 리스트를 돌려준다 (패킷이 짧아 못 읽은 행은 None).
+    layout 을 주면 (compile_layout 결과, 캐시) 배치 계산을 건너뛴다.
+    """
+
+    def __init__(self, fields, endian="<", offset=0, layout=None):
+        self.fields = fields
+        self.endian = endian
+        self.offset = offset
+        self.formatters = [formatter(f) for f in fields]
+        self.groups = []
+        if layout is None:
+            layout = compile_layout(fields)
+        for fmt, start, rows in layout:
+            st = Struct(endian + fmt)
+            base = start + offset
+            self.groups.append((st, base, base + st.size, rows))
+
+    def decode(self, datagram):
+        values = [None] * len(self.fields)
+        n = len(datagram)
+        for st, base, end, rows in self.groups:
+            if end <= n:
+                for r, v in zip(rows, st.unpack_from(datagram, base)):
+                    values[r] = v
+            else:
+                # 패킷 끝에 걸친 그룹: 들어오는 필드만 개별로 읽는다
+                for r in rows:
+                    f = self.fields[r]
+                    code = f"{f.size}s" if f.code.lower() == "s" else f.code
+                    try:
+                        values[r] = Struct(self.endian + code).unpack_from(datagram, f.start + self.offset)[0]
+                    except StructError:
+                        pass
+        return values
+
+    def format(self, row, value):
+        return self.formatters[row](value)
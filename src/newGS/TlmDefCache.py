@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+TlmDefCache.py — 텔레메트리/명령 정의 파일 컴파일 캐시
+
+페이지를 열 때마다 *-tlm.txt 를 csv 로 다시 읽고 디코더 배치를 계산하고,
+TelemetrySystem/CommandSystem 은 telemetry-pages.txt, command-pages.txt,
+quick-buttons.txt 를 파싱하고 CommandFiles/ParameterFiles 피클을 연다.
+여기서는 이 결과를 캐시 파일 하나에 모아 두고, 원본 파일의 (mtime, 크기) 가
+같으면 파싱 없이 돌려준다. mtime 만 바뀐 경우(체크아웃 등)에는 내용 해시를 비교해
+같으면 그대로 쓴다.
+
+캐시는 항목별로 따로 피클해 두므로 캐시 파일을 연 뒤에도 실제로 요청된 항목만
+역직렬화한다. 없는/오래된 항목은 요청 시 컴파일해 캐시에 다시 쓴다.
+
+종류(kind):
+  tlm    : *-tlm.txt → (TlmField 목록, TlmDecoder.compile_layout 배치)
+  rows   : 페이지/버튼 표 (csv, '#' 주석 줄 제외) → 행 리스트
+  pickle : CommandFiles/ParameterFiles 의 피클 → 객체
+
+사용:
+  python3 TlmDefCache.py            # Subsystems 아래 정의 파일 전체를 미리 컴파일
+  python3 TlmDefCache.py --check    # 오래된 항목만 보고
+
+환경 변수:
+  GS_DEF_CACHE : 캐시 파일 경로 (기본 newGS/log/GroundSystemDefs.cache, "" 이면 캐시 사용 안 함)
+
+캐시는 피클이므로 다른 사용자가 만들거나 쓸 수 있는 파일은 읽지 않는다
+(소유자가 현재 사용자이고 group/other 쓰기 권한이 없을 때만 역직렬화, 저장은 0600).
+"""
+
+import os
+import csv
+import time
+import stat
+import pickle
+import hashlib
+import argparse
+import threading
+from pathlib import Path
+
+import TlmDecoder
+
+ROOTDIR = Path(__file__).resolve().parent
+GS_DEF_CACHE = os.getenv("GS_DEF_CACHE", str(ROOTDIR / "log" / "GroundSystemDefs.cache"))
+CACHE_VERSION = 1
+
+TLMGUI_DIR = ROOTDIR / "Subsystems" / "tlmGUI"
+CMDGUI_DIR = ROOTDIR / "Subsystems" / "cmdGui"
+
+
+def _load_rows(path):
+    rows = []
+    with open(path) as f:
+        for row in csv.reader(f, skipinitialspace=True):
+            if row and not row[0].startswith("#"):
+                rows.append(row)
+    return rows
+
+
+def _load_tlm(path):
+    fields = TlmDecoder.load_definition(path)
+    return fields, TlmDecoder.compile_layout(fields)
+
+
+def _load_pickle(path):
+    with open(path, "rb") as f:
+        return pickle.load(f)
+
+
+COMPILERS = {
+    "tlm": _load_tlm,
+    "rows": _load_rows,
+    "pickle": _load_pickle,
+}
+
+
+def _trusted(st):
+    """현재 사용자 소유이고 다른 사용자가 쓸 수 없는 일반 파일인지"""
+    if hasattr(os, "getuid") and st.st_uid != os.getuid():
+        return False
+    return stat.S_ISREG(st.st_mode) and not st.st_mode & (stat.S_IWGRP | stat.S_IWOTH)
+
+
+def _digest(path):
+    with open(path, "rb") as f:
+        return hashlib.blake2b(f.read(), digest_size=16).digest()
+
+
+class DefCache:
+    """
+    entries = {(kind, 절대경로): (mtime_ns, size, digest, 피클된 결과)}
+    values  = 이 프로세스에서 이미 역직렬화한 결과
+    """
+
+    def __init__(self, path=GS_DEF_CACHE):
+        self.path = Path(path) if path else None
+        self.entries = None
+        self.values = {}
+        self.dirty = False
+        self._lock = threading.Lock()
+
+    def _open(self):
+        self.entries = {}
+        if self.path is None:
+            return
+        try:
+            fd = os.open(self.path, os.O_RDONLY | getattr(os, "O_NOFOLLOW", 0))
+        except OSError:
+            return
+        with open(fd, "rb") as f:
+            if not _trusted(os.fstat(f.fileno())):
+                print(f"[DEFCACHE][WARN] {self.path}: not owned by this user or writable by others, ignored")
+                return
+            try:
+                version, entries = pickle.load(f)
+            except (OSError, EOFError, ValueError, pickle.UnpicklingError, TypeError):
+                return
+        if version == CACHE_VERSION:
+            self.entries = entries
+
+    def save(self):
+        if self.path is None or not self.dirty:
+            return
+        tmp = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, "O_NOFOLLOW", 0), 0o600)
+            with open(fd, "wb") as f:
+                pickle.dump((CACHE_VERSION, self.entries), f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, self.path)
+            self.dirty = False
+        except OSError as e:
+            print(f"[DEFCACHE][WARN] {self.path}: {e}")
+
+    def _fresh(self, key, st):
+        """캐시 항목이 원본과 같으면 그 항목, 아니면 None"""
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        mtime_ns, size, digest, blob = entry
+        if (mtime_ns, size) == (st.st_mtime_ns, st.st_size):
+            return entry
+        if size == st.st_size and digest == _digest(key[1]):
+            # 내용은 같고 mtime 만 바뀜 → 스탬프만 갱신
+            entry = self.entries[key] = (st.st_mtime_ns, size, digest, blob)
+            self.dirty = True
+            return entry
+        return None
+
+    def get(self, path, kind, save=True):
+        """정의 파일 path 의 kind 컴파일 결과 (캐시가 최신이면 파싱 없이)"""
+        key = (kind, str(Path(path).resolve()))
+        with self._lock:
+            if self.entries is None:
+                self._open()
+            st = os.stat(key[1])
+            entry = self._fresh(key, st)
+            if entry is not None:
+                stamp = entry[:2]
+                cached = self.values.get(key)
+                if cached is not None and cached[0] == stamp:
+                    return cached[1]
+                value = pickle.loads(entry[3])
+            else:
+                value = COMPILERS[kind](key[1])
+                blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+                stamp = (st.st_mtime_ns, st.st_size)
+                self.entries[key] = stamp + (_digest(key[1]), blob)
+                self.dirty = True
+            self.values[key] = (stamp, value)
+            if save:
+                self.save()
+            return value
+
+    def stale(self, path, kind):
+        key = (kind, str(Path(path).resolve()))
+        with self._lock:
+            if self.entries is None:
+                self._open()
+            return self._fresh(key, os.stat(key[1])) is None
+
+
+# 프로세스당 하나
+_CACHE = DefCache()
+
+
+def load(path, kind):
+    return _CACHE.get(path, kind)
+
+
+def tlm_definition(path):
+    """*-tlm.txt → TlmField 목록"""
+    return _CACHE.get(path, "tlm")[0]
+
+
+def decoder(path, endian="<", offset=0):
+    """*-tlm.txt → PacketDecoder (배치 계산 없이 캐시된 layout 사용)"""
+    fields, layout = _CACHE.get(path, "tlm")
+    return TlmDecoder.PacketDecoder(fields, endian, offset, layout)
+
+
+def sources():
+    """미리 컴파일할 정의 파일 목록 [(경로, kind), ...]"""
+    items = [(TLMGUI_DIR / "telemetry-pages.txt", "rows"),
+             (CMDGUI_DIR / "command-pages.txt", "rows"),
+             (CMDGUI_DIR / "quick-buttons.txt", "rows")]
+    # 페이지 표에 실린 정의 파일만 (형식이 다른 *-tlm.txt 도 섞여 있음)
+    for row in _load_rows(TLMGUI_DIR / "telemetry-pages.txt"):
+        if len(row) > 3 and row[1] == "GenericTelemetry.py":
+            items.append((TLMGUI_DIR / row[3], "tlm"))
+    for folder in ("CommandFiles", "ParameterFiles"):
+        # 피클 파일은 확장자 없음 (Parameter.py 가 --file 의 확장자를 떼고 연다)
+        items.extend((p, "pickle") for p in sorted((CMDGUI_DIR / folder).iterdir())
+                     if p.is_file() and not p.suffix)
+    return items
+
+
+def compile_all(check=False):
+    compiled, failed = 0, 0
+    for path, kind in sources():
+        try:
+            if not _CACHE.stale(path, kind):
+                continue
+            if check:
+                print(f"[DEFCACHE] stale: {kind} {path}")
+            else:
+                _CACHE.get(path, kind, save=False)
+            compiled += 1
+        except Exception as e:
+            failed += 1
+            print(f"[DEFCACHE][WARN] {path}: {e}")
+    _CACHE.save()
+    return compiled, failed
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Precompile telemetry/command definitions")
+    ap.add_argument("--check", action="store_true", help="컴파일하지 않고 오래된 항목만 출력")
+    args = ap.parse_args()
+    t0 = time.perf_counter()
+    n, failed = compile_all(args.check)
+    verb = "stale" if args.check else "compiled"
+    print(f"[DEFCACHE] {n} {verb}, {failed} failed, cache={GS_DEF_CACHE} ({time.perf_counter() - t0:.2f}s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+TlmDelivery.py — 스트림별 전달 정책 (full / every N / latest per X ms)
+
+사람이 읽을 수 있는 속도는 몇 Hz 이므로, GUI 로 가는 HK 는 라우팅 단계에서
+솎아 내고 아카이브/분석 소비자는 전체 속도를 그대로 받는다.
+
+전달 클래스:
+  - full     : 모든 패킷 (기존 토픽, class 1)
+  - 그 외    : GS_DELIVERY 로 정의. 퍼블리셔는 패킷을 full 토픽으로 보낸 뒤
+               각 클래스 정책을 통과한 경우에만 해당 클래스 토픽(TlmTopic class 바이트)으로
+               한 번 더 보낸다. 구독자는 어느 클래스를 받을지 고른다 (GS_TLM_CLASS).
+
+GS_DELIVERY 형식 (클래스는 ';' 로 구분, 기본 "gui:*=latest/200,0x808=full"):
+
+  gui:*=latest/200,0x808=full;slow:*=every/10
+
+  *=정책        : 나머지 모든 스트림의 기본 정책
+  0x0808=정책   : 해당 stream id 전용 정책 (이벤트 메시지는 full 권장)
+
+  정책  full        모든 패킷
+        every/N     N 개 중 1개
+        latest/MS   스트림당 MS 밀리초에 최대 1개, 창 안에서 마지막 값을 창이 끝날 때 보냄
+
+구독 측 (tlmGUI):
+  GS_TLM_CLASS  GenericTelemetry / EventMessage 가 구독할 클래스
+                (기본 gui, 미정의이거나 정책을 읽지 못한 클래스면 full)
+                TelemetrySystem 은 패킷 수를 세므로 항상 full 을 받는다.
+"""
+
+import os
+from struct import Struct
+
+import TlmTopic
+
+GS_DELIVERY = TlmTopic.GS_DELIVERY
+GS_TLM_CLASS = os.getenv("GS_TLM_CLASS", "gui").strip()
+
+STREAM_ID = Struct(">H")
+
+FULL, EVERY, LATEST = 0, 1, 2
+
+
+def parse_policy(text):
+    """'full' | 'every/N' | 'latest/MS' → (mode, arg)"""
+    text = text.strip().lower()
+    if text == "full":
+        return FULL, 0
+    kind, _, arg = text.partition("/")
+    if kind == "every" and arg.isdigit() and int(arg) > 0:
+        return EVERY, int(arg)
+    if kind == "latest":
+        try:
+            return LATEST, int(float(arg) * 1_000_000)
+        except ValueError:
+            pass
+    raise ValueError(f"bad delivery policy '{text}'")
+
+
+class DeliveryClass:
+    """
+    하나의 전달 클래스. 스트림 키 (spacecraft, stream_id) 별 상태를 dict 로 유지해
+    패킷당 비용이 O(1) 이다. offer() 가 지금 보낼 데이터를 돌려주거나 None,
+    take_due() 가 창이 끝난 latest 값들을 돌려준다.
+    """
+
+    def __init__(self, name, rules, default=(FULL, 0)):
+        self.name = name
+        self.rules = dict(rules)
+        self.default = default
+        self.topics = {}
+        self._count = {}
+        self._last_sent = {}
+        self._pending = {}
+
+    def policy(self, stream_id):
+        return self.rules.get(stream_id, self.default)
+
+    def topic(self, key):
+        topic = self.topics.get(key)
+        if topic is None:
+            topic = self.topics[key] = TlmTopic.make_topic(key[0], key[1], klass=self.name)
+        return topic
+
+    def offer(self, key, now_ns, datagram):
+        mode, arg = self.policy(key[1])
+        if mode == FULL:
+            return datagram
+        if mode == EVERY:
+            n = self._count.get(key, 0)
+            self._count[key] = n + 1
+            return datagram if n % arg == 0 else None
+        last = self._last_sent.get(key)
+        if last is None or now_ns - last >= arg:
+            self._last_sent[key] = now_ns
+            self._pending.pop(key, None)
+            return datagram
+        # 창 안: 최신 값만 보관 (수신 버퍼는 재사용되므로 복사)
+        self._pending[key] = bytes(datagram)
+        return None
+
+    def take_due(self, now_ns):
+        if not self._pending:
+            return ()
+        due = []
+        for key, data in list(self._pending.items()):
+            if now_ns - self._last_sent[key] >= self.policy(key[1])[1]:
+                self._last_sent[key] = now_ns
+                del self._pending[key]
+                due.append((key, data))
+        return due
+
+
+def load_classes(spec=None):
+    """GS_DELIVERY → [DeliveryClass, ...] (full 제외)"""
+    spec = GS_DELIVERY if spec is None else spec
+    classes = []
+    for part in spec.split(";"):
+        if ":" not in part:
+            continue
+        name, _, body = part.partition(":")
+        name = name.strip()
+        if not name or name == TlmTopic.FULL_CLASS:
+            continue
+        rules, default = {}, (FULL, 0)
+        try:
+            for rule in body.split(","):
+                if "=" not in rule:
+                    continue
+                stream, _, policy = rule.partition("=")
+                stream = stream.strip()
+                if stream == "*":
+                    default = parse_policy(policy)
+                else:
+                    rules[int(stream, 16)] = parse_policy(policy)
+        except ValueError as e:
+            print(f"[DELIVERY][WARN] class '{name}' ignored: {e}")
+            continue
+        classes.append(DeliveryClass(name, rules, default))
+    return classes
+
+
+_loaded_names = None
+
+
+def subscriber_class(klass=None):
+    """
+    구독자가 받을 클래스 이름. 정의되지 않았거나 정책을 읽지 못해 퍼블리셔가 버린
+    클래스(load_classes 경고)면 full — 아무도 보내지 않는 토픽을 구독하지 않도록.
+    """
+    global _loaded_names
+    klass = GS_TLM_CLASS if klass is None else klass
+    if klass == TlmTopic.FULL_CLASS:
+        return klass
+    if _loaded_names is None:
+        _loaded_names = {c.name for c in load_classes()}
+    if klass in _loaded_names:
+        return klass
+    print(f"[DELIVERY][WARN] class '{klass}' is not delivered, subscribing to {TlmTopic.FULL_CLASS}")
+    return TlmTopic.FULL_CLASS
+
+
+def local_class(klass=None):
+    """공유메모리 링 리더처럼 구독자 쪽에서 직접 솎아 낼 때 쓰는 DeliveryClass (full 이면 None)"""
+    name = subscriber_class(klass)
+    for c in load_classes():
+        if c.name == name:
+            return c
+    return None
+
+
+class DeliveryFanout:
+    """퍼블리셔용: 모든 클래스에 패킷을 제시하고 보낼 (topic, data) 를 모은다"""
+
+    def __init__(self, classes=None):
+        self.classes = load_classes() if classes is None else classes
+        # 가장 짧은 latest 창의 절반 (퍼블리셔 루프의 최대 대기 시간으로 사용)
+        windows = [arg for c in self.classes
+                   for mode, arg in [c.default, *c.rules.values()] if mode == LATEST]
+        self.tick = min(windows) / 2e9 if windows else None
+
+    def offer(self, spacecraft, datagram, now_ns):
+        if not self.classes:
+            return ()
+        key = (spacecraft, STREAM_ID.unpack_from(datagram)[0])
+        out = []
+        for c in self.classes:
+            data = c.offer(key, now_ns, datagram)
+            if data is not None:
+                out.append((c.topic(key), data))
+        return out
+
+    def due(self, now_ns):
+        out = []
+        for c in self.classes:
+            for key, data in c.take_due(now_ns):
+                out.append((c.topic(key), data))
+        return out
+
+    def drain(self):
+        """보관 중인 latest 값을 창과 무관하게 모두 꺼낸다 (재생 종료 등)"""
+        out = []
+        for c in self.classes:
+            for key, data in c._pending.items():
+                out.append((c.topic(key), data))
+            c._pending.clear()
+        return out
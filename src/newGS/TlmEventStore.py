@@ -0,0 +1,346 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+TlmEventStore.py — cFS 이벤트 메시지 저장소 (SQLite + FTS5 전문 검색)
+
+EventMessage 페이지는 이벤트를 화면에만 보여 주고 버린다. 라우팅 경로
+(RoutingService, downlink_hub)에서 이벤트 스트림(기본 0x0808)의 데이터그램을
+받아 백그라운드 스레드에서 디코딩하고, 모아서 한 트랜잭션으로 SQLite 에 넣는다.
+본문은 FTS5 색인(events_fts, external content)으로 검색한다.
+
+  events(id, t_ns, sc, app, event_id, type, text)
+    + 인덱스 (t_ns), (app, type, t_ns), UNIQUE (t_ns, app, event_id)
+      (t_ns 는 데이터그램 수신 시각 — 아카이브에도 같은 값이 기록되므로 다시 넣어도 중복되지 않음)
+  events_fts(text)  — content='events', rowid = events.id
+
+검색:
+  python3 TlmEventStore.py --type ERROR --app SAMPLE_APP --text checksum --run jamming
+  python3 TlmEventStore.py --text "table AND load" --from "2026-10-19 10:00:00" --limit 50
+  python3 TlmEventStore.py --import-archive      # TlmArchive 에 남은 이벤트 패킷 중 없는 것만 색인
+
+  --text 는 FTS5 MATCH 문법 (단어, "구문", AND/OR/NOT, 접두어*)
+  --run MODE 는 GroundSystem 이 기록한 공격 구간 (attack_runs.jsonl) 으로 시간 범위를 정한다.
+  --last-run 을 주면 가장 최근 구간만.
+
+환경 변수:
+  GS_EVENT_STORE    : 1(기본) 이면 퍼블리셔가 이벤트를 저장
+  LOG_DIR           : 로그 디렉터리 (기본 newGS/log, 실행 위치와 무관)
+  GS_EVENT_DB       : DB 경로 (기본 $LOG_DIR/events.sqlite)
+  GS_EVENT_STREAMS  : 이벤트 stream id 목록 (기본 "0x808")
+  GS_ATTACK_RUNS    : 공격 구간 기록 파일 (기본 $LOG_DIR/attack_runs.jsonl)
+"""
+
+import os
+import json
+import time
+import sqlite3
+import argparse
+import threading
+from collections import deque
+from datetime import datetime
+from pathlib import Path
+
+import TlmDecoder
+
+LOG_DIR = Path(os.getenv("LOG_DIR", str(Path(__file__).resolve().parent / "log")))
+GS_EVENT_STORE = os.getenv("GS_EVENT_STORE", "1") == "1"
+GS_EVENT_DB = Path(os.getenv("GS_EVENT_DB", str(LOG_DIR / "events.sqlite")))
+GS_EVENT_STREAMS = frozenset(int(s, 16) for s in os.getenv("GS_EVENT_STREAMS", "0x808").split(",") if s.strip())
+GS_ATTACK_RUNS = Path(os.getenv("GS_ATTACK_RUNS", str(LOG_DIR / "attack_runs.jsonl")))
+
+EVENT_TYPES = {1: "DEBUG", 2: "INFORMATION", 3: "ERROR", 4: "CRITICAL"}
+EVENT_TYPE_IDS = {v: k for k, v in EVENT_TYPES.items()}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events(
+    id INTEGER PRIMARY KEY,
+    t_ns INTEGER NOT NULL,
+    sc INTEGER,
+    app TEXT,
+    event_id INTEGER,
+    type INTEGER,
+    text TEXT
+);
+CREATE INDEX IF NOT EXISTS events_t ON events(t_ns);
+CREATE INDEX IF NOT EXISTS events_app_type ON events(app, type, t_ns);
+CREATE VIRTUAL TABLE IF NOT EXISTS events_fts USING fts5(text, content='events', content_rowid='id');
+"""
+UNIQUE_KEY = "CREATE UNIQUE INDEX IF NOT EXISTS events_key ON events(t_ns, app, event_id)"
+
+
+def decode_event(datagram, tlm_offset=0):
+    """EVS 이벤트 패킷 → (app, type, event id, text) (EventMessage 페이지와 같은 배치)"""
+    start_byte = 12 + tlm_offset
+    app_name = bytes(datagram[start_byte:start_byte + 20]).decode('utf-8', 'ignore')
+    event_id = int.from_bytes(datagram[start_byte + 20:start_byte + 22], byteorder='little')
+    event_type = int.from_bytes(datagram[start_byte + 22:start_byte + 24], byteorder='little')
+    event_text = bytes(datagram[start_byte + 32:]).decode('utf-8', 'ignore')
+    return app_name.split("\0")[0], event_type, event_id, event_text.split("\0")[0]
+
+
+def connect(path=None):
+    path = Path(path) if path is not None else GS_EVENT_DB
+    path.parent.mkdir(parents=True, exist_ok=True)
+    db = sqlite3.connect(str(path))
+    db.execute("PRAGMA journal_mode=WAL")
+    db.execute("PRAGMA synchronous=NORMAL")
+    db.executescript(SCHEMA)
+    try:
+        db.execute(UNIQUE_KEY)
+    except sqlite3.IntegrityError:
+        # 키가 없던 DB 에 이미 중복이 있으면 먼저 정리 (FTS 는 다시 색인)
+        with db:
+            db.execute("DELETE FROM events WHERE id NOT IN "
+                       "(SELECT MIN(id) FROM events GROUP BY t_ns, app, event_id)")
+            db.execute("INSERT INTO events_fts(events_fts) VALUES ('rebuild')")
+        db.execute(UNIQUE_KEY)
+    return db
+
+
+def insert_events(db, rows):
+    """
+    rows = [(t_ns, sc, app, event_id, type, text), ...] 를 한 트랜잭션으로 넣고 FTS 색인.
+    이미 있는 (t_ns, app, event_id) 는 건너뛴다. → 새로 넣은 행 수
+    """
+    with db:
+        last = db.execute("SELECT COALESCE(MAX(id), 0) FROM events").fetchone()[0]
+        added = db.executemany("INSERT OR IGNORE INTO events(t_ns, sc, app, event_id, type, text) "
+                               "VALUES (?,?,?,?,?,?)", rows).rowcount
+        db.execute("INSERT INTO events_fts(rowid, text) SELECT id, text FROM events WHERE id > ?", (last,))
+    return added
+
+
+class EventStoreWriter:
+    """
+    append() 는 호출 스레드(라우팅 루프)에서 이벤트 스트림 데이터그램만 골라 deque 에 넣고,
+    디코딩/INSERT 는 전용 스레드가 flush_interval 마다 한 트랜잭션으로 처리한다.
+    """
+
+    def __init__(self, path=None, streams=GS_EVENT_STREAMS, flush_interval=0.5, max_pending=100000):
+        self.path = Path(path) if path is not None else GS_EVENT_DB
+        self.streams = streams
+        self.flush_interval = float(flush_interval)
+        self.max_pending = int(max_pending)
+        self.stored = 0
+        self.dropped = 0
+        self._pending = deque()
+        self._running = True
+        self._wake = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="tlm-events", daemon=True)
+        self._thread.start()
+
+    # ----- 핫패스 -----
+    def append(self, t_ns, spacecraft, datagram):
+        if ((datagram[0] << 8) | datagram[1]) not in self.streams:
+            return
+        if len(self._pending) >= self.max_pending:
+            self.dropped += 1
+            return
+        self._pending.append((t_ns, spacecraft, bytes(datagram)))
+
+    # ----- 기록 스레드 -----
+    def _drain(self, db):
+        if not self._pending:
+            return
+        offset = TlmDecoder.header_offset()
+        rows = []
+        pending = self._pending
+        while pending:
+            t_ns, sc, data = pending.popleft()
+            app, event_type, event_id, text = decode_event(data, offset)
+            rows.append((t_ns, sc, app, event_id, event_type, text))
+        insert_events(db, rows)
+        self.stored += len(rows)
+
+    def _run(self):
+        try:
+            db = connect(self.path)
+        except sqlite3.Error as e:
+            print(f"[EVENTS][ERROR] {self.path}: {e}")
+            return
+        while self._running:
+            self._wake.wait(self.flush_interval)
+            try:
+                self._drain(db)
+            except sqlite3.Error as e:
+                print(f"[EVENTS][ERROR] {e}")
+        try:
+            self._drain(db)
+        finally:
+            db.close()
+
+    def close(self, timeout=5.0):
+        self._running = False
+        self._wake.set()
+        self._thread.join(timeout)
+
+
+# ===== 공격 구간 =====
+def record_run(mode, path=None, t=None):
+    """GroundSystem 이 공격 모드를 바꿀 때마다 한 줄 기록 ("none" = 중지)"""
+    path = Path(path) if path is not None else GS_ATTACK_RUNS
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps({"t": time.time() if t is None else t, "mode": mode}) + "\n")
+
+
+def load_runs(path=None):
+    """attack_runs.jsonl → [(mode, t0_ns, t1_ns | None), ...] (다음 기록 시각까지가 한 구간)"""
+    path = Path(path) if path is not None else GS_ATTACK_RUNS
+    marks = []
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    e = json.loads(line)
+                    marks.append((int(float(e["t"]) * 1e9), str(e["mode"])))
+                except (ValueError, KeyError):
+                    continue
+    except FileNotFoundError:
+        return []
+    marks.sort()
+    runs = []
+    current = None
+    for t, mode in marks:
+        # 같은 모드의 설정만 바뀐 기록은 진행 중 구간을 이어 간다
+        if current is not None and current[0] == mode:
+            continue
+        if current is not None:
+            runs.append((current[0], current[1], t))
+        current = (mode, t) if mode != "none" else None
+    if current is not None:
+        runs.append((current[0], current[1], None))
+    return runs
+
+
+# ===== 검색 =====
+def search(db, text=None, app=None, event_type=None, event_id=None, spacecraft=None,
+           ranges=((None, None),), limit=1000):
+    """
+    조건에 맞는 이벤트를 시간순으로 (t_ns, sc, app, event_id, type, text) 반환.
+    ranges 는 [(t_from_ns | None, t_to_ns | None), ...] (공격 구간 여러 개 등), 합집합.
+    """
+    where, args = [], []
+    if text:
+        source = "events_fts JOIN events e ON e.id = events_fts.rowid"
+        where.append("events_fts MATCH ?")
+        args.append(text)
+    else:
+        source = "events e"
+    if app is not None:
+        where.append("e.app = ?")
+        args.append(app)
+    if event_type is not None:
+        where.append("e.type = ?")
+        args.append(event_type)
+    if event_id is not None:
+        where.append("e.event_id = ?")
+        args.append(event_id)
+    if spacecraft is not None:
+        where.append("e.sc = ?")
+        args.append(spacecraft)
+    spans = []
+    for t_from, t_to in ranges:
+        span = []
+        if t_from is not None:
+            span.append("e.t_ns >= ?")
+            args.append(t_from)
+        if t_to is not None:
+            span.append("e.t_ns < ?")
+            args.append(t_to)
+        if not span:
+            spans = []
+            break
+        spans.append("(" + " AND ".join(span) + ")")
+    if spans:
+        where.append("(" + " OR ".join(spans) + ")")
+    sql = f"SELECT e.t_ns, e.sc, e.app, e.event_id, e.type, e.text FROM {source}"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += " ORDER BY e.t_ns LIMIT ?"
+    args.append(int(limit))
+    return db.execute(sql, args).fetchall()
+
+
+def import_archive(db, root=None):
+    """TlmArchive 에 기록된 이벤트 패킷 중 저장소에 없는 것을 색인 (→ 새로 넣은 수)"""
+    import TlmArchive
+    import TlmTopic
+    offset = TlmDecoder.header_offset()
+    spacecraft = TlmTopic.SpacecraftMap()
+    rows, total = [], 0
+    for stream_id in sorted(GS_EVENT_STREAMS):
+        for t_ns, host, _, data in TlmArchive.query(root, None, None, stream_id):
+            app, event_type, event_id, text = decode_event(data, offset)
+            rows.append((t_ns, spacecraft.assign(host), app, event_id, event_type, text))
+            if len(rows) >= 10000:
+                total += insert_events(db, rows)
+                rows = []
+    if rows:
+        total += insert_events(db, rows)
+    return total
+
+
+def _parse_type(text):
+    if text is None:
+        return None
+    if text.isdigit():
+        return int(text)
+    return EVENT_TYPE_IDS[text.upper()]
+
+
+def main():
+    import TlmArchive
+
+    ap = argparse.ArgumentParser(description="Search stored cFS event messages")
+    ap.add_argument("--db", default=str(GS_EVENT_DB))
+    ap.add_argument("--text", help="FTS5 검색식 (예: checksum, \"table load\", crc*)")
+    ap.add_argument("--app", help="앱 이름 (예: SAMPLE_APP)")
+    ap.add_argument("--type", help="DEBUG | INFORMATION | ERROR | CRITICAL 또는 숫자")
+    ap.add_argument("--eid", type=int, help="event id")
+    ap.add_argument("--sc", type=int, help="spacecraft 번호")
+    ap.add_argument("--from", dest="t_from", help="epoch 초 또는 'YYYY-mm-dd HH:MM:SS'")
+    ap.add_argument("--to", dest="t_to")
+    ap.add_argument("--run", help="공격 모드 구간으로 제한 (예: jamming)")
+    ap.add_argument("--last-run", action="store_true", help="--run 의 가장 최근 구간만")
+    ap.add_argument("--runs-file", default=str(GS_ATTACK_RUNS))
+    ap.add_argument("--limit", type=int, default=200)
+    ap.add_argument("--count", action="store_true", help="결과 수만 출력")
+    ap.add_argument("--import-archive", action="store_true", help="TlmArchive 의 이벤트 패킷을 먼저 색인")
+    args = ap.parse_args()
+
+    db = connect(args.db)
+    if args.import_archive:
+        t0 = time.perf_counter()
+        n = import_archive(db)
+        print(f"[EVENTS] imported {n} events from archive ({time.perf_counter() - t0:.2f}s)")
+
+    t_from, t_to = TlmArchive.parse_time(args.t_from), TlmArchive.parse_time(args.t_to)
+    ranges = [(t_from, t_to)]
+    if args.run:
+        runs = [(t0, t1) for mode, t0, t1 in load_runs(args.runs_file) if mode == args.run]
+        if args.last_run:
+            runs = runs[-1:]
+        if not runs:
+            print(f"[EVENTS] no '{args.run}' run in {args.runs_file}")
+            return
+        # --from/--to 와 공격 구간의 교집합
+        ranges = [(max(x for x in (t0, t_from) if x is not None),
+                   min((x for x in (t1, t_to) if x is not None), default=None))
+                  for t0, t1 in runs]
+
+    limit = 2 ** 62 if args.count else args.limit
+    t0 = time.perf_counter()
+    rows = search(db, args.text, args.app, _parse_type(args.type), args.eid, args.sc, ranges, limit)
+    elapsed = (time.perf_counter() - t0) * 1000
+    if not args.count:
+        for t_ns, sc, app, eid, etype, text in rows:
+            stamp = datetime.fromtimestamp(t_ns / 1e9).strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
+            sc_txt = f"SC{sc} " if sc is not None else ""
+            print(f"{stamp} {sc_txt}{app}-{EVENT_TYPES.get(etype, etype)} Event ID: {eid} : {text}")
+    print(f"[EVENTS] {len(rows)} events ({elapsed:.1f} ms)")
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
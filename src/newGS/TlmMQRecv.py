@@ -20,6 +20,8 @@
 
 import zmq
 
+import TlmTopic
+
 
 #
 # Receive zeroMQ messages (used for debugging only - not used by CFS Ground System)
@@ -31,13 +33,13 @@ def main():
     context = zmq.Context()
     subscriber = context.socket(zmq.SUB)
     subscriber.connect("ipc:///tmp/GroundSystem")
-    subscriber.setsockopt(zmq.SUBSCRIBE, b"GroundSystem")
+    subscriber.setsockopt(zmq.SUBSCRIBE, TlmTopic.subscription_prefix())
 
     while True:
         try:
             # Read envelope with address
             address, contents = subscriber.recv_multipart()
-            print(f"[{address}] {contents}")
+            print(f"[{TlmTopic.describe(address)}] {contents}")
         except KeyboardInterrupt:
             break
 
@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+TlmReplay.py — 기록된 텔레메트리를 GroundSystem 버스로 재생
+
+cFS 없이 TelemetrySystem / GenericTelemetry / EventMessage 를 다시 구동하거나,
+GUI·버스 성능 시험용 부하 발생기로 쓴다. RoutingService 와 같은 토픽(TlmTopic)으로
+퍼블리시하므로 구독자 입장에서는 실제 downlink 와 구분되지 않는다.
+
+입력:
+  - TlmArchive 디렉터리 (기본 newGS/log/tlm_archive)
+  - pcap 파일 (UDP/IPv4, --port 로 TO_LAB 목적지 포트 필터)
+
+속도:
+  --speed 1      기록 시간 간격 그대로
+  --speed 10     10배속
+  --speed max    페이싱 없이 최대 속도
+
+  python3 TlmReplay.py --speed 5 --stream 0x08a9
+  python3 TlmReplay.py --pcap downlink.pcap --port 50001 --speed max --loop 10
+
+퍼블리시 주소: GS_BUS_PUB_ENDPOINT 가 있으면 TlmBroker 에 connect, 없으면
+ipc:///tmp/GroundSystem 을 bind (GroundSystem 의 RoutingService 와 동시에 쓰려면
+run_com.py --broker 구성이나 GS_EXTERNAL_HUB=1 로 실행한다).
+"""
+
+import os
+import time
+import socket
+import argparse
+from struct import Struct
+
+import zmq
+
+import TlmArchive
+import TlmDelivery
+import TlmTopic
+
+BUS_ENDPOINT = "ipc:///tmp/GroundSystem"
+STREAM_ID = Struct(">H")
+
+# 목표 시각까지 남은 시간이 이보다 길면 sleep, 짧으면 busy-wait
+SPIN_NS = 2_000_000
+
+
+# ===== 입력 =====
+def archive_source(root, t_from=None, t_to=None, stream_id=None):
+    for t_ns, host, _, data in TlmArchive.query(root, t_from, t_to, stream_id):
+        yield t_ns, host, data
+
+
+LINK_NULL, LINK_ETHERNET, LINK_RAW, LINK_LINUX_SLL = 0, 1, 101, 113
+
+
+def pcap_source(path, port=None, stream_id=None):
+    """classic pcap 의 UDP/IPv4 페이로드를 (t_ns, src_ip, payload) 로 반환"""
+    with open(path, "rb") as f:
+        raw = f.read()
+    magic = raw[:4]
+    if magic in (b"\xd4\xc3\xb2\xa1", b"\x4d\x3c\xb2\xa1"):
+        endian = "<"
+    elif magic in (b"\xa1\xb2\xc3\xd4", b"\xa1\xb2\x3c\x4d"):
+        endian = ">"
+    else:
+        raise ValueError(f"not a pcap file: {path}")
+    nano = magic in (b"\x4d\x3c\xb2\xa1", b"\xa1\xb2\x3c\x4d")
+    header = Struct(endian + "IHHiIII")
+    linktype = header.unpack_from(raw)[6]
+    rec = Struct(endian + "IIII")
+
+    off = header.size
+    while off + rec.size <= len(raw):
+        ts_sec, ts_frac, incl, _ = rec.unpack_from(raw, off)
+        off += rec.size
+        frame = raw[off:off + incl]
+        off += incl
+
+        if linktype == LINK_ETHERNET:
+            if len(frame) < 14:
+                continue
+            ip, ethertype = 14, (frame[12] << 8) | frame[13]
+            if ethertype == 0x8100 and len(frame) >= 18:
+                ip, ethertype = 18, (frame[16] << 8) | frame[17]
+            if ethertype != 0x0800:
+                continue
+        elif linktype == LINK_LINUX_SLL:
+            if len(frame) < 16 or ((frame[14] << 8) | frame[15]) != 0x0800:
+                continue
+            ip = 16
+        elif linktype == LINK_NULL:
+            ip = 4
+        elif linktype == LINK_RAW:
+            ip = 0
+        else:
+            raise ValueError(f"unsupported pcap link type {linktype}")
+
+        if len(frame) < ip + 20 or frame[ip] >> 4 != 4 or frame[ip + 9] != 17:
+            continue
+        if ((frame[ip + 6] & 0x1F) << 8 | frame[ip + 7]) != 0:
+            continue  # IP 조각 (첫 조각 외) 은 재조립하지 않음
+        udp = ip + (frame[ip] & 0x0F) * 4
+        if len(frame) < udp + 8:
+            continue
+        if port is not None and ((frame[udp + 2] << 8) | frame[udp + 3]) != port:
+            continue
+        ulen = (frame[udp + 4] << 8) | frame[udp + 5]
+        payload = frame[udp + 8:udp + max(ulen, 8)]
+        if len(payload) < 6:
+            continue
+        if stream_id is not None and STREAM_ID.unpack_from(payload)[0] != stream_id:
+            continue
+        t_ns = ts_sec * 1_000_000_000 + (ts_frac if nano else ts_frac * 1000)
+        yield t_ns, socket.inet_ntoa(frame[ip + 12:ip + 16]), payload
+
+
+# ===== 재생 =====
+class Replayer:
+    def __init__(self, endpoint=None, warmup=0.5):
+        self.context = zmq.Context()
+        self.publisher = self.context.socket(zmq.PUB)
+        endpoint = endpoint or os.getenv("GS_BUS_PUB_ENDPOINT", "")
+        if endpoint:
+            self.publisher.connect(endpoint)
+            self.endpoint = f"connect {endpoint}"
+        else:
+            self.publisher.bind(BUS_ENDPOINT)
+            self.endpoint = f"bind {BUS_ENDPOINT}"
+        # zmq slow-joiner: 구독자가 붙을 시간
+        time.sleep(warmup)
+        self._map = TlmTopic.SpacecraftMap()
+        self._delivery = TlmDelivery.DeliveryFanout()
+        self._spacecraft = {}
+        self._topics = {}
+
+    def topic(self, host, data):
+        sc = self._spacecraft.get(host)
+        if sc is None:
+            sc = self._spacecraft[host] = self._map.assign(host)
+            print(f"[REPLAY] {host} -> Spacecraft{sc}")
+        key = (sc, STREAM_ID.unpack_from(data)[0])
+        topic = self._topics.get(key)
+        if topic is None:
+            topic = self._topics[key] = TlmTopic.make_topic(*key)
+        return topic, sc
+
+    def play(self, records, speed=None):
+        """
+        speed=None 이면 최대 속도. 반환: (packets, bytes, wall_s, span_ns, late_max_ns, late_sum_ns)
+        """
+        send = self.publisher.send_multipart
+        perf = time.perf_counter_ns
+        packets = nbytes = 0
+        late_max = late_sum = 0
+        rec_t0 = rec_t1 = None
+        wall_t0 = perf()
+        for t_ns, host, data in records:
+            if rec_t0 is None:
+                rec_t0 = t_ns
+            rec_t1 = t_ns
+            if speed is not None:
+                due = wall_t0 + int((t_ns - rec_t0) / speed)
+                now = perf()
+                if due - now > SPIN_NS:
+                    time.sleep((due - now - SPIN_NS) / 1e9)
+                while perf() < due:
+                    pass
+                late = perf() - due
+                late_sum += late
+                if late > late_max:
+                    late_max = late
+            topic, sc = self.topic(host, data)
+            send([topic, data])
+            # GUI 전달 클래스 (RoutingService 와 같은 정책, 벽시계 기준)
+            now = time.time_ns()
+            for topic, out in self._delivery.offer(sc, data, now):
+                send([topic, out])
+            for topic, out in self._delivery.due(now):
+                send([topic, out])
+            packets += 1
+            nbytes += len(data)
+        for topic, out in self._delivery.drain():
+            send([topic, out])
+        wall = (perf() - wall_t0) / 1e9
+        span = (rec_t1 - rec_t0) if rec_t0 is not None else 0
+        return packets, nbytes, wall, span, late_max, late_sum
+
+    def close(self, linger_ms=1000):
+        self.publisher.close(linger=linger_ms)
+        self.context.term()
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Replay recorded telemetry onto the GroundSystem bus")
+    ap.add_argument("--archive", default=str(TlmArchive.GS_ARCHIVE_DIR), help="TlmArchive 디렉터리")
+    ap.add_argument("--pcap", help="pcap 파일 (지정 시 --archive 대신 사용)")
+    ap.add_argument("--port", type=int, help="pcap UDP 목적지 포트 필터 (예: 50001)")
+    ap.add_argument("--stream", help="stream id 필터 (hex)")
+    ap.add_argument("--from", dest="t_from", help="아카이브 시작 시각 (epoch 초 또는 'YYYY-mm-dd HH:MM:SS')")
+    ap.add_argument("--to", dest="t_to")
+    ap.add_argument("--speed", default="1", help="배속 (1, 10, ...) 또는 max")
+    ap.add_argument("--loop", type=int, default=1, help="반복 횟수 (0 = 무한)")
+    ap.add_argument("--endpoint", help="퍼블리시 주소 (기본: GS_BUS_PUB_ENDPOINT 또는 bus bind)")
+    ap.add_argument("--warmup", type=float, default=0.5, help="구독자 접속 대기 (초)")
+    args = ap.parse_args()
+
+    speed = None if args.speed == "max" else float(args.speed)
+    if speed is not None and speed <= 0:
+        ap.error("--speed must be > 0 or 'max'")
+    stream_id = int(args.stream, 16) if args.stream else None
+
+    def records():
+        if args.pcap:
+            return pcap_source(args.pcap, args.port, stream_id)
+        return archive_source(args.archive, TlmArchive.parse_time(args.t_from),
+                              TlmArchive.parse_time(args.t_to), stream_id)
+
+    rp = Replayer(args.endpoint, args.warmup)
+    print(f"[REPLAY] {args.pcap or args.archive} -> {rp.endpoint} speed={args.speed}")
+    total_pkts = total_bytes = 0
+    total_wall = 0.0
+    n = 0
+    try:
+        while args.loop == 0 or n < args.loop:
+            n += 1
+            pkts, nbytes, wall, span, late_max, late_sum = rp.play(records(), speed)
+            if pkts == 0:
+                print("[REPLAY] no records")
+                break
+            total_pkts += pkts; total_bytes += nbytes; total_wall += wall
+            line = (f"[REPLAY] pass {n}: {pkts} pkts {nbytes / 1e6:.2f} MB in {wall:.3f}s "
+                    f"→ {pkts / max(wall, 1e-9):,.0f} pkt/s {nbytes / 1e6 / max(wall, 1e-9):.2f} MB/s")
+            if speed is not None and span > 0:
+                line += (f" | recorded {span / 1e9:.3f}s, achieved x{span / 1e9 / max(wall, 1e-9):.2f} "
+                         f"(target x{speed:g}), late avg {late_sum / pkts / 1000:.1f}us max {late_max / 1000:.1f}us")
+            print(line)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if n > 1 and total_wall > 0:
+            print(f"[REPLAY] total {total_pkts} pkts in {total_wall:.3f}s "
+                  f"→ {total_pkts / total_wall:,.0f} pkt/s")
+        rp.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+TlmSeqTrack.py — APID 별 CCSDS 시퀀스 카운트 추적 (손실 / 중복 / 순서 뒤바뀜)
+
+라우팅 경로(RoutingService, downlink_hub)에서 패킷마다 14비트 시퀀스 카운트를
+확인해 손실과 재전송을 실시간으로 센다. sample_app_tlm_page 의 CSV 사후 대조 없이
+실험 중에 바로 통계를 볼 수 있다.
+
+(spacecraft, APID) 마다 가장 큰 시퀀스(high)와 최근 WINDOW 개 수신 여부 비트맵을 둔다.
+  bit i = (high - i) 수신 여부
+
+  앞으로 d (1..8191)    gaps += d-1, 비트맵을 d 만큼 밀고 bit0 세팅
+  d = 0 / 비트 세팅됨   duplicates += 1
+  뒤로 d (< WINDOW)     비트가 비어 있으면 late += 1 (앞서 센 gap 하나가 메워짐),
+                        추적 시작 이전 번호면 수신만 센다
+  뒤로 d (>= WINDOW)    stale += 1 (재전송/리플레이 등 창 밖 패킷, high 는 그대로)
+
+  송신측 재시작: 뒤로 간 자리에서 연속 번호가 GS_SEQ_RESET_CONFIRM 개 이어지고,
+  그 구간이 0 근처(RESTART_NEAR_ZERO 이하)에서 시작했거나 창 밖이면 재시작으로
+  확정한다 (resets += 1, 그동안 센 dup/stale 은 되돌리고 그 위치부터 추적).
+  창 안의 연속 구간(리플레이 버스트)은 재시작이 아니다 — dup/late 로 계속 세고
+  high 를 되돌리지 않는다. 창 밖 구간으로 확정한 뒤라도 새 위치가 창 크기만큼
+  진행하기 전에 옛 high 바로 다음 번호가 오면 리플레이였던 것으로 보고 되돌린다
+  (그 사이 패킷은 stale). 한두 개 섞여 들어온 옛 패킷은 high 를 옮기지 않는다.
+
+  → 패킷당 dict 조회 1회 + 정수 연산 몇 번 (O(1)).
+  손실 = gaps - late
+
+통계는 누적 카운터를 GS_SEQ_PUBLISH_SEC 마다 JSON 으로 버스의 상태 토픽
+(TlmTopic.status_topic("seq"), 텔레메트리 구독 접두사와 겹치지 않음)에 퍼블리시한다.
+
+  python3 TlmSeqTrack.py            # 상태 토픽 구독 후 표로 출력
+
+환경 변수:
+  GS_SEQ_TRACK        : 1(기본) 이면 퍼블리셔가 추적/퍼블리시
+  GS_SEQ_WINDOW       : 비트맵 창 크기 (기본 1024 패킷)
+  GS_SEQ_PUBLISH_SEC  : 통계 퍼블리시 주기 (기본 1.0)
+  GS_SEQ_RESET_CONFIRM: 재시작으로 확정할 연속 패킷 수 (기본 4)
+"""
+
+import os
+import json
+import time
+import argparse
+from struct import Struct
+
+import TlmTopic
+
+GS_SEQ_TRACK = os.getenv("GS_SEQ_TRACK", "1") == "1"
+GS_SEQ_WINDOW = int(os.getenv("GS_SEQ_WINDOW", "1024"))
+GS_SEQ_PUBLISH_SEC = float(os.getenv("GS_SEQ_PUBLISH_SEC", "1.0"))
+GS_SEQ_RESET_CONFIRM = int(os.getenv("GS_SEQ_RESET_CONFIRM", "4"))
+
+HEADER = Struct(">HH")      # stream id, sequence flags + count
+SEQ_MOD = 0x4000
+SEQ_HALF = SEQ_MOD // 2
+STATUS_NAME = "seq"
+# 재시작 직후 송신측 카운트는 0 부터 (앞쪽 몇 개가 손실돼도 재시작으로 인정)
+RESTART_NEAR_ZERO = 16
+
+
+class SeqState:
+    __slots__ = ("high", "bits", "span", "received", "gaps", "late", "duplicates", "stale", "resets",
+                 "run_next", "run_len", "run_dup", "run_stale", "run_far", "prev")
+
+    def __init__(self, seq):
+        self.high = seq
+        self.bits = 1
+        self.span = 0       # 첫 패킷 이후 진행한 거리 (창 크기에서 멈춤)
+        self.received = 1
+        self.gaps = self.late = self.duplicates = self.stale = self.resets = 0
+        # 재시작 후보: 뒤로 간 자리에서 이어지는 연속 번호와 그동안 센 값
+        self.run_next = -1
+        self.run_len = self.run_dup = self.run_stale = 0
+        self.run_far = False    # 후보 구간이 창 밖에서 시작했는지
+        # 창 밖 구간으로 재시작을 확정하기 직전 상태 (리플레이로 판명되면 복원)
+        self.prev = None
+
+
+class SeqTracker:
+    """
+    observe() 를 패킷마다 호출하고, due() 가 퍼블리시할 때가 되면 JSON payload 를 돌려준다.
+    한 스레드(라우팅 루프 / 허브 소비자)에서만 쓴다.
+    """
+
+    def __init__(self, window=None, publish_sec=None, reset_confirm=None):
+        self.window = max(1, GS_SEQ_WINDOW if window is None else int(window))
+        self.mask = (1 << self.window) - 1
+        self.publish_ns = int((GS_SEQ_PUBLISH_SEC if publish_sec is None else publish_sec) * 1e9)
+        self.reset_confirm = max(1, GS_SEQ_RESET_CONFIRM if reset_confirm is None else int(reset_confirm))
+        self.streams = {}
+        self._next_publish = 0
+
+    def observe(self, spacecraft, datagram):
+        stream_id, seq = HEADER.unpack_from(datagram)
+        key = (spacecraft, stream_id & 0x7FF)
+        seq &= 0x3FFF
+        st = self.streams.get(key)
+        if st is None:
+            self.streams[key] = SeqState(seq)
+            return
+        st.received += 1
+        if st.prev is not None:
+            self._check_replay(st, seq)
+        d = (seq - st.high) % SEQ_MOD
+        if 0 < d < SEQ_HALF:
+            # 앞으로 진행 (d-1 개 건너뜀)
+            st.gaps += d - 1
+            st.bits = ((st.bits << d) | 1) & self.mask
+            st.high = seq
+            if st.span < self.window:
+                st.span = min(self.window, st.span + d)
+                if st.span >= self.window:
+                    st.prev = None  # 새 위치에서 창만큼 진행 → 재시작 확정 유지
+            st.run_len = 0
+            return
+
+        # 뒤로 간 패킷: 연속 번호면 재시작 후보를 잇고, 아니면 여기서 새로 시작
+        back = (st.high - seq) % SEQ_MOD
+        if st.run_len == 0 or seq != st.run_next:
+            st.run_len = st.run_dup = st.run_stale = 0
+            st.run_far = back >= self.window or seq <= RESTART_NEAR_ZERO
+        st.run_len += 1
+        st.run_next = (seq + 1) % SEQ_MOD
+        if back >= self.window:
+            # 창 밖 (재전송/리플레이) → high 는 그대로
+            st.stale += 1
+            st.run_stale += 1
+        elif back <= st.span:
+            bit = 1 << back
+            if st.bits & bit:
+                st.duplicates += 1
+                st.run_dup += 1
+            else:
+                # 빈 자리를 메운 늦은 패킷 (순서 뒤바뀜, 재시작 후보 아님)
+                st.bits |= bit
+                st.late += 1
+                st.run_len = 0
+                return
+        # else: 추적 시작 이전 번호 (gap 으로 센 적 없음)
+
+        if st.run_len >= self.reset_confirm and st.run_far:
+            # 송신측 재시작 확정: 후보 구간에서 센 값을 되돌리고 그 위치부터 추적
+            if (st.high - seq) % SEQ_MOD >= self.window:
+                st.prev = (st.high, st.bits, st.span, st.gaps, st.late, st.duplicates,
+                           st.stale, st.received)
+            st.resets += 1
+            st.duplicates -= st.run_dup
+            st.stale -= st.run_stale
+            st.high = seq
+            st.span = min(self.window, st.run_len - 1)
+            st.bits = ((1 << st.run_len) - 1) & self.mask
+            st.run_len = 0
+
+    def _check_replay(self, st, seq):
+        """창 밖 재시작 확정 후 옛 high 바로 다음 번호가 오면 리플레이 → 이전 상태로 복원"""
+        high, bits, span, gaps, late, dup, stale, received = st.prev
+        ahead = (seq - high) % SEQ_MOD
+        if not 0 < ahead <= self.window:
+            return
+        st.prev = None
+        st.resets -= 1
+        st.high, st.bits, st.span = high, bits, span
+        st.gaps, st.late, st.duplicates = gaps, late, dup
+        # 확정 전 구간은 이미 stale 에 포함, 그 뒤(이 패킷 제외)도 옛 번호
+        st.stale = stale + (st.received - 1 - received)
+        st.run_len = 0
+
+    def snapshot(self):
+        return [{"sc": sc, "apid": apid, "received": st.received, "gaps": st.gaps,
+                 "late": st.late, "lost": st.gaps - st.late, "dup": st.duplicates,
+                 "stale": st.stale, "resets": st.resets, "seq": st.high}
+                for (sc, apid), st in sorted(self.streams.items())]
+
+    def due(self, now_ns):
+        """퍼블리시 주기가 지났으면 JSON payload (bytes), 아니면 None"""
+        if now_ns < self._next_publish or not self.streams:
+            return None
+        self._next_publish = now_ns + self.publish_ns
+        return json.dumps({"t": now_ns / 1e9, "streams": self.snapshot()},
+                          separators=(",", ":")).encode()
+
+
+def status_topic():
+    return TlmTopic.status_topic(STATUS_NAME)
+
+
+# ===== 모니터 CLI =====
+def main():
+    import zmq
+
+    ap = argparse.ArgumentParser(description="Show live per-APID sequence statistics from the bus")
+    ap.add_argument("--endpoint", default="ipc:///tmp/GroundSystem")
+    ap.add_argument("--all", action="store_true", help="손실/중복이 없는 APID 도 출력")
+    args = ap.parse_args()
+
+    ctx = zmq.Context()
+    sub = ctx.socket(zmq.SUB)
+    sub.connect(args.endpoint)
+    sub.setsockopt(zmq.SUBSCRIBE, status_topic())
+    print(f"[SEQ] {args.endpoint} ({TlmTopic.describe(status_topic())})")
+    try:
+        while True:
+            _, payload = sub.recv_multipart()
+            msg = json.loads(payload)
+            stamp = time.strftime("%H:%M:%S", time.localtime(msg["t"]))
+            rows = [s for s in msg["streams"] if args.all or s["lost"] or s["dup"] or s["late"] or s.get("stale") or s["resets"]]
+            print(f"--- {stamp} {len(msg['streams'])} APIDs, {len(rows)} with anomalies")
+            for s in rows:
+                rate = 100.0 * s["lost"] / max(1, s["received"] + s["lost"])
+                print(f"  SC{s['sc']} APID 0x{s['apid']:03X} rx={s['received']} lost={s['lost']} "
+                      f"({rate:.2f}%) late={s['late']} dup={s['dup']} stale={s.get('stale', 0)} "
+                      f"resets={s['resets']} seq={s['seq']}")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        sub.close(linger=0)
+        ctx.term()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,338 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+TlmShmRing.py — 같은 호스트 텔레메트리 소비자용 공유메모리 링
+
+RoutingService 가 패킷을 한 번만 링에 쓰고, 로컬 페이지(TelemetrySystem,
+GenericTelemetry, EventMessage ...)들은 각자 커서로 같은 메모리를 읽는다.
+zmq 처럼 구독자마다 직렬화 + 소켓 복사가 일어나지 않는다. zmq 버스는 원격/레거시
+소비자를 위해 그대로 유지된다.
+
+파일 레이아웃 (기본 /dev/shm/GroundSystemTlm):
+
+  [0, 64)       헤더   magic "GSRING01" | slot_size u32 | slot_count u32 | epoch u64 | write_seq u64
+  [64, 832)     리더 테이블 32칸  pid u32 | flags u32 | cursor u64 | overruns u64
+  [4096, ...)   슬롯 slot_count 개 (고정 크기)
+                 seq u64 | t_ns u64 | spacecraft u16 | stream id u16 | length u16 | rsv u16 | payload
+
+동기화 (단일 writer, 다중 reader, 락 없음):
+  writer: slot.seq = BUSY → payload/필드 기록 → slot.seq = s → header.write_seq = s + 1
+  reader: slot.seq 가 자기 커서와 다르면 writer 가 한 바퀴 이상 앞질렀다(lapping)는 뜻이므로
+          write_seq - slot_count 위치로 건너뛰고 건너뛴 개수를 overrun 으로 센다.
+          payload 복사 후 seq 를 다시 확인해 찢어진 읽기도 overrun 으로 처리한다.
+  writer 가 재시작하면 epoch 가 바뀌고 reader 는 헤더를 다시 읽어 (슬롯 크기/수가 바뀌었으면
+  다시 매핑, 링 파일이 새로 만들어졌으면 경로로 다시 열어) 최신 위치로 재동기화한다.
+  writer 는 reader 를 절대 기다리지 않는다.
+
+  python3 TlmShmRing.py            # writer/리더 상태 (lag, overrun) 출력
+
+환경 변수:
+  GS_SHM_RING          : 1(기본) 이면 RoutingService 가 링에 기록
+  GS_SHM_RING_PATH     : 링 파일 경로
+  GS_SHM_SLOT_BYTES    : 슬롯 크기 (기본 2048, 초과 패킷은 링에서 제외되고 카운트)
+  GS_SHM_SLOT_COUNT    : 슬롯 수 (기본 8192)
+  GS_TLM_TRANSPORT     : tlmGUI 수신 경로 zmq(기본) | shm
+"""
+
+import os
+import time
+import mmap
+import fcntl
+import argparse
+from struct import Struct
+
+import TlmDelivery
+import TlmTopic
+
+GS_SHM_RING = os.getenv("GS_SHM_RING", "1") == "1"
+GS_SHM_RING_PATH = os.getenv("GS_SHM_RING_PATH",
+                             "/dev/shm/GroundSystemTlm" if os.path.isdir("/dev/shm") else "/tmp/GroundSystemTlm")
+GS_SHM_SLOT_BYTES = int(os.getenv("GS_SHM_SLOT_BYTES", "2048"))
+GS_SHM_SLOT_COUNT = int(os.getenv("GS_SHM_SLOT_COUNT", "8192"))
+GS_TLM_TRANSPORT = os.getenv("GS_TLM_TRANSPORT", "zmq").strip().lower()
+
+MAGIC = b"GSRING01"
+HEADER = Struct("<8sIIQQ")          # magic, slot_size, slot_count, epoch, write_seq
+WRITE_SEQ = Struct("<Q")
+WRITE_SEQ_OFF = 24
+EPOCH_OFF = 16
+
+READER = Struct("<IIQQ")            # pid, flags, cursor, overruns
+READER_TABLE_OFF = 64
+MAX_READERS = 32
+
+SLOTS_OFF = 4096
+SLOT = Struct("<QQHHHH")            # seq, t_ns, spacecraft, stream id, length, reserved
+SLOT_SEQ = Struct("<Q")
+SEQ_BUSY = 0xFFFFFFFFFFFFFFFF
+STREAM_ID = Struct(">H")
+STAT_INTERVAL = 1.0                 # 유휴 중 링 파일 교체 확인 주기 (초)
+
+
+def ring_size(slot_size, slot_count):
+    return SLOTS_OFF + slot_size * slot_count
+
+
+class ShmRingWriter:
+    """RoutingService 쪽. 링 파일을 만들고(또는 초기화하고) 슬롯에 순서대로 기록"""
+
+    def __init__(self, path=GS_SHM_RING_PATH, slot_size=GS_SHM_SLOT_BYTES, slot_count=GS_SHM_SLOT_COUNT):
+        self.path = path
+        self.slot_size = int(slot_size)
+        self.slot_count = int(slot_count)
+        self.max_payload = self.slot_size - SLOT.size
+        self.written = 0
+        self.oversize = 0
+
+        size = ring_size(self.slot_size, self.slot_count)
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            # 기존 reader 의 매핑이 유효하도록 unlink 하지 않고 제자리에서 초기화
+            os.ftruncate(fd, size)
+            self.mm = mmap.mmap(fd, size)
+        finally:
+            os.close(fd)
+        self.mm[READER_TABLE_OFF:SLOTS_OFF] = bytes(SLOTS_OFF - READER_TABLE_OFF)
+        for i in range(self.slot_count):
+            SLOT_SEQ.pack_into(self.mm, SLOTS_OFF + i * self.slot_size, SEQ_BUSY)
+        HEADER.pack_into(self.mm, 0, MAGIC, self.slot_size, self.slot_count, time.time_ns(), 0)
+        self.seq = 0
+
+    def write(self, t_ns, spacecraft, datagram):
+        length = len(datagram)
+        if length > self.max_payload:
+            self.oversize += 1
+            return False
+        seq = self.seq
+        mm = self.mm
+        off = SLOTS_OFF + (seq % self.slot_count) * self.slot_size
+        SLOT.pack_into(mm, off, SEQ_BUSY, t_ns, spacecraft,
+                       STREAM_ID.unpack_from(datagram)[0], length, 0)
+        start = off + SLOT.size
+        mm[start:start + length] = datagram
+        SLOT_SEQ.pack_into(mm, off, seq)
+        self.seq = seq + 1
+        WRITE_SEQ.pack_into(mm, WRITE_SEQ_OFF, self.seq)
+        self.written += 1
+        return True
+
+    def close(self):
+        try:
+            self.mm.close()
+        except Exception:
+            pass
+
+
+class ShmRingReader:
+    """
+    로컬 소비자 쪽. spacecraft / stream_id 로 거를 수 있다 (None 이면 전체).
+    start="latest" 면 현재 위치부터, "oldest" 면 링에 남은 가장 오래된 패킷부터 읽는다.
+    """
+
+    def __init__(self, path=GS_SHM_RING_PATH, spacecraft=None, stream_id=None, start="latest",
+                 delivery=None):
+        self.path = path
+        self.mm = None
+        write_seq = self._map()
+        # spacecraft: None(전체) | 번호 | 번호 목록
+        if spacecraft is None or isinstance(spacecraft, int):
+            self.spacecraft = None if spacecraft is None else frozenset((spacecraft,))
+        else:
+            self.spacecraft = frozenset(spacecraft)
+        self.stream_id = stream_id
+        # 리더 쪽 전달 정책 (TlmDelivery.DeliveryClass, None 이면 전체)
+        self.delivery = delivery
+        self.overruns = 0
+        self.delivered = 0
+        self.cursor = write_seq if start == "latest" else max(0, write_seq - self.slot_count)
+        self.slot = self._register()
+
+    def _map(self):
+        """path 를 열어 매핑하고 헤더(slot_size, slot_count, epoch)를 읽는다. write_seq 반환"""
+        fd = os.open(self.path, os.O_RDWR)
+        try:
+            st = os.fstat(fd)
+            mm = mmap.mmap(fd, st.st_size)
+        finally:
+            os.close(fd)
+        magic, slot_size, slot_count, epoch, write_seq = HEADER.unpack_from(mm, 0)
+        if magic != MAGIC or st.st_size < ring_size(slot_size, slot_count):
+            mm.close()
+            raise ValueError(f"not a telemetry ring: {self.path}")
+        if self.mm is not None:
+            self._unregister()
+            self.mm.close()
+        self.mm = mm
+        self.inode = (st.st_dev, st.st_ino)
+        self.slot_size, self.slot_count, self.epoch = slot_size, slot_count, epoch
+        self._next_stat = time.monotonic() + STAT_INTERVAL
+        return write_seq
+
+    def _resync(self):
+        """
+        writer 재시작: 헤더를 다시 읽어 크기/슬롯 수가 바뀌었거나 파일이 새로 만들어졌으면
+        다시 매핑하고, 리더 테이블에 재등록한 뒤 최신 위치로 재동기화한다.
+        """
+        try:
+            write_seq = self._map()
+        except (OSError, ValueError):
+            # writer 가 아직 초기화 중이거나 링이 사라짐 → 다음 poll 에서 재시도
+            self.epoch = None
+            return
+        self.cursor = write_seq
+        self.slot = self._register()
+
+    def _file_replaced(self):
+        """링 파일이 지워지고 새로 만들어졌는지 (STAT_INTERVAL 마다 한 번만 확인)"""
+        now = time.monotonic()
+        if now < self._next_stat:
+            return False
+        self._next_stat = now + STAT_INTERVAL
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return False
+        return (st.st_dev, st.st_ino) != self.inode
+
+    # ----- 리더 테이블 (모니터링용, writer 는 참조하지 않음) -----
+    def _register(self):
+        with open(self.path, "rb") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                for i in range(MAX_READERS):
+                    off = READER_TABLE_OFF + i * READER.size
+                    pid = READER.unpack_from(self.mm, off)[0]
+                    if pid == 0 or not _pid_alive(pid):
+                        READER.pack_into(self.mm, off, os.getpid(), 0, self.cursor, 0)
+                        return off
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+        return None
+
+    def _unregister(self):
+        if self.slot is not None:
+            try:
+                READER.pack_into(self.mm, self.slot, 0, 0, 0, 0)
+            except Exception:
+                pass
+            self.slot = None
+
+    def _publish_cursor(self):
+        if self.slot is not None:
+            READER.pack_into(self.mm, self.slot, os.getpid(), 0, self.cursor, self.overruns)
+
+    # ----- 읽기 -----
+    def poll(self, max_items=256):
+        """새 패킷을 (t_ns, spacecraft, stream_id, bytes) 리스트로 반환 (없으면 빈 리스트)"""
+        mm = self.mm
+        epoch, = WRITE_SEQ.unpack_from(mm, EPOCH_OFF)
+        write_seq, = WRITE_SEQ.unpack_from(mm, WRITE_SEQ_OFF)
+        if epoch != self.epoch or write_seq < self.cursor:
+            # writer 재시작: 헤더를 다시 읽고 필요하면 다시 매핑
+            self._resync()
+            return []
+        if write_seq == self.cursor and self._file_replaced():
+            # 새 링 파일 (옛 매핑은 더 이상 갱신되지 않음)
+            self._resync()
+            return []
+        out = []
+        count = self.slot_count
+        want_sc, want_sid = self.spacecraft, self.stream_id
+        r = self.cursor
+        while r < write_seq and len(out) < max_items:
+            if write_seq - r > count:
+                self.overruns += write_seq - count - r
+                r = write_seq - count
+            off = SLOTS_OFF + (r % count) * self.slot_size
+            seq, t_ns, sc, sid, length, _ = SLOT.unpack_from(mm, off)
+            if seq != r:
+                # 읽는 사이 writer 가 이 슬롯을 덮어씀 (lapping)
+                write_seq, = WRITE_SEQ.unpack_from(mm, WRITE_SEQ_OFF)
+                skip_to = max(r + 1, write_seq - count + 1)
+                self.overruns += skip_to - r
+                r = skip_to
+                continue
+            if (want_sc is None or sc in want_sc) and (want_sid is None or sid == want_sid):
+                start = off + SLOT.size
+                data = mm[start:start + length]
+                if SLOT_SEQ.unpack_from(mm, off)[0] != r:
+                    self.overruns += 1      # 복사 도중 덮어써짐
+                elif self.delivery is None or self.delivery.offer((sc, sid), t_ns, data) is not None:
+                    out.append((t_ns, sc, sid, data))
+            r += 1
+        self.cursor = r
+        if self.delivery is not None:
+            for (sc, sid), data in self.delivery.take_due(time.time_ns()):
+                out.append((0, sc, sid, data))
+        self.delivered += len(out)
+        self._publish_cursor()
+        return out
+
+    def packets(self, running, idle_sleep=0.002):
+        """running() 이 True 인 동안 필터에 맞는 datagram 을 계속 yield"""
+        while running():
+            batch = self.poll()
+            if not batch:
+                time.sleep(idle_sleep)
+                continue
+            for item in batch:
+                yield item[3]
+
+    def close(self):
+        self._unregister()
+        try:
+            self.mm.close()
+        except Exception:
+            pass
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+        return True
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+
+
+def open_reader_for(subscr, stream_id=None, klass=TlmTopic.FULL_CLASS):
+    """
+    tlmGUI 수신기용: GS_TLM_TRANSPORT=shm 이고 링이 있으면 레거시 구독 문자열에 맞는
+    리더를, 아니면 None (→ zmq 사용)을 돌려준다. 우주선이 없는 구독은 모든 우주선의
+    해당 stream 을 읽고, klass 전달 정책은 리더가 직접 적용한다.
+    """
+    if GS_TLM_TRANSPORT != "shm":
+        return None
+    spacecraft, sid = TlmTopic.parse_subscription(subscr)
+    if stream_id is not None:
+        sid = stream_id
+    try:
+        return ShmRingReader(GS_SHM_RING_PATH, spacecraft, sid,
+                             delivery=TlmDelivery.local_class(klass))
+    except (OSError, ValueError) as e:
+        print(f"[SHM] ring unavailable ({e}), falling back to zmq")
+        return None
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Show telemetry ring writer/reader status")
+    ap.add_argument("--path", default=GS_SHM_RING_PATH)
+    args = ap.parse_args()
+    with open(args.path, "rb") as f:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    magic, slot_size, slot_count, epoch, write_seq = HEADER.unpack_from(mm, 0)
+    if magic != MAGIC:
+        raise SystemExit(f"not a telemetry ring: {args.path}")
+    print(f"[SHM] {args.path} slots={slot_count}x{slot_size}B write_seq={write_seq} "
+          f"epoch={time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(epoch / 1e9))}")
+    for i in range(MAX_READERS):
+        pid, _, cursor, overruns = READER.unpack_from(mm, READER_TABLE_OFF + i * READER.size)
+        if pid:
+            state = "" if _pid_alive(pid) else " (dead)"
+            print(f"  reader pid={pid}{state} lag={write_seq - cursor} overruns={overruns}")
+    mm.close()
+
+
+if __name__ == "__main__":
+    main()
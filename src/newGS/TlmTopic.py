@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+TlmTopic.py — GroundSystem 텔레메트리 버스 토픽 규칙
+
+바이너리 토픽 (기본, GS_TOPIC_MODE=binary) — 7바이트 고정폭:
+
+  +------+----------+----------------+------------+
+  | "GS" | class u8 | spacecraft u16 | stream u16 |   (big-endian)
+  +------+----------+----------------+------------+
+
+  class 1 = full rate, 2.. = GS_DELIVERY 에 정의된 전달 클래스 (TlmDelivery.py)
+  class 0 = 상태 스트림 b"GS\x00" + 이름 (예: 시퀀스 통계, TlmSeqTrack.py).
+            텔레메트리 구독 접두사와 겹치지 않으며 모드와 무관하다.
+
+  구독 접두사
+    전체              b"GS\x01"
+    SpacecraftN       b"GS\x01" + N
+    SpacecraftN/MID   b"GS\x01" + N + MID   (정확히 한 스트림)
+
+  → zmq 접두사 필터링만으로 선택이 끝나므로 구독자는 토픽을 파싱하지 않는다.
+
+레거시 토픽 (GS_TOPIC_MODE=legacy) — 기존 문자열 형식 그대로:
+
+  GroundSystem.Spacecraft1.TelemetryPackets.0x8a9
+  gui/GroundSystem.Spacecraft1.TelemetryPackets.0x8a9   (full 이외의 전달 클래스)
+
+퍼블리셔(RoutingService, downlink_hub)와 구독자(tlmGUI)는 같은 환경 변수를
+물려받아 같은 모드를 쓴다. --sub 인자 등 사용자에게 보이는 구독 문자열은
+계속 레거시 형식이며, parse_subscription() 으로 읽어 접두사로 변환한다.
+
+호스트 → 우주선 번호 매핑 (SpacecraftMap):
+  GS_SPACECRAFT_MAP="127.0.0.1=1,10.0.0.12=2"   또는 매핑 파일 경로 (줄마다 "host number")
+  매핑에 없는 호스트는 비어 있는 가장 작은 번호를 도착 순으로 받는다.
+  구독 문자열에 우주선이 없으면(예: "GroundSystem.0x8a9") 매핑 여부와 관계없이
+  모든 우주선의 해당 스트림을 받는다. 접두사로는 우주선 다음의 stream 을 고를 수 없으므로
+  class 접두사로 구독하고 수신 측에서 stream_suffix() 로 토픽 끝을 비교해 거른다.
+"""
+
+import os
+import threading
+from struct import Struct
+
+TOPIC_MODE = os.getenv("GS_TOPIC_MODE", "binary").strip().lower()
+GS_SPACECRAFT_MAP = os.getenv("GS_SPACECRAFT_MAP", "")
+
+BIN_ROOT = b"GS"
+BIN_TOPIC = Struct(">2sBHH")
+U16 = Struct(">H")
+
+# 전달 클래스 이름 → 토픽 class 바이트 (GS_DELIVERY 의 정의 순서, full = 1)
+FULL_CLASS = "full"
+GS_DELIVERY = os.getenv("GS_DELIVERY", "gui:*=latest/200,0x808=full")
+DELIVERY_CLASSES = [FULL_CLASS] + [
+    part.split(":", 1)[0].strip()
+    for part in GS_DELIVERY.split(";")
+    if ":" in part and part.split(":", 1)[0].strip() != FULL_CLASS
+]
+
+STATUS_ROOT = BIN_ROOT + b"\x00"
+
+LEGACY_ROOT = "GroundSystem"
+SPACECRAFT = "Spacecraft"
+
+
+def is_legacy(mode=None):
+    return (mode or TOPIC_MODE) == "legacy"
+
+
+def class_id(klass):
+    """전달 클래스 이름 → class 바이트 (정의되지 않은 이름은 full)"""
+    if klass in DELIVERY_CLASSES:
+        return DELIVERY_CLASSES.index(klass) + 1
+    return 1
+
+
+def _class_root(klass, mode):
+    if is_legacy(mode):
+        return LEGACY_ROOT if class_id(klass) == 1 else f"{klass}/{LEGACY_ROOT}"
+    return BIN_ROOT + bytes((class_id(klass),))
+
+
+def spacecraft_index(name):
+    """b"Spacecraft3" / "Spacecraft3" → 3 (형식이 다르면 None)"""
+    if isinstance(name, (bytes, bytearray)):
+        name = name.decode(errors="ignore")
+    if name.startswith(SPACECRAFT) and name[len(SPACECRAFT):].isdigit():
+        return int(name[len(SPACECRAFT):])
+    return None
+
+
+def make_topic(spacecraft, stream_id, mode=None, klass=FULL_CLASS):
+    """퍼블리시용 토픽. 퍼블리셔는 (spacecraft, stream_id) 별로 캐시해서 쓴다."""
+    if is_legacy(mode):
+        return f"{_class_root(klass, mode)}.{SPACECRAFT}{spacecraft}.TelemetryPackets.{hex(stream_id)}".encode()
+    return BIN_TOPIC.pack(BIN_ROOT, class_id(klass), spacecraft, stream_id)
+
+
+def subscription_prefix(spacecraft=None, stream_id=None, mode=None, klass=FULL_CLASS):
+    """구독 접두사. stream_id 는 spacecraft 가 주어졌을 때만 접두사에 반영된다."""
+    if is_legacy(mode):
+        prefix = _class_root(klass, mode)
+        if spacecraft is not None:
+            prefix += f".{SPACECRAFT}{spacecraft}.TelemetryPackets"
+            if stream_id is not None:
+                prefix += f".{hex(stream_id)}"
+        return prefix.encode()
+    prefix = _class_root(klass, mode)
+    if spacecraft is not None:
+        prefix += U16.pack(spacecraft)
+        if stream_id is not None:
+            prefix += U16.pack(stream_id)
+    return prefix
+
+
+def status_topic(name):
+    """상태 스트림 토픽 (퍼블리셔가 JSON 등 텔레메트리가 아닌 payload 를 보낼 때)"""
+    return STATUS_ROOT + name.encode()
+
+
+def parse_subscription(sub):
+    """레거시 구독 문자열 → (spacecraft, stream_id), 없는 항목은 None
+
+    "GroundSystem"                                   → (None, None)
+    "GroundSystem.Spacecraft2.TelemetryPackets"      → (2, None)
+    "GroundSystem.Spacecraft2.TelemetryPackets.0x8a9"→ (2, 0x8a9)
+    "GroundSystem.0x8a9"                             → (None, 0x8a9)
+    """
+    spacecraft = stream_id = None
+    for token in (sub or "").split("."):
+        if spacecraft is None and spacecraft_index(token) is not None:
+            spacecraft = spacecraft_index(token)
+        elif token.lower().startswith("0x"):
+            try:
+                stream_id = int(token, 16)
+            except ValueError:
+                pass
+    return spacecraft, stream_id
+
+
+def subscription_prefixes(sub, stream_id=None, mode=None, klass=FULL_CLASS):
+    """
+    구독 문자열 → zmq SUBSCRIBE 접두사 목록.
+    stream_id 를 주면 문자열의 stream 대신 사용한다 (EventMessage 등).
+    우주선 없이 stream 만 있으면 모든 우주선(class 접두사)을 구독한다 —
+    이때 수신 측은 stream_suffix() 로 걸러야 한다.
+    klass 는 구독할 전달 클래스 (GUI 페이지는 GS_TLM_CLASS, 기본 gui).
+    """
+    spacecraft, sid = parse_subscription(sub)
+    if stream_id is not None:
+        sid = stream_id
+    return [subscription_prefix(spacecraft, sid, mode, klass)]
+
+
+def stream_suffix(sub, stream_id=None, mode=None):
+    """
+    우주선 없이 stream 만 있는 구독이면 수신 토픽이 끝나야 하는 바이트, 아니면 None
+    (접두사만으로 선택이 끝나는 경우). topic.endswith(suffix) 로 비교한다.
+    """
+    spacecraft, sid = parse_subscription(sub)
+    if stream_id is not None:
+        sid = stream_id
+    if spacecraft is not None or sid is None:
+        return None
+    if is_legacy(mode):
+        return f".{hex(sid)}".encode()
+    return U16.pack(sid)
+
+
+def parse_topic(topic):
+    """수신 토픽 → (spacecraft, stream_id). 디버깅/통계용 (구독 경로에서는 불필요)"""
+    if len(topic) == BIN_TOPIC.size and topic.startswith(BIN_ROOT):
+        _, _, spacecraft, stream_id = BIN_TOPIC.unpack(topic)
+        return spacecraft, stream_id
+    return parse_subscription(bytes(topic).decode(errors="ignore"))
+
+
+def describe(prefix):
+    """토픽/접두사를 사람이 읽을 수 있는 문자열로"""
+    prefix = bytes(prefix)
+    if not prefix.startswith(BIN_ROOT) or len(prefix) < 3:
+        return prefix.decode(errors="replace") or "(all)"
+    rest = prefix[3:]
+    cid = prefix[2]
+    if cid == 0:
+        return f"status/{rest.decode(errors='replace')}"
+    text = "bin" if cid == 1 else f"bin/{DELIVERY_CLASSES[cid - 1] if cid <= len(DELIVERY_CLASSES) else cid}"
+    if len(rest) >= 2:
+        text += f".{SPACECRAFT}{U16.unpack_from(rest)[0]}"
+    if len(rest) >= 4:
+        text += f".{hex(U16.unpack_from(rest, 2)[0])}"
+    return text
+
+
+# ===== 호스트 → 우주선 번호 =====
+def load_spacecraft_map(spec=None):
+    """"host=N,host=N" 문자열 또는 매핑 파일 → {host: N}"""
+    spec = GS_SPACECRAFT_MAP if spec is None else spec
+    if not spec:
+        return {}
+    if os.path.isfile(spec):
+        with open(spec, "r", encoding="utf-8") as f:
+            items = [line.split("#", 1)[0] for line in f]
+    else:
+        items = spec.split(",")
+    mapping = {}
+    for item in items:
+        item = item.replace("=", " ").split()
+        if len(item) < 2:
+            continue
+        host, number = item[0], item[1]
+        if number.startswith(SPACECRAFT):
+            number = number[len(SPACECRAFT):]
+        try:
+            mapping[host] = int(number)
+        except ValueError:
+            print(f"[TOPIC][WARN] bad spacecraft mapping: {' '.join(item)}")
+    return mapping
+
+
+class SpacecraftMap:
+    """
+    호스트 IP → 우주선 번호. 퍼블리셔는 자체 dict 캐시로 조회하고,
+    처음 보는 호스트에 대해서만 assign() 을 호출한다 (패킷당 비용은 우주선 수와 무관).
+    """
+
+    def __init__(self, mapping=None):
+        self.mapping = load_spacecraft_map() if mapping is None else dict(mapping)
+        self._used = set(self.mapping.values())
+        self._lock = threading.Lock()
+
+    def assign(self, host):
+        with self._lock:
+            number = self.mapping.get(host)
+            if number is None:
+                number = 1
+                while number in self._used:
+                    number += 1
+                self.mapping[host] = number
+                self._used.add(number)
+            return number
+
+    def configured(self):
+        return sorted(self.mapping.items(), key=lambda kv: kv[1])
@@ -0,0 +1,366 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+downlink_hub.py — 단일 Downlink 허브
+
+기존 경로:
+  TO_LAB → test4(1235) → UDP → test3(8890)   (CSV)
+  TO_LAB → RoutingService(50001) → zmq      (GUI)
+
+허브 경로:
+  TO_LAB → downlink_hub(1235) ─┬─ CSV 저장 (test3.log_packet 재사용)
+                               ├─ zmq 퍼블리셔 (TlmTopic 토픽)
+                               ├─ 분석 탭 (MID별 통계)
+                               ├─ 세그먼트 아카이브 (TlmArchive.py)
+                               ├─ 이벤트 메시지 검색 저장소 (TlmEventStore.py)
+                               └─ 공유메모리 링 (TlmShmRing.py)
+
+한 번 수신한 데이터그램을 프로세스 내부 큐로 각 소비자에게 나눠준다.
+소비자마다 전용 큐/스레드를 가지므로 느린 소비자는 자기 큐에서만 드랍되고
+다른 소비자나 수신 루프를 막지 않는다.
+
+환경 변수:
+  HUB_LISTEN_HOST / HUB_LISTEN_PORT : 수신 주소 (기본 0.0.0.0:1235)
+  HUB_QUEUE_SIZE                    : 소비자별 큐 길이 (기본 8192)
+  HUB_CONSUMERS                     : 사용할 소비자 (기본 "csv,zmq,stats,archive,events,shm")
+  HUB_ZMQ_ENDPOINT                  : zmq PUB 바인드 주소 (기본 ipc:///tmp/GroundSystem)
+  GS_BUS_PUB_ENDPOINT               : 설정 시 TlmBroker XSUB 에 connect (HUB_ZMQ_ENDPOINT 무시)
+  HUB_STATS_SEC                     : 통계 출력 주기 (기본 10)
+  GS_TOPIC_MODE                     : 토픽 형식 binary(기본) | legacy (TlmTopic.py)
+  GS_DELIVERY                       : GUI 용 전달 클래스 정책 (TlmDelivery.py)
+  GS_SEQ_TRACK                      : APID 별 시퀀스 손실/중복 통계 퍼블리시 (TlmSeqTrack.py)
+  GS_EVENT_DB / GS_EVENT_STREAMS    : 이벤트 메시지 저장소 경로 / stream id (TlmEventStore.py)
+"""
+
+import os
+import time
+import queue
+import signal
+import socket
+import threading
+from array import array
+from datetime import datetime
+
+import TlmArchive
+import TlmEventStore
+import TlmDelivery
+import TlmSeqTrack
+import TlmShmRing
+import TlmTopic
+
+HUB_LISTEN_HOST = os.getenv("HUB_LISTEN_HOST", "0.0.0.0")
+HUB_LISTEN_PORT = int(os.getenv("HUB_LISTEN_PORT", "1235"))
+HUB_QUEUE_SIZE = int(os.getenv("HUB_QUEUE_SIZE", "8192"))
+HUB_CONSUMERS = os.getenv("HUB_CONSUMERS", "csv,zmq,stats,archive,events,shm")
+HUB_ZMQ_ENDPOINT = os.getenv("HUB_ZMQ_ENDPOINT", "ipc:///tmp/GroundSystem")
+GS_BUS_PUB_ENDPOINT = os.getenv("GS_BUS_PUB_ENDPOINT", "")
+HUB_STATS_SEC = float(os.getenv("HUB_STATS_SEC", "10"))
+
+
+def now_ts(): return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+
+# 소비자들이 공유하는 호스트 → 우주선 번호 (GS_SPACECRAFT_MAP, 없으면 도착 순)
+SPACECRAFT_MAP = TlmTopic.SpacecraftMap()
+
+
+class HubConsumer:
+    """허브 소비자 기본 클래스: 전용 큐 + 워커 스레드"""
+    name = "consumer"
+
+    def __init__(self, maxsize=HUB_QUEUE_SIZE):
+        self.q = queue.Queue(maxsize)
+        self.handled = 0
+        self.dropped = 0
+        self._thread = threading.Thread(target=self._run, name=f"hub-{self.name}", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def offer(self, item):
+        try:
+            self.q.put_nowait(item)
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self):
+        while True:
+            item = self.q.get()
+            if item is None:
+                break
+            try:
+                self.handle(*item)
+                self.handled += 1
+            except Exception as e:
+                print(f"[HUB][{self.name}][ERROR] {e}")
+        self.close()
+
+    def stop(self, timeout=2.0):
+        try:
+            self.q.put(None, timeout=timeout)
+        except queue.Full:
+            pass
+        self._thread.join(timeout)
+
+    def handle(self, t_ns, data, addr):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class CsvStoreConsumer(HubConsumer):
+    """test3 와 동일한 스키마로 log/sample_app_recv.csv 기록"""
+    name = "csv"
+
+    def __init__(self, maxsize=HUB_QUEUE_SIZE):
+        super().__init__(maxsize)
+        import test3
+        self._test3 = test3
+        self._log = test3.open_recv_log()
+
+    def handle(self, t_ns, data, addr):
+        self._test3.log_packet(self._log, data, addr)
+
+    def close(self):
+        self._log.close()
+
+
+class ZmqPublishConsumer(HubConsumer):
+    """RoutingService 와 같은 토픽으로 GroundSystem 버스에 퍼블리시"""
+    name = "zmq"
+
+    def __init__(self, endpoint=HUB_ZMQ_ENDPOINT, maxsize=HUB_QUEUE_SIZE):
+        super().__init__(maxsize)
+        import zmq
+        self.context = zmq.Context()
+        self.publisher = self.context.socket(zmq.PUB)
+        if GS_BUS_PUB_ENDPOINT:
+            self.publisher.connect(GS_BUS_PUB_ENDPOINT)
+        else:
+            self.publisher.bind(endpoint)
+        self._spacecraft = {}   # host ip -> spacecraft 번호 (1부터)
+        self._topics = {}
+        self._delivery = TlmDelivery.DeliveryFanout()
+        self._seq = TlmSeqTrack.SeqTracker() if TlmSeqTrack.GS_SEQ_TRACK else None
+        self._seq_topic = TlmSeqTrack.status_topic()
+
+    def _run(self):
+        # latest 창이 끝난 값과 시퀀스 통계를 보내기 위해 큐 대기에 타임아웃을 둔다
+        ticks = [t for t in (self._delivery.tick, self._seq and self._seq.publish_ns / 2e9) if t]
+        if not ticks:
+            return super()._run()
+        tick = min(ticks)
+        while True:
+            try:
+                item = self.q.get(timeout=tick)
+            except queue.Empty:
+                item = ()
+            if item is None:
+                break
+            now = time.time_ns()
+            for topic, data in self._delivery.due(now):
+                self.publisher.send_multipart([topic, data])
+            if self._seq is not None:
+                stats = self._seq.due(now)
+                if stats is not None:
+                    self.publisher.send_multipart([self._seq_topic, stats])
+            if not item:
+                continue
+            try:
+                self.handle(*item)
+                self.handled += 1
+            except Exception as e:
+                print(f"[HUB][{self.name}][ERROR] {e}")
+        self.close()
+
+    def handle(self, t_ns, data, addr):
+        if len(data) < 6:
+            return
+        host = addr[0]
+        sc = self._spacecraft.get(host)
+        if sc is None:
+            sc = self._spacecraft[host] = SPACECRAFT_MAP.assign(host)
+            print(f"[HUB] Detected Spacecraft{sc} at {host}")
+        key = (sc, (data[0] << 8) | data[1])
+        topic = self._topics.get(key)
+        if topic is None:
+            topic = TlmTopic.make_topic(*key)
+            self._topics[key] = topic
+        self.publisher.send_multipart([topic, data])
+        if self._seq is not None:
+            self._seq.observe(sc, data)
+        for topic, out in self._delivery.offer(sc, data, t_ns):
+            self.publisher.send_multipart([topic, out])
+
+    def close(self):
+        self.publisher.close(linger=0)
+        self.context.term()
+
+
+class StatsConsumer(HubConsumer):
+    """분석 탭: MID별 패킷/바이트 카운트"""
+    name = "stats"
+
+    def __init__(self, maxsize=HUB_QUEUE_SIZE):
+        super().__init__(maxsize)
+        self.mid_pkts = array("Q", bytes(8 * 0x10000))
+        self.mid_bytes = array("Q", bytes(8 * 0x10000))
+
+    def handle(self, t_ns, data, addr):
+        if len(data) < 2:
+            return
+        mid = (data[0] << 8) | data[1]
+        self.mid_pkts[mid] += 1
+        self.mid_bytes[mid] += len(data)
+
+    def summary(self, top=8):
+        active = [(self.mid_pkts[m], m) for m in range(0x10000) if self.mid_pkts[m]]
+        active.sort(reverse=True)
+        return " ".join(f"0x{m:04X}={c}({self.mid_bytes[m]}B)" for c, m in active[:top])
+
+
+class ArchiveConsumer(HubConsumer):
+    """RoutingService 와 같은 세그먼트 아카이브 기록 (TlmArchive.py)"""
+    name = "archive"
+
+    def __init__(self, maxsize=HUB_QUEUE_SIZE):
+        super().__init__(maxsize)
+        self._archive = TlmArchive.TlmArchiveWriter()
+
+    def handle(self, t_ns, data, addr):
+        self._archive.append(t_ns, addr[0], data)
+
+    def close(self):
+        self._archive.close()
+
+
+class EventStoreConsumer(HubConsumer):
+    """이벤트 스트림 패킷을 디코딩해 SQLite FTS5 저장소에 기록 (TlmEventStore.py)"""
+    name = "events"
+
+    def __init__(self, maxsize=HUB_QUEUE_SIZE):
+        super().__init__(maxsize)
+        self._store = TlmEventStore.EventStoreWriter()
+        self._spacecraft = {}
+
+    def handle(self, t_ns, data, addr):
+        if len(data) < 6:
+            return
+        sc = self._spacecraft.get(addr[0])
+        if sc is None:
+            sc = self._spacecraft[addr[0]] = SPACECRAFT_MAP.assign(addr[0])
+        self._store.append(t_ns, sc, data)
+
+    def close(self):
+        self._store.close()
+
+
+class ShmRingConsumer(HubConsumer):
+    """같은 호스트 페이지용 공유메모리 링 기록 (TlmShmRing.py)"""
+    name = "shm"
+
+    def __init__(self, maxsize=HUB_QUEUE_SIZE):
+        super().__init__(maxsize)
+        self._ring = TlmShmRing.ShmRingWriter()
+        self._spacecraft = {}
+
+    def handle(self, t_ns, data, addr):
+        if len(data) < 6:
+            return
+        sc = self._spacecraft.get(addr[0])
+        if sc is None:
+            sc = self._spacecraft[addr[0]] = SPACECRAFT_MAP.assign(addr[0])
+        self._ring.write(t_ns, sc, data)
+
+    def close(self):
+        self._ring.close()
+
+
+CONSUMER_TYPES = {
+    "csv": CsvStoreConsumer,
+    "zmq": ZmqPublishConsumer,
+    "stats": StatsConsumer,
+    "archive": ArchiveConsumer,
+    "events": EventStoreConsumer,
+    "shm": ShmRingConsumer,
+}
+
+
+class DownlinkHub:
+    def __init__(self, listen_host=HUB_LISTEN_HOST, listen_port=HUB_LISTEN_PORT):
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4 * 1024 * 1024)
+        self.sock.bind((listen_host, listen_port))
+        self.sock.settimeout(0.5)
+        self.consumers = []
+        self.received = 0
+        self.running = False
+
+    def add_consumer(self, consumer: HubConsumer):
+        self.consumers.append(consumer)
+        return consumer
+
+    def stats_line(self):
+        parts = [f"rx={self.received}"]
+        for c in self.consumers:
+            parts.append(f"{c.name}:ok={c.handled},drop={c.dropped},q={c.q.qsize()}")
+        return " ".join(parts)
+
+    def serve_forever(self):
+        for c in self.consumers:
+            c.start()
+        consumers = tuple(self.consumers)
+        self.running = True
+        last_stats = time.time()
+        while self.running:
+            try:
+                data, addr = self.sock.recvfrom(65535)
+            except socket.timeout:
+                data = None
+            except OSError as e:
+                if self.running:
+                    print(f"[{now_ts()}] [HUB][RECV][ERROR] {e}")
+                break
+            if data is not None:
+                self.received += 1
+                item = (time.time_ns(), data, addr)
+                for c in consumers:
+                    c.offer(item)
+            if HUB_STATS_SEC > 0 and time.time() - last_stats >= HUB_STATS_SEC:
+                last_stats = time.time()
+                print(f"[{now_ts()}] [HUB][STAT] {self.stats_line()}")
+                for c in consumers:
+                    if isinstance(c, StatsConsumer):
+                        print(f"[{now_ts()}] [HUB][MID] {c.summary()}")
+        for c in consumers:
+            c.stop()
+        self.sock.close()
+
+    def stop(self):
+        self.running = False
+
+
+def main():
+    hub = DownlinkHub()
+    for key in [k.strip() for k in HUB_CONSUMERS.split(",") if k.strip()]:
+        ctor = CONSUMER_TYPES.get(key)
+        if ctor is None:
+            print(f"[HUB][WARN] unknown consumer '{key}'")
+            continue
+        try:
+            hub.add_consumer(ctor())
+        except Exception as e:
+            print(f"[HUB][ERROR] consumer '{key}' init failed: {e}")
+
+    def _handle(sig, frame): hub.stop()
+    signal.signal(signal.SIGINT, _handle); signal.signal(signal.SIGTERM, _handle)
+
+    print(f"[{now_ts()}] [HUB] Listening cFS UDP on {HUB_LISTEN_HOST}:{HUB_LISTEN_PORT} "
+          f"→ {', '.join(c.name for c in hub.consumers) or '(no consumers)'}")
+    hub.serve_forever()
+    print(f"[{now_ts()}] [HUB] stopped. {hub.stats_line()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,441 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+log_rotation.py — newGS 공용 로그 로테이션
+
+기능:
+  1. 크기(LOG_MAX_BYTES) / 시간(LOG_MAX_AGE_SEC) 상한을 넘으면 활성 파일을 세그먼트로 봉인
+  2. 봉인된 세그먼트는 백그라운드 스레드에서 gzip 압축
+  3. <stem>.index.jsonl 에 세그먼트별 시간 범위(t0~t1), 행 수, 크기 기록
+  4. LOG_MAX_SEGMENTS 개를 넘는 오래된 세그먼트는 삭제 → 디스크 사용량 상한 유지
+
+활성 파일 경로는 기존과 동일(log/sample_app_sent.csv 등)하므로
+기존 리더는 그대로 동작하고, 인덱스를 아는 리더는 필요한 세그먼트만 연다.
+CsvTailReader 는 새로 붙은 행만 이어 읽는다 (봉인/초기화 처리 포함).
+"""
+
+import io
+import os
+import csv
+import gzip
+import json
+import queue
+import shutil
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+LOG_MAX_BYTES = int(os.getenv("LOG_MAX_BYTES", str(8 * 1024 * 1024)))
+LOG_MAX_AGE_SEC = float(os.getenv("LOG_MAX_AGE_SEC", "3600"))
+LOG_MAX_SEGMENTS = int(os.getenv("LOG_MAX_SEGMENTS", "20"))
+LOG_COMPRESS = os.getenv("LOG_COMPRESS", "1") == "1"
+
+
+def index_path(base_path) -> Path:
+    base_path = Path(base_path)
+    return base_path.with_name(f"{base_path.stem}.index.jsonl")
+
+
+def _read_index(base_path):
+    entries = []
+    try:
+        with open(index_path(base_path), "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    entries.append(json.loads(line))
+                except ValueError:
+                    continue
+    except FileNotFoundError:
+        pass
+    return entries
+
+
+def _write_index(base_path, entries):
+    p = index_path(base_path)
+    tmp = p.with_name(p.name + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        for e in entries:
+            f.write(json.dumps(e) + "\n")
+    os.replace(tmp, p)
+
+
+def _resolve_segment(base_path, name):
+    """압축 완료 여부에 따라 .gz 또는 원본 경로를 돌려준다 (없으면 None)"""
+    seg = Path(base_path).with_name(name)
+    gz = seg.with_name(seg.name + ".gz")
+    if gz.exists():
+        return gz
+    if seg.exists():
+        return seg
+    return None
+
+
+def segment_paths(base_path, since=None, until=None):
+    """
+    [since, until] (epoch 초) 구간과 겹치는 세그먼트만 오래된 순으로 반환.
+    활성 파일은 항상 마지막에 포함된다.
+    """
+    base_path = Path(base_path)
+    out = []
+    for e in _read_index(base_path):
+        if since is not None and e.get("t1", 0.0) < since:
+            continue
+        if until is not None and e.get("t0", 0.0) > until:
+            continue
+        p = _resolve_segment(base_path, e["seg"])
+        if p is not None:
+            out.append(p)
+    if base_path.exists():
+        out.append(base_path)
+    return out
+
+
+def open_segment(path, newline=""):
+    path = Path(path)
+    if path.suffix == ".gz":
+        return gzip.open(path, "rt", encoding="utf-8", newline=newline)
+    return open(path, "r", encoding="utf-8", newline=newline)
+
+
+def purge(base_path):
+    """봉인된 세그먼트와 인덱스를 모두 삭제 (활성 파일은 건드리지 않음)"""
+    base_path = Path(base_path)
+    for e in _read_index(base_path):
+        for p in (base_path.with_name(e["seg"]), base_path.with_name(e["seg"] + ".gz")):
+            try: p.unlink()
+            except FileNotFoundError: pass
+    try: index_path(base_path).unlink()
+    except FileNotFoundError: pass
+
+
+def _complete_end(chunk: bytes) -> int:
+    """chunk 에서 마지막 완결 CSV 레코드의 끝 위치 (따옴표 안 줄바꿈은 경계가 아님)"""
+    pos = chunk.rfind(b"\n")
+    while pos >= 0 and chunk.count(b'"', 0, pos) % 2:
+        pos = chunk.rfind(b"\n", 0, pos)
+    return pos + 1
+
+
+def _parse_csv(text, fields=None, delimiter=None):
+    """
+    CSV 텍스트 → (dict 행 목록, 헤더, 구분자). fields 가 없으면 첫 행이 헤더.
+    csv.DictReader 와 같은 모양 (남는 값은 None 키, 빠진 값은 None).
+    구분자만 추정하고 따옴표 규칙은 csv.writer 기본(excel)을 따른다.
+    """
+    text = text.replace("\x00", "")
+    if delimiter is None:
+        try:
+            delimiter = csv.Sniffer().sniff(text[:2048], delimiters=",\t;").delimiter
+        except csv.Error:
+            delimiter = ","
+    rows = []
+    n = len(fields) if fields else 0
+    for values in csv.reader(io.StringIO(text), delimiter=delimiter):
+        if not values:
+            continue
+        if fields is None:
+            fields, n = values, len(values)
+            continue
+        row = dict(zip(fields, values))
+        if len(values) > n:
+            row[None] = values[n:]
+        elif len(values) < n:
+            for key in fields[len(values):]:
+                row[key] = None
+        rows.append(row)
+    return rows, fields, delimiter
+
+
+class CsvTailReader:
+    """
+    로테이션되는 CSV 로그를 이어 읽는다. poll() 은 지난 호출 이후 새로 붙은
+    완결된 행만 dict 로 돌려준다 (헤더 = 각 파일의 첫 행).
+
+    - 첫 poll: since(epoch 초) 와 겹치는 봉인 세그먼트를 한 번 읽고 활성 파일을 처음부터 읽음
+    - 활성 파일은 열어 둔 채 오프셋부터 읽는다. 쓰다 만 마지막 행은 다음 poll 로 미룸
+    - 봉인(이름 변경): 열린 핸들로 남은 부분을 마저 읽고, 그 사이 봉인된 세그먼트도 읽은 뒤
+      새 활성 파일로 넘어감
+    - 잘림(로그 초기화 등): reset=True 를 돌려주고 처음부터 다시 읽음
+    """
+
+    def __init__(self, base_path, since=None):
+        self.base_path = Path(base_path)
+        self.since = since
+        self._f = None
+        self._ident = None
+        self._offset = 0
+        self._fields = None
+        self._delimiter = None
+        self._known = None      # 반영한 (또는 건너뛴) 세그먼트 이름
+
+    def _read_segment(self, path):
+        try:
+            try:
+                with open_segment(path) as f:
+                    text = f.read()
+            except FileNotFoundError:
+                # 읽기 직전에 gzip 압축이 끝난 경우
+                with open_segment(path.with_name(path.name + ".gz")) as f:
+                    text = f.read()
+        except OSError as e:
+            print(f"[LOGROT][ERROR] read {path}: {e}")
+            return []
+        return _parse_csv(text)[0]
+
+    def _read_active(self, final=False):
+        self._f.seek(self._offset)
+        chunk = self._f.read()
+        end = len(chunk) if final else _complete_end(chunk)
+        if end <= 0:
+            return []
+        self._offset += end
+        rows, self._fields, self._delimiter = _parse_csv(
+            chunk[:end].decode("utf-8", "replace"), self._fields, self._delimiter)
+        return rows
+
+    def _open_active(self):
+        try:
+            self._f = open(self.base_path, "rb")
+        except FileNotFoundError:
+            return
+        st = os.fstat(self._f.fileno())
+        self._ident = (st.st_dev, st.st_ino)
+        self._offset = 0
+        self._fields = self._delimiter = None
+
+    def _renamed_to(self):
+        """열어 둔 활성 파일이 봉인되며 바뀐 이름 (압축/삭제돼 없으면 None)"""
+        base = self.base_path
+        for p in base.parent.glob(f"{base.stem}.*{base.suffix}"):
+            try:
+                st = os.stat(p)
+            except FileNotFoundError:
+                continue
+            if (st.st_dev, st.st_ino) == self._ident:
+                return p.name
+        return None
+
+    def close(self):
+        if self._f is not None:
+            self._f.close()
+            self._f = None
+
+    def reopen(self):
+        """처음부터 다시 읽도록 상태를 지운다 (봉인 세그먼트는 다시 읽지 않음)"""
+        self.close()
+        self._known = {e["seg"] for e in _read_index(self.base_path)}
+
+    def poll(self):
+        """→ (새 행 목록, reset 여부)"""
+        rows, reset = [], False
+        if self._known is None:
+            self._known = {e["seg"] for e in _read_index(self.base_path)}
+            for p in segment_paths(self.base_path, since=self.since):
+                if p != self.base_path:
+                    rows.extend(self._read_segment(p))
+        try:
+            st = os.stat(self.base_path)
+        except FileNotFoundError:
+            st = None
+
+        if self._f is not None:
+            if st is None or (st.st_dev, st.st_ino) != self._ident:
+                # 봉인됨: 남은 행 + 그 사이에 봉인된 세그먼트 (방금 다 읽은 파일은 제외)
+                rows.extend(self._read_active(final=True))
+                self.close()
+                drained = self._renamed_to()
+                new = [e["seg"] for e in _read_index(self.base_path) if e["seg"] not in self._known]
+                if drained is None and new:
+                    # 이미 압축/삭제됨 → 인덱스에 먼저 올라 있는 항목이 그 파일
+                    drained = new[0]
+                for name in new:
+                    if name == drained:
+                        continue
+                    p = _resolve_segment(self.base_path, name)
+                    if p is not None:
+                        rows.extend(self._read_segment(p))
+                self._known.update(new)
+                if drained is not None:
+                    # 인덱스에 아직 안 올라간 경우 (이름 변경 직후) 다음 poll 에서 다시 읽지 않도록
+                    self._known.add(drained)
+            elif st.st_size < self._offset:
+                # 잘림: 처음부터 다시
+                rows, reset = [], True
+                self.close()
+
+        if self._f is None and st is not None:
+            self._open_active()
+        if self._f is not None:
+            rows.extend(self._read_active())
+        return rows, reset
+
+
+# ===== 백그라운드 압축 =====
+_gzip_queue = queue.Queue()
+_gzip_thread = None
+_gzip_lock = threading.Lock()
+
+
+def _gzip_worker():
+    while True:
+        src = _gzip_queue.get()
+        try:
+            tmp = src.with_name(src.name + ".gz.tmp")
+            with open(src, "rb") as fi, gzip.open(tmp, "wb", compresslevel=6) as fo:
+                shutil.copyfileobj(fi, fo, 1024 * 1024)
+            os.replace(tmp, src.with_name(src.name + ".gz"))
+            src.unlink()
+        except FileNotFoundError:
+            pass  # 압축 전에 보존 정책으로 삭제된 경우
+        except Exception as e:
+            print(f"[LOGROT][ERROR] gzip {src}: {e}")
+        finally:
+            _gzip_queue.task_done()
+
+
+def _schedule_gzip(path: Path):
+    global _gzip_thread
+    with _gzip_lock:
+        if _gzip_thread is None:
+            _gzip_thread = threading.Thread(target=_gzip_worker, name="logrot-gzip", daemon=True)
+            _gzip_thread.start()
+    _gzip_queue.put(path)
+
+
+def wait_compression():
+    """대기 중인 압축 작업이 끝날 때까지 블록 (종료 시 호출)"""
+    _gzip_queue.join()
+
+
+class RotatingLog:
+    """
+    크기/시간 상한이 있는 append 전용 로그.
+    header 가 주어지면 CSV 로 간주하고 각 세그먼트 첫 줄에 헤더를 쓴다.
+    flush_interval=0 이면 매 쓰기마다 flush (다른 프로세스가 즉시 읽어야 할 때).
+    """
+
+    def __init__(self, path, header=None, max_bytes=None, max_age_sec=None,
+                 max_segments=None, compress=None, flush_interval=1.0):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.header = list(header) if header else None
+        self.max_bytes = LOG_MAX_BYTES if max_bytes is None else int(max_bytes)
+        self.max_age_sec = LOG_MAX_AGE_SEC if max_age_sec is None else float(max_age_sec)
+        self.max_segments = LOG_MAX_SEGMENTS if max_segments is None else int(max_segments)
+        self.compress = LOG_COMPRESS if compress is None else bool(compress)
+        self.flush_interval = float(flush_interval)
+        self._lock = threading.Lock()
+        self._seq = 0
+        self._open()
+
+    def _open(self):
+        self._f = open(self.path, "a", newline="", encoding="utf-8")
+        self._w = csv.writer(self._f) if self.header else None
+        size = self._f.tell()
+        self._rows = 0
+        self._last_flush = time.time()
+        if size > 0:
+            # 이전 실행에서 남은 파일: 곧바로 봉인하지 않고 이어 쓴다.
+            # 시작 시각은 첫 데이터 행의 시각, 없으면 마지막 수정 시각으로 잡는다.
+            self._t1 = self.path.stat().st_mtime
+            self._t0 = self._first_row_time() or self._t1
+        else:
+            self._t0 = self._t1 = None
+            if self.header:
+                self._w.writerow(self.header)
+                self._f.flush()
+
+    def _first_row_time(self):
+        """남은 CSV 첫 데이터 행의 첫 칸(ts)이 시각(epoch 초 / ISO 문자열)이면 그 값"""
+        if not self.header:
+            return None
+        try:
+            with open(self.path, "r", newline="", encoding="utf-8") as f:
+                rows = csv.reader(f)
+                next(rows, None)
+                row = next(rows, None)
+        except (OSError, UnicodeDecodeError, csv.Error):
+            return None
+        cell = row[0].strip() if row else ""
+        try:
+            t = float(cell)
+        except ValueError:
+            try:
+                t = datetime.fromisoformat(cell).timestamp()
+            except ValueError:
+                return None
+        return t if 0 < t <= time.time() else None
+
+    def _due(self, now):
+        if self._t0 is None:
+            return False
+        if self.max_bytes > 0 and self._f.tell() >= self.max_bytes:
+            return True
+        if self.max_age_sec > 0 and now - self._t0 >= self.max_age_sec:
+            return True
+        return False
+
+    def _rotate(self):
+        self._f.close()
+        self._seq += 1
+        stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(self._t1 or time.time()))
+        seg = self.path.with_name(f"{self.path.stem}.{stamp}.{os.getpid()}-{self._seq:04d}{self.path.suffix}")
+        try:
+            os.replace(self.path, seg)
+        except FileNotFoundError:
+            # 외부에서 활성 파일이 지워진 경우 (예: 로그 초기화)
+            self._open()
+            return
+        entries = _read_index(self.path)
+        entries.append({"seg": seg.name, "t0": self._t0, "t1": self._t1,
+                        "rows": self._rows, "bytes": seg.stat().st_size})
+        if self.max_segments > 0 and len(entries) > self.max_segments:
+            for old in entries[:-self.max_segments]:
+                for p in (self.path.with_name(old["seg"]), self.path.with_name(old["seg"] + ".gz")):
+                    try: p.unlink()
+                    except FileNotFoundError: pass
+            entries = entries[-self.max_segments:]
+        _write_index(self.path, entries)
+        if self.compress:
+            _schedule_gzip(seg)
+        self._open()
+
+    def _after_write(self, now):
+        if self._t0 is None:
+            self._t0 = now
+        self._t1 = now
+        self._rows += 1
+        if now - self._last_flush >= self.flush_interval:
+            self._f.flush()
+            self._last_flush = now
+
+    def writerow(self, row):
+        with self._lock:
+            now = time.time()
+            if self._due(now):
+                self._rotate()
+            self._w.writerow(row)
+            self._after_write(now)
+
+    def write(self, text: str):
+        with self._lock:
+            now = time.time()
+            if self._due(now):
+                self._rotate()
+            self._f.write(text)
+            self._after_write(now)
+
+    def flush(self):
+        with self._lock:
+            try: self._f.flush()
+            except Exception: pass
+            self._last_flush = time.time()
+
+    def close(self):
+        with self._lock:
+            try: self._f.flush(); self._f.close()
+            except Exception: pass
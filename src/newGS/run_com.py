@@ -5,9 +5,12 @@ import sys
 import time
 import signal
 import argparse
+import threading
 import subprocess
 from pathlib import Path
 
+from log_rotation import RotatingLog, wait_compression
+
 ROOT = Path(__file__).resolve().parent
 LOG_DIR = ROOT / "log"
 LOG_DIR.mkdir(parents=True, exist_ok=True)
@@ -20,12 +23,25 @@ PROCS = [
     ("GroundSystem", "GroundSystem.py") # GUI
 ]
 
+# --broker: 텔레메트리 버스(XSUB/XPUB 프록시) 독립 프로세스
+BROKER_PROC = ("TlmBroker", "TlmBroker.py")
+
+# --hub: test4 + test3 + RoutingService 대신 단일 downlink_hub 프로세스 사용
+HUB_PROCS = [
+    ("downlink_hub", "downlink_hub.py"), # Downlink 수신 + CSV + zmq 팬아웃
+    ("test2", "test2.py"),
+    ("test1", "test1.py"),
+    ("GroundSystem", "GroundSystem.py")
+]
+
 STOP_GRACE_SEC = 2.0
 NEWGS_PORTS = {1235, 50000, 50001, 8600, 8890, 9696}
 
-def get_run_env():
+def get_run_env(extra=None):
     """ PYTHONPATH 자동 설정 """
     env = os.environ.copy()
+    if extra:
+        env.update(extra)
     paths = [
         "/usr/local/lib/python3.8/dist-packages",
         "/usr/local/lib/python3/dist-packages",
@@ -171,7 +187,7 @@ def cleanup_port_occupants():
 
 def cleanup_existing_processes():
     stale = []
-    for name, script_rel in PROCS:
+    for name, script_rel in PROCS + HUB_PROCS[:1] + [BROKER_PROC]:
         script_path = abs_script(script_rel)
         for pid in _find_matching_pids(script_path):
             stale.append((name, script_path, pid))
@@ -186,14 +202,26 @@ def cleanup_existing_processes():
         print(f" - {name} pid={pid} {status}")
     time.sleep(0.3)
 
-def start_process(name, script_rel):
+def _pump_output(stream, log: RotatingLog):
+    """ 자식 프로세스 stdout → 로테이션 로그 (크기/시간 상한 적용) """
+    try:
+        for line in iter(stream.readline, ""):
+            log.write(line)
+    except Exception:
+        pass
+    finally:
+        log.close()
+
+def start_process(name, script_rel, extra_env=None):
     spath = abs_script(script_rel)
     if not spath.exists():
         print(f"[ERROR] {name}: 파일 없음 ({spath})")
         return None
 
     log_path = LOG_DIR / f"{name}.log"
-    log_fd = open(log_path, "w", encoding="utf-8") # 덮어쓰기 모드
+    if log_path.exists():
+        log_path.unlink() # 덮어쓰기 모드 (이전 세그먼트는 보존 정책에 따름)
+    log = RotatingLog(log_path, flush_interval=0.5)
 
     print(f"[INFO] {name} 시작... (Log: {log_path.name})")
     
@@ -201,31 +229,59 @@ def start_process(name, script_rel):
         # 새 세션으로 실행 (Ctrl+C 전파 방지용 등)
         if os.name == "nt":
             p = subprocess.Popen([sys.executable, "-u", str(spath)], 
-                                 cwd=str(ROOT), env=get_run_env(), 
-                                 stdout=log_fd, stderr=subprocess.STDOUT,
+                                 cwd=str(ROOT), env=get_run_env(extra_env), 
+                                 stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                 text=True, encoding="utf-8", errors="replace",
                                  creationflags=subprocess.CREATE_NEW_PROCESS_GROUP)
         else:
             p = subprocess.Popen([sys.executable, "-u", str(spath)], 
-                                 cwd=str(ROOT), env=get_run_env(), 
-                                 stdout=log_fd, stderr=subprocess.STDOUT,
+                                 cwd=str(ROOT), env=get_run_env(extra_env), 
+                                 stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                 text=True, encoding="utf-8", errors="replace",
                                  preexec_fn=os.setsid)
+        threading.Thread(target=_pump_output, args=(p.stdout, log),
+                         name=f"log-{name}", daemon=True).start()
         return p
     except Exception as e:
         print(f"[ERROR] {name} 실행 실패: {e}")
+        log.close()
         return None
 
 def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--hub", action="store_true",
+                    help="test4/test3/RoutingService 대신 downlink_hub 하나로 downlink 처리")
+    ap.add_argument("--combined-uplink", action="store_true",
+                    help="test1 없이 test2 가 GS 명령을 직접 받아 CSV 탭 단계로 기록")
+    ap.add_argument("--broker", action="store_true",
+                    help="텔레메트리 버스를 독립 TlmBroker 프로세스로 분리")
+    args = ap.parse_args()
+
     print(f"=== 위성 통신 시뮬레이터 통합 런처 ===")
     print(f"경로: {ROOT}")
     
     children = []
+    procs = HUB_PROCS if args.hub else PROCS
+    extra_env = {}
+    if args.hub:
+        extra_env["GS_EXTERNAL_HUB"] = "1"
+    if args.combined_uplink:
+        procs = [(n, s) for n, s in procs if n != "test1"]
+        extra_env["UPLINK_COMBINED"] = "1"
+    if args.broker:
+        procs = [BROKER_PROC] + procs
+        extra_env["GS_BUS_PUB_ENDPOINT"] = "ipc:///tmp/GroundSystemIn"
+        if not args.hub:
+            # UDP→버스 라우팅도 브로커 프로세스에서 수행
+            extra_env["BROKER_ROUTE"] = "1"
+            extra_env["GS_EXTERNAL_HUB"] = "1"
     
     try:
         cleanup_existing_processes()
         cleanup_port_occupants()
 
-        for name, script in PROCS:
-            p = start_process(name, script)
+        for name, script in procs:
+            p = start_process(name, script, extra_env)
             if p:
                 children.append((name, p))
                 time.sleep(1) # 순차 실행 대기
@@ -249,6 +305,7 @@ def main():
                 ok = _terminate_pid(p.pid)
                 status = "종료됨" if ok else "종료 실패"
                 print(f" - {name} {status}")
+        wait_compression()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+uplink_latency.py — GS → CI_LAB 구간 uplink 지연 측정
+
+CI_LAB 포트(기본 1234)에 싱크 소켓을 열고, GS 포트(기본 50000)로 SAMPLE_APP NOOP 형식의
+명령을 보내 도착까지 걸린 시간을 잰다. cFS 는 꺼 둔 상태에서 실행한다.
+
+  # 기존 경로 (test1 → test2)
+  python3 run_com.py            &  (cFS 없이)
+  python3 scripts/uplink_latency.py --count 2000
+
+  # 통합 경로 (test2 + CSV 탭)
+  python3 run_com.py --combined-uplink &
+  python3 scripts/uplink_latency.py --count 2000
+
+test2 의 base_delay/jitter/공격 설정은 0/none 으로 두어야 hop 비용만 측정된다.
+
+GNU Radio 가 없는 환경에서는 --relay 로 두 경로의 로깅 구조만 별도 프로세스에 재현해
+비교할 수 있다 (run_com 없이, GNU Radio 스케줄러 비용은 포함되지 않음):
+
+  python3 scripts/uplink_latency.py --relay test1   # 수신 → CSV 기록 → 포워딩 (test1)
+  python3 scripts/uplink_latency.py --relay tap     # 수신 → 포워딩, 기록은 백그라운드 (PduCsvTap)
+"""
+
+import os
+import sys
+import time
+import queue
+import socket
+import struct
+import argparse
+import tempfile
+import threading
+import statistics
+import multiprocessing
+from pathlib import Path
+
+
+def build_cmd(seq: int, stamp_ns: int) -> bytes:
+    # CCSDS primary(6) + cmd secondary(2) + 측정용 (seq, send_ns)
+    body = struct.pack(">IQ", seq, stamp_ns)
+    length = 2 + len(body) - 1
+    return struct.pack(">HHHBB", 0x1882, 0xC000 | (seq & 0x3FFF), length, 0, 0) + body
+
+
+def relay(mode, listen, target, ready, log_dir):
+    """--relay: test1 (기록 후 포워딩) 또는 PduCsvTap (포워딩 후 백그라운드 기록) 경로 재현"""
+    sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+    sys.stdout = open(os.devnull, "w")   # log_sent_packet 의 패킷별 출력
+    import test1
+    writer = test1.open_sent_log(Path(log_dir) / "sample_app_sent.csv")
+    in_sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    in_sock.bind(listen)
+    out_sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    q = queue.Queue(4096)
+
+    def tap_writer():
+        while True:
+            data, (ip, port) = q.get()
+            test1.log_sent_packet(writer, data, ip, port)
+    if mode == "tap":
+        threading.Thread(target=tap_writer, daemon=True).start()
+
+    ready.set()
+    while True:
+        data, addr = in_sock.recvfrom(65535)
+        if mode == "tap":
+            out_sock.sendto(data, target)
+            try: q.put_nowait((data, addr))
+            except queue.Full: pass
+        else:
+            test1.log_sent_packet(writer, data, *addr)
+            out_sock.sendto(data, target)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--target-host", default="127.0.0.1")
+    ap.add_argument("--target-port", type=int, default=50000)
+    ap.add_argument("--sink-port", type=int, default=1234)
+    ap.add_argument("--count", type=int, default=1000)
+    ap.add_argument("--interval-ms", type=float, default=2.0)
+    ap.add_argument("--timeout", type=float, default=2.0)
+    ap.add_argument("--relay", choices=("test1", "tap"),
+                    help="target 포트에 해당 경로를 재현하는 중계 프로세스를 띄워 측정")
+    args = ap.parse_args()
+
+    proc = None
+    if args.relay:
+        ready = multiprocessing.Event()
+        proc = multiprocessing.Process(
+            target=relay, daemon=True,
+            args=(args.relay, (args.target_host, args.target_port), ("127.0.0.1", args.sink_port),
+                  ready, tempfile.mkdtemp(prefix="uplink_latency_")))
+        proc.start()
+        ready.wait(10)
+
+    sink = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sink.bind(("0.0.0.0", args.sink_port))
+    sink.settimeout(args.timeout)
+    tx = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+    lat_us = []
+    lost = 0
+    for i in range(args.count):
+        tx.sendto(build_cmd(i, time.perf_counter_ns()), (args.target_host, args.target_port))
+        try:
+            while True:
+                data = sink.recv(2048)
+                now = time.perf_counter_ns()
+                if len(data) >= 20:
+                    seq, sent_ns = struct.unpack_from(">IQ", data, 8)
+                    if seq == i:
+                        lat_us.append((now - sent_ns) / 1000.0)
+                        break
+        except socket.timeout:
+            lost += 1
+        if args.interval_ms > 0:
+            time.sleep(args.interval_ms / 1000.0)
+
+    if proc is not None:
+        proc.terminate()
+    if not lat_us:
+        print(f"no packets arrived at :{args.sink_port} (lost={lost})")
+        return
+    lat_us.sort()
+    p = lambda q: lat_us[min(len(lat_us) - 1, int(q * len(lat_us)))]
+    via = f" via {args.relay} relay" if args.relay else ""
+    print(f"uplink {args.target_host}:{args.target_port} -> :{args.sink_port}{via}  "
+          f"n={len(lat_us)} lost={lost}")
+    print(f"  mean={statistics.mean(lat_us):.1f}us  p50={p(0.50):.1f}us  "
+          f"p90={p(0.90):.1f}us  p99={p(0.99):.1f}us  max={lat_us[-1]:.1f}us")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,8 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
-import os, sys, csv, time, socket, pathlib, subprocess, shlex, signal, traceback, threading
+import os, sys, time, socket, pathlib, subprocess, shlex, signal, traceback, threading
+
+from log_rotation import RotatingLog
 
 # ===== 설정 =====
 GS_LISTEN_HOST = os.getenv("GS_LISTEN_HOST", "0.0.0.0")
@@ -24,18 +26,15 @@ SEND_TEXT_CC = 3
 def now_ts():
     return time.strftime("%Y-%m-%d %H:%M:%S", time.localtime())
 
-def ensure_csv_header(path: pathlib.Path):
-    found = path.exists() and path.stat().st_size > 0
-    f = path.open("a", newline="", encoding="utf-8")
-    w = csv.writer(f)
-    if not found:
-        # [수정] 헤더에 'seq' 추가
-        w.writerow([
-            "ts","direction","id","text","mid_hex","apid_hex","cc_dec",
-            "seq", "len", "src_ip","src_port","head_hex16","text_hex","bits",
-            "payload_hex","payload_bits"
-        ])
-    return f, w
+CSV_HEADER = [
+    "ts","direction","id","text","mid_hex","apid_hex","cc_dec",
+    "seq", "len", "src_ip","src_port","head_hex16","text_hex","bits",
+    "payload_hex","payload_bits"
+]
+
+def open_sent_log(path: pathlib.Path) -> RotatingLog:
+    # 크기/시간 상한으로 세그먼트 로테이션 (log_rotation.py 참고)
+    return RotatingLog(path, header=CSV_HEADER, flush_interval=1.0)
 
 def to_hex(b: bytes) -> str:
     return "".join(f"{x:02X}" for x in b)
@@ -84,6 +83,49 @@ def parse_id_text_if_send_text(data: bytes):
         return int(parts[0]), parts[1]
     return None, s
 
+def log_sent_packet(writer, data: bytes, src_ip, src_port):
+    """명령 패킷 1개를 콘솔 출력 + CSV 기록 (test2 uplink tap 에서도 사용)"""
+    mid, apid, cc = parse_mid_apid_cc(data)
+    seq = parse_seq_count(data) # [추가] 시퀀스 번호
+    head_hex16 = " ".join(f"{b:02X}" for b in data[:16])
+
+    # 디버그: 현재 패킷 정보
+    print(f"[RECV] {src_ip}:{src_port} len={len(data)} mid=0x{(mid or 0):04X} seq={seq} "
+          f"cc={(cc if cc is not None else -1)}")
+
+    # SEND_TEXT일 때만 ID/TEXT 추출 (참고용)
+    sid, stext = parse_id_text_if_send_text(data)
+
+    text_bytes = (stext or "").encode('utf-8', errors='ignore')
+    text_hex = to_hex(text_bytes)
+    bits = bytes_to_bits(text_bytes)
+    if bits:
+        bits = "b:" + bits
+    payload_bytes = extract_send_text_payload_bytes(data)
+    payload_hex = to_hex(payload_bytes)
+    payload_bits = bytes_to_bits(payload_bytes)
+    if payload_bits:
+        payload_bits = "b:" + payload_bits
+
+    # CSV 기록 (seq 포함)
+    writer.writerow([
+        now_ts(),
+        "sent",
+        (sid if sid is not None else ""),
+        (stext or ""),
+        f"0x{(mid or 0):04X}",
+        f"0x{(apid or 0):04X}",
+        (cc if cc is not None else ""),
+        seq,  # <--- 중요: 매칭 키
+        len(data),
+        src_ip, src_port,
+        head_hex16,
+        text_hex,
+        bits,
+        payload_hex,
+        payload_bits
+    ])
+
 # ===== 스크립트 비동기 실행 =====
 def run_setup_script_async():
     if SKIP_SETUP:
@@ -122,8 +164,7 @@ def main():
     out_sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
     print(f"[{now_ts()}] forwarding to {UPLINK_DST_HOST}:{UPLINK_DST_PORT}")
 
-    f, writer = ensure_csv_header(CSV_PATH)
-    last_flush = time.time()
+    writer = open_sent_log(CSV_PATH)
 
     # 2) 시작 직후 TO_LAB 초기화 스크립트
     run_setup_script_async()
@@ -140,46 +181,7 @@ def main():
             print(f"[{now_ts()}] [RECV][ERROR] {e}\n{traceback.format_exc()}"); break
 
         src_ip, src_port = addr
-        mid, apid, cc = parse_mid_apid_cc(data)
-        seq = parse_seq_count(data) # [추가] 시퀀스 번호
-        head_hex16 = " ".join(f"{b:02X}" for b in data[:16])
-
-        # 디버그: 현재 패킷 정보
-        print(f"[RECV] {src_ip}:{src_port} len={len(data)} mid=0x{(mid or 0):04X} seq={seq} "
-              f"cc={(cc if cc is not None else -1)}")
-
-        # SEND_TEXT일 때만 ID/TEXT 추출 (참고용)
-        sid, stext = parse_id_text_if_send_text(data)
-        
-        text_bytes = (stext or "").encode('utf-8', errors='ignore')
-        text_hex = to_hex(text_bytes)
-        bits = bytes_to_bits(text_bytes)
-        if bits:
-            bits = "b:" + bits
-        payload_bytes = extract_send_text_payload_bytes(data)
-        payload_hex = to_hex(payload_bytes)
-        payload_bits = bytes_to_bits(payload_bytes)
-        if payload_bits:
-            payload_bits = "b:" + payload_bits
-
-        # CSV 기록 (seq 포함)
-        writer.writerow([
-            now_ts(),
-            "sent",
-            (sid if sid is not None else ""),
-            (stext or ""),
-            f"0x{(mid or 0):04X}",
-            f"0x{(apid or 0):04X}",
-            (cc if cc is not None else ""),
-            seq,  # <--- 중요: 매칭 키
-            len(data),
-            src_ip, src_port,
-            head_hex16,
-            text_hex,
-            bits,
-            payload_hex,
-            payload_bits
-        ])
+        log_sent_packet(writer, data, src_ip, src_port)
 
         # 포워딩
         try:
@@ -187,13 +189,7 @@ def main():
         except Exception as e:
             print(f"[{now_ts()}] [SEND][ERROR] {e}")
 
-        if time.time() - last_flush >= 1.0:
-            try: f.flush()
-            except Exception: pass
-            last_flush = time.time()
-
-    try: f.flush(); f.close()
-    except Exception: pass
+    writer.close()
     in_sock.close(); out_sock.close()
     print(f"[{now_ts()}] test1 stopped.")
 
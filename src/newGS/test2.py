@@ -9,23 +9,29 @@ Attacks Implemented:
   3. Replay: Probabilistic / Replay Delay (sends copy after N seconds)
   
   * Replaces Length Mod with Replay Attack.
+
+Combined uplink (--uplink-tap 또는 UPLINK_COMBINED=1):
+  GS → test2(50000) → CI_LAB(1234) 로 test1 프로세스를 생략하고,
+  test1 의 CSV 로깅(log/sample_app_sent.csv, 동일 스키마)을 채널 내부 탭 단계로 수행한다.
 """
 
 import os
 import json
 import time
+import queue
 import random
 import heapq
 import threading
 import argparse
 import socket
-import csv
 from datetime import datetime
 from struct import unpack
 
 from gnuradio import gr, blocks
 import pmt
 
+from log_rotation import RotatingLog
+
 
 def load_config_json():
     candidates = []
@@ -110,6 +116,89 @@ class PduLogger(gr.basic_block):
     def _handler(self, msg):
         self.message_port_pub(pmt.intern("pdus"), msg)
 
+class UdpPduSource(gr.basic_block):
+    """
+    GS 명령 수신 블록 (combined uplink 용). socket_pdu 는 송신자 주소를 주지 않으므로
+    직접 recvfrom 해서 PDU 메타데이터에 src_ip / src_port 를 넣어 넘긴다.
+    """
+    def __init__(self, host, port):
+        gr.basic_block.__init__(self, name="UdpPduSource", in_sig=None, out_sig=None)
+        self.port = pmt.intern("pdus")
+        self.message_port_register_out(self.port)
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._sock.bind((host, int(port)))
+        self._sock.settimeout(0.5)
+        self._stop = False
+        self._thread = threading.Thread(target=self._reader, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return super().start()
+
+    def _reader(self):
+        k_ip, k_port = pmt.intern("src_ip"), pmt.intern("src_port")
+        while not self._stop:
+            try: data, (ip, port) = self._sock.recvfrom(65535)
+            except socket.timeout: continue
+            except OSError: break
+            meta = pmt.dict_add(pmt.dict_add(pmt.make_dict(), k_ip, pmt.intern(ip)),
+                                k_port, pmt.from_long(port))
+            self.message_port_pub(self.port, pmt.cons(meta, pmt.init_u8vector(len(data), list(data))))
+
+    def stop(self):
+        self._stop = True
+        try: self._thread.join(timeout=1.0)
+        except: pass
+        self._sock.close()
+        return super().stop()
+
+
+class PduCsvTap(gr.basic_block):
+    """
+    test1 의 송신 CSV 로깅을 채널 프로세스 안에서 수행하는 탭 단계.
+    PDU 는 먼저 그대로 다음 블록으로 넘기고, 기록은 백그라운드 스레드가 처리한다.
+    src_ip/src_port 는 UdpPduSource 가 붙인 메타데이터에서 읽는다 (없으면 빈 칸).
+    """
+    def __init__(self, queue_size=4096):
+        gr.basic_block.__init__(self, name="PduCsvTap", in_sig=None, out_sig=None)
+        import test1
+        self._test1 = test1
+        self._log = test1.open_sent_log(test1.CSV_PATH)
+        self._q = queue.Queue(queue_size)
+        self.dropped = 0
+        self.port = pmt.intern("pdus")
+        self.message_port_register_in(self.port)
+        self.set_msg_handler(self.port, self._handler)
+        self.message_port_register_out(self.port)
+        self._stop = False
+        self._thread = threading.Thread(target=self._writer, daemon=True)
+        self._thread.start()
+
+    def _handler(self, msg):
+        self.message_port_pub(self.port, msg)
+        try: self._q.put_nowait(msg)
+        except queue.Full: self.dropped += 1
+
+    def _writer(self):
+        while not self._stop or not self._q.empty():
+            try: msg = self._q.get(timeout=0.5)
+            except queue.Empty: continue
+            try:
+                meta = pmt.to_python(pmt.car(msg)) or {}
+                data = bytes(bytearray(pmt.u8vector_elements(pmt.cdr(msg))))
+                self._test1.log_sent_packet(self._log, data, meta.get("src_ip", ""), meta.get("src_port", ""))
+            except Exception as e:
+                print(f"[TEST2][TAP][ERROR] {e}")
+
+    def stop(self):
+        self._stop = True
+        try: self._thread.join(timeout=1.0)
+        except: pass
+        self._log.close()
+        return super().stop()
+
+
 class PduSpaceChannel(gr.basic_block):
     HEADER_PROTECT_SIZE = 8
 
@@ -136,9 +225,12 @@ class PduSpaceChannel(gr.basic_block):
         self.replay_delay = 1.0  # [New]
 
         self.log_path = "attack_log.csv"
+        self._attack_log = None
         try:
-            with open(self.log_path, "w", newline="") as f:
-                csv.writer(f).writerow(["Timestamp", "SeqCount", "AttackMode", "Result", "Details"])
+            if os.path.exists(self.log_path):
+                os.remove(self.log_path)  # 실행마다 새로 시작 (이전 세그먼트는 보존)
+            self._attack_log = RotatingLog(self.log_path,
+                header=["Timestamp", "SeqCount", "AttackMode", "Result", "Details"])
             print(f"[TEST2] Log initialized: {self.log_path}")
         except: pass
 
@@ -170,9 +262,8 @@ class PduSpaceChannel(gr.basic_block):
             if "replay_delay" in kw: self.replay_delay = float(kw["replay_delay"])
 
     def _write_log(self, seq, mode, result, details=""):
-        try:
-            with open(self.log_path, "a", newline="") as f:
-                csv.writer(f).writerow([now_ts(), seq, mode, result, details])
+        if self._attack_log is None: return
+        try: self._attack_log.writerow([now_ts(), seq, mode, result, details])
         except: pass
 
     def _now_ns(self): return time.monotonic_ns()
@@ -286,6 +377,7 @@ class PduSpaceChannel(gr.basic_block):
         self._stop = True
         try: self._tx_thread.join(timeout=1.0)
         except: pass
+        if self._attack_log is not None: self._attack_log.close()
         return super().stop()
 
 
@@ -294,11 +386,17 @@ class UplinkUdpRelay(gr.top_block):
         super().__init__()
         self.listen_ip = cfg.get("listen_ip", args.listen_ip)
         self.listen_port = int(cfg.get("listen_port", args.listen_port))
+        if args.uplink_tap:
+            # test1 대신 GS 명령을 직접 수신
+            self.listen_port = int(args.gs_listen_port)
         self.dst_ip = cfg.get("dst_ip", args.dst_ip)
         self.dst_port = int(cfg.get("dst_port", args.dst_port))
         
-        self.udp_in = blocks.socket_pdu("UDP_SERVER", self.listen_ip, str(self.listen_port), 1472, True)
-        self.log_in = PduLogger("IN ")
+        if args.uplink_tap:
+            self.udp_in = UdpPduSource(self.listen_ip, self.listen_port)
+        else:
+            self.udp_in = blocks.socket_pdu("UDP_SERVER", self.listen_ip, str(self.listen_port), 1472, True)
+        self.log_in = PduCsvTap() if args.uplink_tap else PduLogger("IN ")
         self.space = PduSpaceChannel(
             cfg.get("base_delay_ms", 0), cfg.get("jitter_ms", 0), cfg.get("ber", 0), cfg.get("seed", 0xBEEF),
             (not args.full_ber) and args.payload_only,
@@ -341,6 +439,9 @@ def main():
     ap.add_argument("--tlm08a9-len-off", default=12)
     ap.add_argument("--tlm08a9-text-off", default=14)
     ap.add_argument("--tlm08a9-text-max", default=128)
+    ap.add_argument("--uplink-tap", action="store_true",
+                    default=os.environ.get("UPLINK_COMBINED", "0") == "1")
+    ap.add_argument("--gs-listen-port", default=os.environ.get("GS_LISTEN_PORT", "50000"))
     args = ap.parse_args()
     
     cfg = load_config_json() or {}
@@ -348,6 +449,10 @@ def main():
     
     tb = UplinkUdpRelay(args, cfg)
     tb.start()
+    if args.uplink_tap:
+        print(f"[TEST2] Combined uplink: GS :{tb.listen_port} -> {tb.dst_ip}:{tb.dst_port} (CSV tap)")
+        import test1
+        test1.run_setup_script_async()
     try:
         while True: time.sleep(1)
     except: pass
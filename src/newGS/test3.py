@@ -1,10 +1,12 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-import socket, struct, csv
+import socket, struct
 from pathlib import Path
 from datetime import datetime
 
+from log_rotation import RotatingLog
+
 LISTEN_IP, LISTEN_PORT = "0.0.0.0", 8890
 
 # ---- 필터: SAMPLE_APP 텍스트 텔레메트리 후보 ----
@@ -17,11 +19,6 @@ RECV_CSV = LOG_DIR / "sample_app_recv.csv"
 
 def now_ts(): return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
-def ensure_csv_header(p, hdr):
-    if (not p.exists()) or p.stat().st_size == 0:
-        with open(p, "w", newline="", encoding="utf-8") as f:
-            csv.writer(f).writerow(hdr)
-
 def to_hex(b): return "".join(f"{x:02X}" for x in b)
 def bytes_to_bits(b): return "".join(f"{x:08b}" for x in b)
 
@@ -70,13 +67,56 @@ def split_id_text(text: str):
         sid, body = parts[0], parts[1]
     return sid, body
 
-def main():
+CSV_HEADER = [
+    "ts","direction","id","text","mid_hex","apid_hex","cc_dec",
+    "seq", "len", "src_ip","src_port","head_hex16","text_hex","bits",
+    "payload_hex","payload_bits"
+]
+
+def open_recv_log():
     # [수정] CSV 헤더에 'seq' 추가 (test1과 통일)
-    ensure_csv_header(RECV_CSV, [
-        "ts","direction","id","text","mid_hex","apid_hex","cc_dec",
-        "seq", "len", "src_ip","src_port","head_hex16","text_hex","bits",
-        "payload_hex","payload_bits"
+    # 매 행 flush: sample_app_tlm_page 가 즉시 읽을 수 있도록 (기존 open/close 와 동일한 가시성)
+    return RotatingLog(RECV_CSV, header=CSV_HEADER, flush_interval=0)
+
+def log_packet(recv_log, data: bytes, addr) -> bool:
+    """SAMPLE_APP 텍스트 TLM 이면 콘솔 출력 + CSV 기록 (downlink_hub 에서도 사용)"""
+    src_ip, src_port = addr
+    hdr = parse_ccsds_header(data)
+    if not hdr: return False
+
+    cc = data[6] if len(data) > 6 else None
+    if not is_sample_text(hdr): return False
+    head_hex16 = " ".join(f"{b:02X}" for b in data[:16])
+
+    raw_payload = extract_text_bytes(data)
+    text = extract_text(data)
+    sid_str, text_body = split_id_text(text)
+
+    # 콘솔 출력 (Seq 포함)
+    print(f"[test3] [TEXT] {now_ts()} sid=0x{hdr['sid']:04X} seq={hdr['seq']} cc={(cc if cc is not None else -1)} text={text!r}")
+
+    # CSV 기록
+    text_bytes = text_body.encode("utf-8", errors="ignore")
+    text_hex   = to_hex(text_bytes)
+    bits = bytes_to_bits(text_bytes)
+    if bits: bits = "b:" + bits
+    payload_hex = to_hex(raw_payload)
+    payload_bits = bytes_to_bits(raw_payload)
+    if payload_bits: payload_bits = "b:" + payload_bits
+
+    recv_log.writerow([
+        now_ts(), "recv", sid_str, text_body,
+        f"0x{hdr['sid']:04X}", f"0x{hdr['apid']:04X}",
+        (cc if cc is not None else ""), 
+        hdr['seq'], # [수정] Seq 저장
+        len(data),
+        src_ip, src_port, head_hex16, text_hex, bits,
+        payload_hex, payload_bits
     ])
+    return True
+
+def main():
+    recv_log = open_recv_log()
 
     sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
     sock.bind((LISTEN_IP, LISTEN_PORT))
@@ -87,41 +127,7 @@ def main():
 
     while True:
         data, addr = sock.recvfrom(4096)
-        src_ip, src_port = addr
-        hdr = parse_ccsds_header(data)
-        if not hdr: continue
-
-        cc = data[6] if len(data) > 6 else None
-        head_hex16 = " ".join(f"{b:02X}" for b in data[:16])
-
-        if not is_sample_text(hdr): continue
-
-        raw_payload = extract_text_bytes(data)
-        text = extract_text(data)
-        sid_str, text_body = split_id_text(text)
-
-        # 콘솔 출력 (Seq 포함)
-        print(f"[test3] [TEXT] {now_ts()} sid=0x{hdr['sid']:04X} seq={hdr['seq']} cc={(cc if cc is not None else -1)} text={text!r}")
-
-        # CSV 기록
-        text_bytes = text_body.encode("utf-8", errors="ignore")
-        text_hex   = to_hex(text_bytes)
-        bits = bytes_to_bits(text_bytes)
-        if bits: bits = "b:" + bits
-        payload_hex = to_hex(raw_payload)
-        payload_bits = bytes_to_bits(raw_payload)
-        if payload_bits: payload_bits = "b:" + payload_bits
-
-        with open(RECV_CSV, "a", newline="", encoding="utf-8") as f:
-            csv.writer(f).writerow([
-                now_ts(), "recv", sid_str, text_body,
-                f"0x{hdr['sid']:04X}", f"0x{hdr['apid']:04X}",
-                (cc if cc is not None else ""), 
-                hdr['seq'], # [수정] Seq 저장
-                len(data),
-                src_ip, src_port, head_hex16, text_hex, bits,
-                payload_hex, payload_bits
-            ])
+        log_packet(recv_log, data, addr)
 
 if __name__ == "__main__":
     main()
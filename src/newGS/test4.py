@@ -1,8 +1,10 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+import os
 import time
 import socket
+from array import array
 from datetime import datetime
 
 from gnuradio import gr, blocks
@@ -16,6 +18,16 @@ except Exception:
 FILTER_SID = {0x08A9, 0x1882}   # Stream ID로 보이는 값들
 FILTER_APID = {0x0882, 0x08A9}  # APID로 보이는 값들
 
+# ---- Fast-path 설정 ----
+# TEST4_FAST=1      : 포워딩 우선 모드 (PMT 그대로 전달, MID별 카운트만 갱신)
+# TEST4_SAMPLE_N=N  : N개 중 1개만 상세 검사/출력 (0 = 샘플링 안 함)
+# TEST4_SAMPLE_MIDS : 항상 상세 검사할 MID 목록 (예: "0x08A9,0x0808")
+# TEST4_STATS_SEC   : MID별 통계 요약 출력 주기 (0 = 출력 안 함, 기본: fast 모드 10 / 기존 모드 0)
+FAST_MODE = os.getenv("TEST4_FAST", "0") == "1"
+SAMPLE_N = int(os.getenv("TEST4_SAMPLE_N", "0"))
+SAMPLE_MIDS = {int(x, 16) for x in os.getenv("TEST4_SAMPLE_MIDS", "").replace(" ", "").split(",") if x}
+STATS_SEC = float(os.getenv("TEST4_STATS_SEC", "10" if FAST_MODE else "0"))
+
 def now(): return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
 def parse_hdr(b: bytes):
@@ -61,16 +73,64 @@ def preview_text(pkt: bytes) -> str:
     return ""
 
 class pdu_tap(gr.basic_block):
-    def __init__(self):
+    def __init__(self, fast=False, sample_n=0, sample_mids=()):
         gr.basic_block.__init__(self, name="pdu_tap", in_sig=None, out_sig=None)
+        self.port_out = gr.pmt.intern("pdus_out")
         self.message_port_register_in(gr.pmt.intern("pdus_in"))
-        self.message_port_register_out(gr.pmt.intern("pdus_out"))
-        self.set_msg_handler(gr.pmt.intern("pdus_in"), self.handle_pdu)
+        self.message_port_register_out(self.port_out)
+
+        # MID(16bit)별 패킷/바이트 카운터 (고정 크기 배열)
+        self.mid_pkts = array("Q", bytes(8 * 0x10000))
+        self.mid_bytes = array("Q", bytes(8 * 0x10000))
+        self.total = 0
+        self.sample_n = int(sample_n)
+        self.sample_mids = frozenset(sample_mids)
+
+        if fast:
+            self.set_msg_handler(gr.pmt.intern("pdus_in"), self.handle_pdu_fast)
+        else:
+            self.set_msg_handler(gr.pmt.intern("pdus_in"), self.handle_pdu)
+
+    def handle_pdu_fast(self, pdu):
+        # 포워딩 먼저: PMT 를 변환하지 않고 그대로 넘긴다
+        self.message_port_pub(self.port_out, pdu)
+
+        vec = gr.pmt.cdr(pdu)
+        n = gr.pmt.length(vec)
+        if n < 2:
+            return
+        mid = (gr.pmt.u8vector_ref(vec, 0) << 8) | gr.pmt.u8vector_ref(vec, 1)
+        self.mid_pkts[mid] += 1
+        self.mid_bytes[mid] += n
+        self.total += 1
+
+        if mid in self.sample_mids or (self.sample_n > 0 and self.total % self.sample_n == 0):
+            self.inspect(bytes(bytearray(gr.pmt.u8vector_elements(vec))))
+
+    def inspect(self, blob: bytes):
+        sid, apid, cc, head16 = parse_hdr(blob)
+        print(f"[test4] [SMP] {now()} len={len(blob)} sid=0x{(sid or 0):04X} apid=0x{(apid or 0):04X} cc={(cc if cc is not None else -1)}")
+        if looks_like_sample_text(blob):
+            txt = preview_text(blob)
+            print(f"[test4] [SMP] head16={head16}")
+            if txt:
+                print(f"[test4] [SMP] text='{txt}'")
+
+    def stats_summary(self, top=8):
+        """MID별 누적 카운트 상위 항목 문자열"""
+        active = [(self.mid_pkts[m], m) for m in range(0x10000) if self.mid_pkts[m]]
+        active.sort(reverse=True)
+        parts = [f"0x{m:04X}={c}({self.mid_bytes[m]}B)" for c, m in active[:top]]
+        return f"total={self.total} mids={len(active)} " + " ".join(parts)
 
     def handle_pdu(self, pdu):
         vec  = gr.pmt.cdr(pdu)
         blob = bytes(bytearray(gr.pmt.u8vector_elements(vec)))
         sid, apid, cc, head16 = parse_hdr(blob)
+        if sid is not None:
+            self.mid_pkts[sid] += 1
+            self.mid_bytes[sid] += len(blob)
+        self.total += 1
 
         # (필수) 유입 1줄 요약
         print(f"[test4] [ANY] {now()} len={len(blob)} sid=0x{(sid or 0):04X} apid=0x{(apid or 0):04X} cc={(cc if cc is not None else -1)}")
@@ -84,10 +144,11 @@ class pdu_tap(gr.basic_block):
             print(f"[test4] [FWD] -> UDP 127.0.0.1:8890 len={len(blob)}\n")
 
         # 항상 포워딩
-        self.message_port_pub(gr.pmt.intern("pdus_out"), pdu)
+        self.message_port_pub(self.port_out, pdu)
 
 class DownlinkUdpRelay(gr.top_block):
-    def __init__(self, listen_ip="0.0.0.0", listen_port=1235, out_ip="127.0.0.1", out_port=8890):
+    def __init__(self, listen_ip="0.0.0.0", listen_port=1235, out_ip="127.0.0.1", out_port=8890,
+                 fast=FAST_MODE, sample_n=SAMPLE_N, sample_mids=SAMPLE_MIDS):
         gr.top_block.__init__(self, "DownlinkUdpRelay")
         if HAVE_NETWORK:
             self.udp_in  = network.socket_pdu("UDP_SERVER", listen_ip, str(listen_port), 1472, False)
@@ -95,7 +156,7 @@ class DownlinkUdpRelay(gr.top_block):
         else:
             self.udp_in  = blocks.socket_pdu("UDP_SERVER", listen_ip, str(listen_port), 1472, False)
             self.udp_out = blocks.socket_pdu("UDP_CLIENT", out_ip,    str(out_port),    1472, False)
-        self.tap = pdu_tap()
+        self.tap = pdu_tap(fast, sample_n, sample_mids)
         self.msg_connect(self.udp_in, "pdus", self.tap, "pdus_in")
         self.msg_connect(self.tap, "pdus_out", self.udp_out, "pdus")
 
@@ -112,12 +173,20 @@ def main():
 
     tb = DownlinkUdpRelay("0.0.0.0", 1235, "127.0.0.1", 8890)
     print(f"[test4] Listening cFS UDP on 0.0.0.0:1235 ...")
-    print(f"[test4] Forwarding to 127.0.0.1:8890 (detail only SAMPLE_APP)")
+    if FAST_MODE:
+        mids = ",".join(f"0x{m:04X}" for m in sorted(SAMPLE_MIDS)) or "-"
+        print(f"[test4] Forwarding to 127.0.0.1:8890 (fast-path, sample 1/{SAMPLE_N or '-'}, mids={mids})")
+    else:
+        print(f"[test4] Forwarding to 127.0.0.1:8890 (detail only SAMPLE_APP)")
     tb.start()
     print("[test4] started.")
+    last_stats = time.time()
     try:
         while True:
             time.sleep(1)
+            if STATS_SEC > 0 and time.time() - last_stats >= STATS_SEC:
+                last_stats = time.time()
+                print(f"[test4] [STAT] {now()} {tb.tap.stats_summary()}")
     except KeyboardInterrupt:
         pass
     finally: